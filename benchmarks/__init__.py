@@ -0,0 +1,3 @@
+"""
+Бенчмарки сервиса (запуск из корневого каталога проекта: python3 -m benchmarks.<имя модуля>)
+"""
@@ -0,0 +1,79 @@
+"""
+Пропускная способность параллельных запросов к базе данных:
+блокирующие вызовы сессии в событийном цикле против выполнения в пуле потоков
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures.thread import ThreadPoolExecutor
+
+from dynaconf import settings
+
+from item_menu.database import Database, AsyncSession
+
+
+# медленный запрос, имитирующий тяжелую выборку
+SLOW_QUERY = 'SELECT pg_sleep(:delay)'
+
+
+async def blocking_request(db: Database, delay: float):
+    """
+    Запрос в стиле прежней реализации: синхронный вызов сессии внутри корутины
+    @param db: база данных
+    @param delay: длительность запроса в секундах
+    """
+    async with db.asessioncontext() as session:  # type: AsyncSession
+        session.sync_session.execute(SLOW_QUERY, {'delay': delay})
+
+
+async def async_request(db: Database, delay: float):
+    """
+    Запрос через асинхронную сессию
+    @param db: база данных
+    @param delay: длительность запроса в секундах
+    """
+    async with db.asessioncontext() as session:  # type: AsyncSession
+        await session.execute(SLOW_QUERY, {'delay': delay})
+
+
+async def measure(db: Database, request, concurrency: int, total: int, delay: float) -> float:
+    """
+    Измерение пропускной способности
+    @param db: база данных
+    @param request: корутина одного запроса
+    @param concurrency: количество одновременных запросов
+    @param total: общее количество запросов
+    @param delay: длительность запроса в секундах
+    @return: количество запросов в секунду
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            await request(db, delay)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[limited() for _ in range(total)])
+    return total / (time.perf_counter() - started)
+
+
+async def main(args: argparse.Namespace):
+    settings.configure(ENVVAR_PREFIX_FOR_DYNACONF=False)
+    config = settings.POSTGRES
+    db = Database(config)
+    await db.initialize(ThreadPoolExecutor(max_workers=config.pool_size + config.max_overflow))
+
+    print('concurrency={} total={} delay={}s'.format(args.concurrency, args.total, args.delay))
+    for name, request in (('blocking (before)', blocking_request), ('executor (after)', async_request)):
+        rps = await measure(db, request, args.concurrency, args.total, args.delay)
+        print('{:<20} {:>8.1f} req/s'.format(name, rps))
+
+    await db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, default=15)
+    parser.add_argument('--total', type=int, default=150)
+    parser.add_argument('--delay', type=float, default=0.02)
+    asyncio.get_event_loop().run_until_complete(main(parser.parse_args()))
@@ -0,0 +1,112 @@
+"""
+Загрузка большого меню: COPY во временные таблицы с объединением на все строки
+против построчной вставки пунктов с триггерами порядка сортировки и путей.
+Данные загружаются в транзакции, которая откатывается по завершении
+"""
+import argparse
+import csv
+import io
+import json
+import time
+
+from dynaconf import settings
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from item_menu.database import Database
+from item_menu.database.models import ItemModel
+from item_menu.database.transfer import import_csv, import_json
+
+
+# ID корневого пункта тестового дерева, не пересекающийся с рабочими данными
+BENCH_ROOT_ID = 10 ** 9
+
+
+def generate_items(size: int, branching: int) -> list:
+    """
+    Строки дерева пунктов в порядке обхода в ширину
+    @param size: количество пунктов
+    @param branching: количество дочерних пунктов у каждого пункта
+    @return: список строк пунктов
+    """
+    rows = [{'id': BENCH_ROOT_ID, 'parent_id': None, 'sorted_id': 0, 'name': 'bench'}]
+    for item_id in range(BENCH_ROOT_ID + 1, BENCH_ROOT_ID + size):
+        index = item_id - BENCH_ROOT_ID - 1
+        rows.append({
+            'id': item_id,
+            'parent_id': BENCH_ROOT_ID + index // branching,
+            'sorted_id': index % branching,
+            'name': 'Пункт {:07d}'.format(index)
+        })
+    return rows
+
+
+def to_csv(rows: list) -> io.StringIO:
+    """
+    Файл CSV таблицы пунктов с заголовком
+    """
+    data = io.StringIO()
+    writer = csv.DictWriter(data, fieldnames=['id', 'parent_id', 'sorted_id', 'name'], lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+    data.seek(0)
+    return data
+
+
+def run_import(engine, name: str, load) -> float:
+    """
+    Загрузка в откатываемой транзакции
+    @param engine: движок базы данных
+    @param name: наименование способа загрузки
+    @param load: функция загрузки, принимающая сессию
+    @return: время загрузки в секундах
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection)
+    try:
+        started = time.perf_counter()
+        count = load(session)
+        elapsed = time.perf_counter() - started
+        paths = session.query(ItemModel).filter(ItemModel.path[1] == BENCH_ROOT_ID).count()
+        print('{:<24} {:>9} rows {:>8.3f}s {:>10.0f} rows/s (paths: {})'.format(
+            name, count, elapsed, count / elapsed, paths
+        ))
+        return elapsed
+    finally:
+        transaction.rollback()
+        connection.close()
+
+
+def main(args: argparse.Namespace):
+    settings.configure(ENVVAR_PREFIX_FOR_DYNACONF=False)
+    engine = create_engine(Database(settings.POSTGRES).url)
+    rows = generate_items(args.size, args.branching)
+    # setval не откатывается с транзакцией, поэтому последовательность восстанавливается после загрузки
+    last_value = engine.execute('select last_value from public.item_id_seq').scalar()
+    try:
+        csv_data = to_csv(rows)
+        run_import(engine, 'copy csv', lambda session: import_csv(session, {'item': csv_data})['item'])
+        if args.json:
+            json_data = io.StringIO(json.dumps({'item': rows}, ensure_ascii=False))
+            run_import(engine, 'copy json', lambda session: import_json(session, json_data)['item'])
+
+        def insert_rows(session: Session) -> int:
+            # построчные триггеры вычисляют путь каждого пункта по пути родительского пункта
+            session.execute(ItemModel.__table__.insert(), [dict(row, full_name=row['name']) for row in baseline])
+            return len(baseline)
+
+        baseline = rows[:args.baseline]
+        run_import(engine, 'row insert + triggers', insert_rows)
+    finally:
+        engine.execute("select setval('public.item_id_seq', {})".format(last_value))
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--branching', type=int, default=20)
+    parser.add_argument('--baseline', type=int, default=100000, help='количество пунктов построчной вставки')
+    parser.add_argument('--json', action='store_true', help='загрузка также из JSON-документа')
+    main(parser.parse_args())
@@ -0,0 +1,119 @@
+"""
+Получение доступных пользователю пунктов на большом дереве:
+построчный проход по предкам против материализованного пути и индекса снимка дерева.
+Данные создаются в транзакции, которая откатывается по завершении
+"""
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures.thread import ThreadPoolExecutor
+
+from dynaconf import settings
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from item_menu.api.utils import get_user_items
+from item_menu.cache import MenuTree
+from item_menu.database import Database, AsyncSession
+from item_menu.database.models import ItemModel, ExecutionTypeModel
+
+
+# ID корневого пункта тестового дерева, не пересекающийся с рабочими данными
+BENCH_ROOT_ID = 10 ** 9
+
+
+def seed_tree(session: Session, branching: int, depth: int):
+    """
+    Создание полного дерева пунктов
+    @param session: сессия базы данных
+    @param branching: количество дочерних пунктов у каждого пункта
+    @param depth: глубина дерева
+    @return: список ID конечных пунктов
+    """
+    rows = [{'id': BENCH_ROOT_ID, 'parent_id': None, 'sorted_id': 0, 'name': 'bench', 'full_name': 'bench'}]
+    level = [(BENCH_ROOT_ID, '')]
+    next_id = BENCH_ROOT_ID + 1
+    for _ in range(depth):
+        next_level = []
+        for parent_id, prefix in level:
+            for sorted_id in range(branching):
+                paragraph = '{}.{}'.format(prefix, sorted_id + 1) if prefix else str(sorted_id + 1)
+                name = '{} Пункт {:07d}'.format(paragraph, next_id)
+                rows.append({
+                    'id': next_id, 'parent_id': parent_id, 'sorted_id': sorted_id, 'name': name, 'full_name': name
+                })
+                next_level.append((next_id, paragraph))
+                next_id += 1
+        level = next_level
+    session.execute(ItemModel.__table__.insert(), rows)
+    return [item_id for item_id, _ in level]
+
+
+def legacy_get_user_items(session: Session, user_permissions, root_id: int):
+    """
+    Прежняя реализация: ленивая загрузка каждого предка и проверка вхождения в список
+    """
+    leaf_user_items = session.query(ItemModel).filter(or_(*[
+        ItemModel.name.contains(name) for name in user_permissions
+    ])).all()
+
+    allowed_items = []
+    for item in leaf_user_items:
+        allowed_items.append(item.id)
+        item_parent = item.parent
+        while item_parent.id != root_id and item_parent.id not in allowed_items:
+            allowed_items.append(item_parent.id)
+            item_parent = item_parent.parent
+    return allowed_items
+
+
+async def main(args: argparse.Namespace):
+    settings.configure(ENVVAR_PREFIX_FOR_DYNACONF=False)
+    executor = ThreadPoolExecutor(max_workers=1)
+    db = Database(settings.POSTGRES)
+    await db.initialize(executor)
+
+    sync_session = db._session()
+    try:
+        leaves = seed_tree(sync_session, args.branching, args.depth)
+        sync_session.flush()
+        items_count = sync_session.query(ItemModel).filter(ItemModel.id >= BENCH_ROOT_ID).count()
+        user_permissions = ['Пункт {:07d}'.format(item_id) for item_id in random.sample(leaves, args.permissions)]
+        print('items={} permissions={}'.format(items_count, len(user_permissions)))
+
+        session = AsyncSession(sync_session, executor)
+        results = {}
+
+        started = time.perf_counter()
+        results['legacy'] = set(legacy_get_user_items(sync_session, user_permissions, BENCH_ROOT_ID))
+        print('{:<24} {:>8.3f}s'.format('lazy parent walk', time.perf_counter() - started))
+        sync_session.expunge_all()
+
+        started = time.perf_counter()
+        results['path'] = await get_user_items(session, user_permissions, BENCH_ROOT_ID)
+        print('{:<24} {:>8.3f}s'.format('materialized path', time.perf_counter() - started))
+
+        tree = MenuTree(
+            sync_session.query(ItemModel).filter(ItemModel.id >= BENCH_ROOT_ID).all(),
+            sync_session.query(ExecutionTypeModel).all(),
+            BENCH_ROOT_ID
+        )
+        started = time.perf_counter()
+        results['tree'] = await get_user_items(session, user_permissions, BENCH_ROOT_ID, tree)
+        print('{:<24} {:>8.3f}s'.format('menu tree index', time.perf_counter() - started))
+
+        assert results['legacy'] == results['path'] == results['tree'], 'Results differ'
+        print('allowed items: {}'.format(len(results['path'])))
+    finally:
+        sync_session.rollback()
+        sync_session.close()
+        await db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--branching', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--permissions', type=int, default=500)
+    asyncio.get_event_loop().run_until_complete(main(parser.parse_args()))
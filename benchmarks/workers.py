@@ -0,0 +1,125 @@
+"""
+Пропускная способность сервиса в зависимости от количества процессов (WORKERS.count):
+запросы чтения выполняются резолверами (кэш ответов и ETag отключены), нагрузка создается
+несколькими процессами-клиентами, чтобы клиент не ограничивал пропускную способность сервиса
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from multiprocessing import Pool
+
+from aiohttp import ClientSession, ClientError
+
+
+QUERY = '{ allItems(limit: 50) { id name fullName execType { name } } }'
+
+
+async def load(url: str, concurrency: int, duration: float) -> int:
+    """
+    Нагрузка сервиса одним процессом-клиентом
+    @param url: URL GraphQL-endpoint
+    @param concurrency: количество одновременных запросов
+    @param duration: длительность нагрузки в секундах
+    @return: количество успешных ответов
+    """
+    deadline = time.perf_counter() + duration
+    completed = 0
+
+    async def requests(session: ClientSession):
+        nonlocal completed
+        while time.perf_counter() < deadline:
+            async with session.post(url, json={'query': QUERY}) as resp:
+                await resp.read()
+                if resp.status == 200:
+                    completed += 1
+
+    async with ClientSession() as session:
+        await asyncio.gather(*[requests(session) for _ in range(concurrency)])
+    return completed
+
+
+def run_client(args: tuple) -> int:
+    """
+    Запуск нагрузки в процессе-клиенте
+    @param args: аргументы load
+    @return: количество успешных ответов
+    """
+    return asyncio.new_event_loop().run_until_complete(load(*args))
+
+
+async def ping(url: str) -> int:
+    """
+    Проверка готовности сервиса
+    @param url: URL GraphQL-endpoint
+    @return: статус ответа
+    """
+    async with ClientSession() as session:
+        async with session.post(url, json={'query': QUERY}) as resp:
+            return resp.status
+
+
+def start_service(workers: int, port: int) -> subprocess.Popen:
+    """
+    Запуск сервиса с заданным количеством процессов и ожидание готовности
+    @param workers: количество процессов
+    @param port: порт сервиса
+    @return: процесс сервиса
+    """
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WORKERS__count=str(workers),
+        CACHE__responses__enabled='false',
+        CACHE__etag__enabled='false',
+        # журнал запросов не учитывается в измерении
+        LOGGING__root__level='WARNING'
+    )
+    process = subprocess.Popen(
+        [sys.executable, 'main.py'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = 'http://127.0.0.1:{}/graphql'.format(port)
+    for _ in range(100):
+        try:
+            if asyncio.new_event_loop().run_until_complete(ping(url)) == 200:
+                break
+        except (ClientError, OSError):
+            pass
+        time.sleep(0.1)
+    # прогрев: сборка дерева меню и документов запросов в каждом процессе
+    run_client((url, workers * 2, 1.0))
+    return process
+
+
+def main(args: argparse.Namespace):
+    url = 'http://127.0.0.1:{}/graphql'.format(args.port)
+    print('clients={} concurrency={} duration={}s cpu={}'.format(
+        args.clients, args.concurrency, args.duration, os.cpu_count()
+    ))
+    baseline = None
+    for workers in args.workers:
+        process = start_service(workers, args.port)
+        try:
+            with Pool(args.clients) as pool:
+                completed = sum(pool.map(
+                    run_client, [(url, args.concurrency, args.duration)] * args.clients
+                ))
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait()
+        rps = completed / args.duration
+        baseline = baseline or rps
+        print('workers={:<3} {:>8.1f} req/s  x{:.2f}'.format(workers, rps, rps / baseline))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--port', type=int, default=8090)
+    main(parser.parse_args())
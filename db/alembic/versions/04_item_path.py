@@ -0,0 +1,112 @@
+"""Item materialized path
+
+Revision ID: 5f0c2b9e8d41
+Revises: 364d9ba8bacd
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '5f0c2b9e8d41'
+down_revision = '364d9ba8bacd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('item',
+                  sa.Column('path', postgresql.ARRAY(sa.BigInteger()), nullable=True,
+                            comment='Путь от корневого пункта до пункта включительно'),
+                  schema='public')
+    # заполнение путей существующих пунктов
+    op.execute("""
+        with recursive tree as (
+            select id, array[id]::int8[] as path
+            from public.item
+            where parent_id is null
+            union all
+            select item.id, tree.path || item.id
+            from public.item item
+            join tree on item.parent_id = tree.id
+        )
+        update public.item
+        set path = tree.path
+        from tree
+        where item.id = tree.id
+    """)
+    op.alter_column('item', 'path', nullable=False, schema='public')
+    op.create_index('ix_item_path', 'item', ['path'], schema='public', postgresql_using='gin')
+
+    op.execute("""
+        create or replace function public.item_path_set()
+         returns trigger
+         language plpgsql
+        as $function$
+        declare
+            parent_path int8[];
+        begin
+            if new.parent_id is null then
+                new.path := array[new.id];
+                return new;
+            end if;
+
+            select into parent_path
+                path
+            from public.item
+            where id = new.parent_id;
+
+            if parent_path @> array[new.id] then
+                raise exception 'Item % cannot be moved into its own subtree', new.id;
+            end if;
+
+            new.path := parent_path || new.id;
+            return new;
+        end;
+        $function$;
+    """)
+    op.execute("""
+        create or replace function public.item_path_cascade()
+         returns trigger
+         language plpgsql
+        as $function$
+        begin
+            update public.item
+            set path = new.path || path[array_length(old.path, 1) + 1:]
+            where path @> array[new.id]
+              and id <> new.id;
+            return null;
+        end;
+        $function$;
+    """)
+    op.execute("""
+        create trigger auto_set_path before
+        insert
+            on
+            public.item for each row execute function item_path_set()
+    """)
+    op.execute("""
+        create trigger auto_update_path before
+        update of parent_id
+            on
+            public.item for each row
+            when (old.parent_id is distinct from new.parent_id) execute function item_path_set()
+    """)
+    op.execute("""
+        create trigger auto_update_children_path after
+        update of parent_id
+            on
+            public.item for each row
+            when (old.parent_id is distinct from new.parent_id) execute function item_path_cascade()
+    """)
+
+
+def downgrade():
+    op.execute('drop trigger if exists auto_update_children_path on public.item')
+    op.execute('drop trigger if exists auto_update_path on public.item')
+    op.execute('drop trigger if exists auto_set_path on public.item')
+    op.execute('drop function if exists public.item_path_cascade()')
+    op.execute('drop function if exists public.item_path_set()')
+
+    op.drop_index('ix_item_path', table_name='item', schema='public')
+    op.drop_column('item', 'path', schema='public')
@@ -0,0 +1,37 @@
+"""Item name trigram indexes
+
+Revision ID: 9b1e4a7c2d63
+Revises: 5f0c2b9e8d41
+
+"""
+from alembic import op
+
+revision = '9b1e4a7c2d63'
+down_revision = '5f0c2b9e8d41'
+branch_labels = None
+depends_on = None
+
+
+TRGM_INDEXES = {
+    'ix_item_name_trgm': 'name',
+    'ix_item_full_name_trgm': 'full_name'
+}
+
+
+def upgrade():
+    # индексы объявлены в модели ItemModel: без расширения схема БД расходится с моделью
+    # (autogenerate создает индексы повторно), поэтому миграция завершается ошибкой
+    available = op.get_bind().execute("select 1 from pg_available_extensions where name = 'pg_trgm'").scalar()
+    if not available:
+        raise RuntimeError('Extension pg_trgm is not available: install PostgreSQL contrib package')
+
+    op.execute('create extension if not exists pg_trgm')
+    # индексы для поиска по частичному совпадению (ILIKE '%...%') в наименованиях пунктов
+    for index_name, column in TRGM_INDEXES.items():
+        op.create_index(index_name, 'item', [column], schema='public',
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    for index_name in TRGM_INDEXES:
+        op.execute('drop index if exists public.{}'.format(index_name))
@@ -0,0 +1,29 @@
+"""Persisted queries
+
+Revision ID: 2c8d5f1a9e07
+Revises: 9b1e4a7c2d63
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '2c8d5f1a9e07'
+down_revision = '9b1e4a7c2d63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('persisted_query',
+                    sa.Column('hash', sa.Text(), nullable=False, comment='SHA-256 хэш текста запроса'),
+                    sa.Column('query', sa.Text(), nullable=False, comment='Текст запроса'),
+                    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'),
+                              nullable=False, comment='Время сохранения запроса'),
+                    sa.PrimaryKeyConstraint('hash'),
+                    schema='public',
+                    comment='Сохраненные тексты GraphQL-запросов (automatic persisted queries)'
+                    )
+
+
+def downgrade():
+    op.drop_table('persisted_query', schema='public')
@@ -0,0 +1,72 @@
+"""Bulk import triggers bypass
+
+Revision ID: 7e3a9c5b1d28
+Revises: 2c8d5f1a9e07
+
+"""
+from alembic import op
+
+revision = '7e3a9c5b1d28'
+down_revision = '2c8d5f1a9e07'
+branch_labels = None
+depends_on = None
+
+
+# построчные триггеры пунктов пропускаются при массовой загрузке меню (set local item_menu.bulk_import = 'on'):
+# полное наименование, порядок сортировки и пути вычисляются загрузкой для всех строк одним запросом
+BULK_IMPORT_OFF = "current_setting('item_menu.bulk_import', true) is distinct from 'on'"
+
+
+def _create_triggers(condition: str = None):
+    when = ' when ({})'.format(condition) if condition else ''
+    and_condition = ' and {}'.format(condition) if condition else ''
+    op.execute("""
+        create trigger auto_add_full_name before
+        insert
+            on
+            public.item for each row{when} execute function full_name_add()
+    """.format(when=when))
+    op.execute("""
+        create trigger auto_increment_sorted_id before
+        insert
+            on
+            public.item for each row{when} execute function sorted_id_increment()
+    """.format(when=when))
+    op.execute("""
+        create trigger auto_set_path before
+        insert
+            on
+            public.item for each row{when} execute function item_path_set()
+    """.format(when=when))
+    op.execute("""
+        create trigger auto_update_path before
+        update of parent_id
+            on
+            public.item for each row
+            when (old.parent_id is distinct from new.parent_id{condition}) execute function item_path_set()
+    """.format(condition=and_condition))
+    op.execute("""
+        create trigger auto_update_children_path after
+        update of parent_id
+            on
+            public.item for each row
+            when (old.parent_id is distinct from new.parent_id{condition}) execute function item_path_cascade()
+    """.format(condition=and_condition))
+
+
+def _drop_triggers():
+    op.execute('drop trigger if exists auto_update_children_path on public.item')
+    op.execute('drop trigger if exists auto_update_path on public.item')
+    op.execute('drop trigger if exists auto_set_path on public.item')
+    op.execute('drop trigger if exists auto_increment_sorted_id on public.item')
+    op.execute('drop trigger if exists auto_add_full_name on public.item')
+
+
+def upgrade():
+    _drop_triggers()
+    _create_triggers(BULK_IMPORT_OFF)
+
+
+def downgrade():
+    _drop_triggers()
+    _create_triggers()
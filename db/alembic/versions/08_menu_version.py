@@ -0,0 +1,56 @@
+"""Menu version
+
+Revision ID: 4f6b2e8d0a13
+Revises: 7e3a9c5b1d28
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '4f6b2e8d0a13'
+down_revision = '7e3a9c5b1d28'
+branch_labels = None
+depends_on = None
+
+
+MENU_TABLES = ('item', 'exec_type', 'root')
+
+
+def upgrade():
+    op.create_table('menu_version',
+                    sa.Column('id', sa.Boolean(), server_default=sa.text('true'), nullable=False,
+                              comment='Единственная строка таблицы'),
+                    sa.Column('version', sa.BigInteger(), server_default=sa.text('0'), nullable=False,
+                              comment='Версия данных меню'),
+                    sa.CheckConstraint('id', name='menu_version_single_row'),
+                    sa.PrimaryKeyConstraint('id'),
+                    schema='public',
+                    comment='Версия данных меню, увеличивается при каждом изменении таблиц меню'
+                    )
+    op.execute('insert into public.menu_version (id, version) values (true, 0)')
+    op.execute("""
+        create or replace function public.menu_version_increment()
+         returns trigger
+         language plpgsql
+        as $function$
+        begin
+            update public.menu_version set version = version + 1;
+            return null;
+        end;
+        $function$;
+    """)
+    # триггер уровня оператора: пакетные изменения и массовая загрузка увеличивают версию один раз на запрос
+    for table in MENU_TABLES:
+        op.execute("""
+            create trigger auto_increment_menu_version after
+            insert or update or delete or truncate
+                on
+                public.{table} for each statement execute function menu_version_increment()
+        """.format(table=table))
+
+
+def downgrade():
+    for table in MENU_TABLES:
+        op.execute('drop trigger if exists auto_increment_menu_version on public.{}'.format(table))
+    op.execute('drop function if exists public.menu_version_increment()')
+    op.drop_table('menu_version', schema='public')
@@ -0,0 +1,46 @@
+"""Menu changes notify
+
+Revision ID: 8a2d4c6e1f35
+Revises: 4f6b2e8d0a13
+
+"""
+from alembic import op
+
+revision = '8a2d4c6e1f35'
+down_revision = '4f6b2e8d0a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # уведомление доставляется слушателям (процессам сервиса) только после фиксации транзакции
+    op.execute("""
+        create or replace function public.menu_version_increment()
+         returns trigger
+         language plpgsql
+        as $function$
+        declare
+            new_version int8;
+        begin
+            update public.menu_version set version = version + 1 returning version into new_version;
+            perform pg_notify(
+                'menu_changes', json_build_object('table', tg_table_name, 'version', new_version)::text
+            );
+            return null;
+        end;
+        $function$;
+    """)
+
+
+def downgrade():
+    op.execute("""
+        create or replace function public.menu_version_increment()
+         returns trigger
+         language plpgsql
+        as $function$
+        begin
+            update public.menu_version set version = version + 1;
+            return null;
+        end;
+        $function$;
+    """)
@@ -0,0 +1,118 @@
+"""Menu version on commit
+
+Revision ID: 3c7e9a1b5d42
+Revises: 8a2d4c6e1f35
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '3c7e9a1b5d42'
+down_revision = '8a2d4c6e1f35'
+branch_labels = None
+depends_on = None
+
+
+MENU_TABLES = ('item', 'exec_type', 'root')
+# события триггеров и таблица переходов с измененными строками (TRUNCATE - без таблицы переходов)
+EVENTS = (
+    ('insert', 'referencing new table as changed_rows'),
+    ('update', 'referencing new table as changed_rows'),
+    ('delete', 'referencing old table as changed_rows'),
+    ('truncate', '')
+)
+
+
+def upgrade():
+    op.create_table('menu_version_pending',
+                    sa.Column('txid', sa.BigInteger(), autoincrement=False, nullable=False,
+                              comment='ID транзакции, изменившей таблицы меню'),
+                    sa.PrimaryKeyConstraint('txid'),
+                    schema='public',
+                    comment='Транзакции, изменившие таблицы меню, до увеличения версии данных меню при фиксации'
+                    )
+    for table in MENU_TABLES:
+        op.execute('drop trigger if exists auto_increment_menu_version on public.{}'.format(table))
+    op.execute('drop function if exists public.menu_version_increment()')
+
+    # отметка транзакции: версия увеличивается один раз на транзакцию и только при изменении строк
+    op.execute("""
+        create or replace function public.menu_version_mark_changed()
+         returns trigger
+         language plpgsql
+        as $function$
+        begin
+            if tg_op <> 'TRUNCATE' and not exists (select 1 from changed_rows) then
+                return null;
+            end if;
+            if current_setting('item_menu.menu_version_pending', true) is distinct from 'on' then
+                perform set_config('item_menu.menu_version_pending', 'on', true);
+                insert into public.menu_version_pending (txid) values (txid_current());
+            end if;
+            return null;
+        end;
+        $function$;
+    """)
+    # отложенный триггер выполняется при фиксации транзакции, поэтому блокировка строки версии удерживается
+    # только на время фиксации, а версии увеличиваются в порядке фиксации транзакций
+    op.execute("""
+        create or replace function public.menu_version_increment()
+         returns trigger
+         language plpgsql
+        as $function$
+        declare
+            new_version int8;
+        begin
+            update public.menu_version set version = version + 1 returning version into new_version;
+            delete from public.menu_version_pending where txid = new.txid;
+            perform pg_notify('menu_changes', json_build_object('version', new_version)::text);
+            return null;
+        end;
+        $function$;
+    """)
+    op.execute("""
+        create constraint trigger auto_increment_menu_version after
+        insert
+            on
+            public.menu_version_pending deferrable initially deferred
+            for each row execute function menu_version_increment()
+    """)
+    for table in MENU_TABLES:
+        for event, referencing in EVENTS:
+            op.execute("""
+                create trigger auto_mark_menu_changed_{event} after {event}
+                    on
+                    public.{table} {referencing} for each statement execute function menu_version_mark_changed()
+            """.format(table=table, event=event, referencing=referencing))
+
+
+def downgrade():
+    for table in MENU_TABLES:
+        for event, _ in EVENTS:
+            op.execute('drop trigger if exists auto_mark_menu_changed_{} on public.{}'.format(event, table))
+    op.execute('drop trigger if exists auto_increment_menu_version on public.menu_version_pending')
+    op.execute('drop function if exists public.menu_version_mark_changed()')
+    op.drop_table('menu_version_pending', schema='public')
+    op.execute("""
+        create or replace function public.menu_version_increment()
+         returns trigger
+         language plpgsql
+        as $function$
+        declare
+            new_version int8;
+        begin
+            update public.menu_version set version = version + 1 returning version into new_version;
+            perform pg_notify(
+                'menu_changes', json_build_object('table', tg_table_name, 'version', new_version)::text
+            );
+            return null;
+        end;
+        $function$;
+    """)
+    for table in MENU_TABLES:
+        op.execute("""
+            create trigger auto_increment_menu_version after
+            insert or update or delete or truncate
+                on
+                public.{table} for each statement execute function menu_version_increment()
+        """.format(table=table))
@@ -3,25 +3,36 @@
 """
 from typing import Dict, Any
 
-from aiohttp_graphql import GraphQLView
 from graphene import Schema
+from graphql import GraphQLBackend
 from graphql.execution.executors.asyncio import AsyncioExecutor
 
 from item_menu.api.queries import Query
 from item_menu.api.mutations import Mutation
+from item_menu.api.persisted_queries import PersistedQueryStore
+from item_menu.api.views import ItemMenuGraphQLView
+from item_menu.cache import ResponseCache
 
 
 schema = Schema(query=Query, mutation=Mutation)
 
 
-def get_view(context: Dict[str, Any], graphiql: bool) -> GraphQLView:
+def get_view(context: Dict[str, Any], graphiql: bool, backend: GraphQLBackend = None,
+             persisted_queries: PersistedQueryStore = None,
+             response_cache: ResponseCache = None) -> ItemMenuGraphQLView:
     """
     Получение GraphQl-view
     @param context: контекстный словарь вэб-сессии
     @param graphiql: флаг подключения GraphiQL-клиента
+    @param backend: бэкенд разбора и выполнения запросов (опционально)
+    @param persisted_queries: хранилище сохраненных запросов (опционально)
+    @param response_cache: кэш ответов на запросы чтения (опционально)
     @return: объект GraphQL-view
     """
-    view = GraphQLView(
+    view = ItemMenuGraphQLView(
+        backend=backend,
+        persisted_queries=persisted_queries,
+        response_cache=response_cache,
         schema=schema,
         context=context,
         executor=AsyncioExecutor(),
@@ -0,0 +1,74 @@
+"""
+Бэкенд GraphQL с кэшированием разобранных и проверенных документов запросов
+"""
+from functools import partial
+from hashlib import sha256
+from typing import Any, Dict, List, Union
+
+from graphql import GraphQLCoreBackend
+from graphql.backend.base import GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+from graphql.language import ast
+from graphql.type.schema import GraphQLSchema
+from graphql.validation import validate
+
+from item_menu.cache import LRUCache
+
+
+def _invalid_result(errors: List[Exception], *_args, **_kwargs) -> ExecutionResult:
+    """
+    Результат выполнения документа, не прошедшего проверку по схеме
+    @param errors: ошибки проверки
+    @return: результат выполнения с ошибками
+    """
+    return ExecutionResult(errors=errors, invalid=True)
+
+
+class CachedDocumentBackend(GraphQLCoreBackend):
+    """
+    Бэкенд, разбирающий и проверяющий текст запроса по схеме один раз:
+    повторные запросы с тем же текстом выполняются по документу из LRU-кэша
+    """
+    def __init__(self, maxsize: int):
+        """
+        Инициализация бэкенда
+        @param maxsize: максимальное количество документов в кэше
+        """
+        super().__init__()
+        self.documents = LRUCache(maxsize)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика использования кэша документов
+        @return: словарь счетчиков
+        """
+        return self.documents.stats
+
+    def document_from_string(self, schema: GraphQLSchema,
+                             document_string: Union[ast.Document, str]) -> GraphQLDocument:
+        """
+        Получение документа запроса из кэша либо его разбор и проверка
+        @param schema: схема
+        @param document_string: текст запроса
+        @return: документ запроса
+        """
+        if not isinstance(document_string, str):
+            return super().document_from_string(schema, document_string)
+
+        key = (id(schema), sha256(document_string.encode()).hexdigest())
+        document = self.documents.get(key)
+        if document is not None:
+            return document
+
+        # синтаксическая ошибка разбора передается дальше и не кэшируется
+        document = super().document_from_string(schema, document_string)
+        validation_errors = validate(schema, document.document_ast)
+        if validation_errors:
+            document.execute = partial(_invalid_result, validation_errors)
+        else:
+            # проверка по схеме уже выполнена, поэтому документ выполняется без повторной проверки
+            document.execute = partial(execute, schema, document.document_ast, **self.execute_params)
+
+        self.documents.set(key, document)
+        return document
@@ -1,7 +1,14 @@
 """
 Connection-классы для схем запросов
 """
+from typing import Any, Dict
+
 from graphene import Connection, Int
+from graphene.relay import PageInfo
+from graphene_sqlalchemy import SQLAlchemyConnectionField
+from graphql import ResolveInfo
+
+from item_menu.api.pagination import KeysetPage
 
 
 class ItemConnection(Connection):
@@ -15,4 +22,36 @@ class ItemConnection(Connection):
 
     @staticmethod
     async def resolve_total_count(root, _info) -> int:
+        # отдельный запрос количества выполняется только при запросе поля
+        count = getattr(root, 'count', None)
+        if count is not None:
+            return await count()
         return len(root.iterable)
+
+
+class KeysetConnectionField(SQLAlchemyConnectionField):
+    """
+    Поле-connection, строящее ребра по странице keyset-пагинации с курсорами по ключу сортировки
+    """
+    @classmethod
+    def resolve_connection(cls, connection_type: Any, model: Any, info: ResolveInfo,
+                           args: Dict[str, Any], resolved: Any) -> Any:
+        # ошибка резолвера (возвращается декоратором логирования) передается в ответ как есть
+        if isinstance(resolved, Exception):
+            return resolved
+        if not isinstance(resolved, KeysetPage):
+            return super().resolve_connection(connection_type, model, info, args, resolved)
+
+        edges = [connection_type.Edge(node=item, cursor=resolved.get_cursor(item)) for item in resolved.items]
+        connection = connection_type(
+            edges=edges,
+            page_info=PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=resolved.has_previous_page,
+                has_next_page=resolved.has_next_page
+            )
+        )
+        connection.iterable = resolved.items
+        connection.count = resolved.count
+        return connection
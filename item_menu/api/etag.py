@@ -0,0 +1,104 @@
+"""
+Условные запросы чтения: ETag ответа по версии данных меню, правам пользователя и тексту запроса
+"""
+import json
+from hashlib import sha256
+from typing import Any, Dict, Optional
+
+from graphql import GraphQLBackend, get_default_backend
+from graphql.language import ast
+from graphql.type.schema import GraphQLSchema
+
+from item_menu.database import AsyncSession
+from item_menu.database.models import MenuVersionModel
+
+
+# поля запроса, результат которых меняется без изменения данных меню
+VOLATILE_FIELDS = frozenset(['cacheStats'])
+
+
+def get_read_query_hash(schema: GraphQLSchema, backend: Optional[GraphQLBackend], query: Optional[str],
+                        variables: Optional[Dict[str, Any]], operation_name: Optional[str]) -> Optional[str]:
+    """
+    Хэш запроса чтения, результат которого зависит только от данных меню и прав пользователя
+    @param schema: схема
+    @param backend: бэкенд разбора запросов (опционально, по умолчанию бэкенд graphql-core)
+    @param query: текст запроса
+    @param variables: переменные запроса
+    @param operation_name: наименование выполняемой операции
+    @return: хэш запроса (опционально, если запрос не является запросом чтения либо содержит ошибки)
+    """
+    if not query:
+        return None
+    try:
+        document = (backend or get_default_backend()).document_from_string(schema, query)
+    except Exception:
+        # ошибки разбора возвращаются при выполнении запроса
+        return None
+
+    operation = _get_operation(document.document_ast, operation_name)
+    if operation is None or operation.operation != 'query':
+        return None
+    for selection in operation.selection_set.selections:
+        # фрагменты верхнего уровня не разбираются, запрос выполняется без ETag
+        if not isinstance(selection, ast.Field) or selection.name.value in VOLATILE_FIELDS:
+            return None
+
+    key = json.dumps([query, operation_name, variables], sort_keys=True, ensure_ascii=False, default=str)
+    return sha256(key.encode()).hexdigest()
+
+
+def _get_operation(document_ast: ast.Document, operation_name: Optional[str]) -> Optional[ast.OperationDefinition]:
+    """
+    Выполняемая операция документа
+    @param document_ast: документ запроса
+    @param operation_name: наименование операции (опционально, если операция одна)
+    @return: операция (опционально, если операция не найдена)
+    """
+    operations = [
+        definition for definition in document_ast.definitions if isinstance(definition, ast.OperationDefinition)
+    ]
+    if not operation_name:
+        return operations[0] if len(operations) == 1 else None
+    for operation in operations:
+        if operation.name and operation.name.value == operation_name:
+            return operation
+    return None
+
+
+async def get_menu_version(session: AsyncSession) -> Optional[int]:
+    """
+    Текущая версия данных меню в базе данных
+    @param session: сессия базы данных
+    @return: версия (опционально, если таблица версии не заполнена)
+    """
+    return await session.scalar(session.query(MenuVersionModel.version))
+
+
+def get_etag(service_version: str, menu_version: int, fingerprint: str, query_hash: str) -> str:
+    """
+    ETag ответа на запрос чтения
+    @param service_version: версия сервиса (формат ответа может меняться между версиями)
+    @param menu_version: версия данных меню
+    @param fingerprint: отпечаток набора прав пользователя (пустая строка без интеграции с сервисом авторизации)
+    @param query_hash: хэш запроса
+    @return: значение заголовка ETag
+    """
+    key = '\n'.join((str(service_version).strip(), str(menu_version), fingerprint, query_hash))
+    return '"{}"'.format(sha256(key.encode()).hexdigest()[:32])
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Совпадение ETag со значением заголовка If-None-Match (список ETag через запятую, слабое сравнение)
+    @param if_none_match: значение заголовка
+    @param etag: ETag ответа
+    @return: флаг совпадения
+    """
+    if not if_none_match:
+        return False
+    for value in if_none_match.split(','):
+        value = value.strip()
+        if value == '*' or (value[2:] if value.startswith('W/') else value) == etag:
+            return True
+    return False
@@ -0,0 +1,165 @@
+"""
+Потоковая выгрузка пунктов меню и административные выгрузка и загрузка всего меню
+"""
+import hmac
+import json
+import logging
+from codecs import getincrementaldecoder
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+from typing import IO, Optional
+
+from aiohttp import web
+from aiohttp.web_request import Request
+
+from item_menu.database import AsyncSession
+from item_menu.database.models import ItemModel
+from item_menu.database.transfer import FORMATS, TABLES, TransferError, export_csv, import_csv, import_json, iter_json
+
+
+# размер части тела запроса либо ответа при загрузке и выгрузке меню
+CHUNK_SIZE = 64 * 1024
+
+
+async def stream_items(request: Request) -> web.StreamResponse:
+    """
+    Выгрузка всех пунктов в формате NDJSON (одна JSON-строка на пункт).
+    Строки читаются серверным курсором порциями и отправляются клиенту по мере чтения,
+    поэтому объем памяти не зависит от количества пунктов
+    @param request: данные запроса
+    @return: потоковый ответ
+    """
+    session = request['session']  # type: AsyncSession
+    batch_size = request.app.context['config'].EXPORT.batch_size
+
+    response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson; charset=utf-8'})
+    await response.prepare(request)
+
+    columns = ItemModel.__table__.columns
+    query = session.query(*columns).order_by(ItemModel.id).yield_per(batch_size)
+    rows = await session.run(iter, query)
+    while True:
+        batch = await session.run(list, islice(rows, batch_size))
+        if not batch:
+            break
+        lines = (json.dumps(row._asdict(), ensure_ascii=False) + '\n' for row in batch)
+        await response.write(''.join(lines).encode())
+
+    await response.write_eof()
+    return response
+
+
+def _validate_admin_request(request: Request) -> Optional[web.Response]:
+    """
+    Проверка доступа к административным эндпоинтам по заголовку X-Admin-Token и параметров формата
+    @param request: данные запроса
+    @return: ответ с ошибкой либо None
+    """
+    token = request.app.context['config'].ADMIN.token
+    # без заданного токена административные эндпоинты недоступны
+    if not token or not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return web.Response(status=403, text='Invalid admin token')
+    data_format = request.query.get('format', 'json')
+    if data_format not in FORMATS:
+        return web.Response(status=400, text='Unknown format: {}'.format(data_format))
+    if data_format == 'csv' and request.query.get('table') not in TABLES:
+        return web.Response(status=400, text='Parameter table must be one of: {}'.format(', '.join(TABLES)))
+    return None
+
+
+def _get_buffer(request: Request, binary: bool = False) -> IO:
+    """
+    Буфер выгрузки либо загрузки меню: в памяти до EXPORT.buffer_size байт (символов), сверх - во временном файле
+    @param request: данные запроса
+    @param binary: флаг двоичного буфера
+    @return: буфер
+    """
+    max_size = request.app.context['config'].EXPORT.buffer_size
+    if binary:
+        return SpooledTemporaryFile(max_size=max_size, mode='w+b')
+    return SpooledTemporaryFile(max_size=max_size, mode='w+', encoding='utf-8', newline='')
+
+
+async def export_menu(request: Request) -> web.StreamResponse:
+    """
+    Выгрузка меню: все таблицы одним JSON-документом (format=json)
+    либо одна таблица в формате CSV с заголовком (format=csv&table=item)
+    @param request: данные запроса
+    @return: потоковый ответ
+    """
+    error = _validate_admin_request(request)
+    if error is not None:
+        return error
+    data_format = request.query.get('format', 'json')
+    session = request['session']  # type: AsyncSession
+
+    if data_format == 'json':
+        response = web.StreamResponse(headers={'Content-Type': 'application/json; charset=utf-8'})
+        await response.prepare(request)
+        chunks = await session.run(
+            iter_json, session.sync_session, request.app.context['config'].EXPORT.batch_size
+        )
+        while True:
+            chunk = await session.run(next, chunks, None)
+            if chunk is None:
+                break
+            await response.write(chunk.encode())
+        await response.write_eof()
+        return response
+
+    table = request.query['table']
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/csv; charset=utf-8',
+        'Content-Disposition': 'attachment; filename="{}.csv"'.format(table)
+    })
+    # COPY пишет таблицу в файл синхронно, поэтому таблица буферизуется до отправки
+    with _get_buffer(request, binary=True) as buffer:
+        await session.run(export_csv, session.sync_session, table, buffer)
+        buffer.seek(0)
+        await response.prepare(request)
+        while True:
+            chunk = buffer.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            await response.write(chunk)
+    await response.write_eof()
+    return response
+
+
+async def import_menu(request: Request) -> web.Response:
+    """
+    Загрузка меню из тела запроса: JSON-документ выгрузки (format=json)
+    либо одна таблица в формате CSV с заголовком (format=csv&table=item).
+    С параметром replace=true строки загружаемых таблиц, отсутствующие в загрузке, удаляются
+    @param request: данные запроса
+    @return: количество загруженных строк по таблицам
+    """
+    error = _validate_admin_request(request)
+    if error is not None:
+        return error
+    data_format = request.query.get('format', 'json')
+    replace = request.query.get('replace', '').lower() in ('1', 'true')
+    session = request['session']  # type: AsyncSession
+
+    # тело запроса читается потоком без ограничения client_max_size
+    with _get_buffer(request) as buffer:
+        decoder = getincrementaldecoder('utf-8')()
+        try:
+            while True:
+                chunk = await request.content.read(CHUNK_SIZE)
+                buffer.write(decoder.decode(chunk, final=not chunk))
+                if not chunk:
+                    break
+            buffer.seek(0)
+            if data_format == 'json':
+                counts = await session.run(import_json, session.sync_session, buffer, replace)
+            else:
+                counts = await session.run(
+                    import_csv, session.sync_session, {request.query['table']: buffer}, replace
+                )
+        except (TransferError, UnicodeDecodeError) as e:
+            await session.rollback()
+            return web.Response(status=400, text='Menu import is failed: {}'.format(e))
+
+    logging.info('Menu is imported: {}'.format(dict(counts)))
+    return web.json_response(counts)
@@ -1,13 +1,19 @@
 """
 Фильтры для запросов
 """
-from typing import Callable, Union, List, Dict
+from typing import Callable, Union, List, Dict, Iterable
 
 from graphene import Boolean, String, Int, InputObjectType
+from sqlalchemy import false, or_
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import ClauseElement
 
 from item_menu.database.models import ItemModel
 
 
+LIKE_ESCAPE = '\\'  # символ экранирования спецсимволов шаблона LIKE
+
+
 class ItemFilter(InputObjectType):
     """
     Фильтр пунктов
@@ -45,6 +51,50 @@ class ItemFilter(InputObjectType):
         }
         return fields_filter_dict.get(field)
 
+    @staticmethod
+    def _get_contains_pattern(value: str) -> str:
+        """
+        Шаблон LIKE для частичного совпадения с экранированием спецсимволов
+        @param value: искомая строка
+        @return: шаблон
+        """
+        value = value.strip()
+        for symbol in (LIKE_ESCAPE, '%', '_'):
+            value = value.replace(symbol, LIKE_ESCAPE + symbol)
+        return '%{}%'.format(value)
+
+    @staticmethod
+    def _resolve_criterion(field: str, value: Union[int, str, bool, Iterable[int]]) -> ClauseElement:
+        """
+        Получение SQL-условия фильтрации, аналогичного условию фильтрации в памяти
+        @param field: поле, по которому производится фильтрация
+        @param value: введенное значение для поля фильтрации
+        @return: условие для фильтрации в запросе
+        """
+        fields_criteria_dict = {
+            'id': lambda: ItemModel.id == value,
+            'visible': lambda: ItemModel.visible == value,
+            # ILIKE по шаблону '%...%' отдельно по каждому полю использует триграммные индексы наименований
+            'name_like': lambda: or_(*[
+                column.ilike(ItemFilter._get_contains_pattern(value), escape=LIKE_ESCAPE)
+                for column in (ItemModel.name, ItemModel.full_name)
+            ]),
+            'paragraph': lambda: ItemModel.name.startswith('{}.'.format(value)),
+            'permission': lambda: ItemModel.id.in_(value) if value else false()
+        }
+        return fields_criteria_dict[field]()
+
+    @staticmethod
+    async def filter_query(query: Query, filters: Dict[str, Union[int, str, bool, Iterable[int]]]) -> Query:
+        """
+        Фильтрация запроса на уровне базы данных по всем признакам, описанным в введенных в фильтрах данных
+        @param query: запрос пунктов в базу данных
+        @param filters: словарь вида поле для фильтрации - значение для фильтрации
+        @return: отфильтрованный запрос
+        """
+        criteria = [ItemFilter._resolve_criterion(field, value) for field, value in filters.items()]
+        return query.filter(*criteria) if criteria else query
+
     async def filter_items(self) -> List[ItemModel]:
         """
         Фильтрация пунктов по всем признакам, описанным в введенных в фильтрах данных
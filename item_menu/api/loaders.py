@@ -0,0 +1,125 @@
+"""
+Загрузчики данных с объединением обращений резолверов одного запроса в одно обращение к базе данных
+"""
+from asyncio import Future, ensure_future, get_event_loop
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from graphql import ResolveInfo
+
+from item_menu.api.filters import ItemFilter
+from item_menu.database import AsyncSession
+from item_menu.database.models import ItemModel, ExecutionTypeModel
+
+
+class DataLoader:
+    """
+    Загрузчик, собирающий ключи всех обращений, выполненных за одну итерацию событийного цикла,
+    и загружающий их одним пакетом. Результаты загрузки ключей сохраняются до конца запроса
+    """
+    def __init__(self, batch_load: Callable[[List[Hashable]], Awaitable[List[Any]]]):
+        """
+        Инициализация загрузчика
+        @param batch_load: функция пакетной загрузки, возвращающая значения в порядке ключей
+        """
+        self._batch_load = batch_load
+        self._futures = {}  # type: Dict[Hashable, Future]
+        self._queue = []  # type: List[Hashable]
+        self.batches = 0
+
+    def load(self, key: Hashable) -> Future:
+        """
+        Получение значения по ключу
+        @param key: ключ
+        @return: future значения
+        """
+        future = self._futures.get(key)
+        if future is None:
+            future = get_event_loop().create_future()
+            self._futures[key] = future
+            self._queue.append(key)
+            # загрузка выполняется после того, как все резолверы текущей итерации цикла запросят свои ключи
+            if len(self._queue) == 1:
+                get_event_loop().call_soon(self._dispatch)
+        return future
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        self.batches += 1
+        ensure_future(self._load_batch(keys))
+
+    async def _load_batch(self, keys: List[Hashable]):
+        try:
+            values = await self._batch_load(keys)
+        except Exception as e:
+            for key in keys:
+                self._futures.pop(key).set_exception(e)
+            return
+        for key, value in zip(keys, values):
+            self._futures[key].set_result(value)
+
+
+def _freeze(filters: Dict[str, Any]) -> Hashable:
+    """
+    Неизменяемое представление фильтров для использования в качестве ключа загрузчика
+    @param filters: словарь фильтров
+    @return: кортеж пар поле - значение
+    """
+    return tuple(sorted(
+        (field, frozenset(value) if isinstance(value, (set, frozenset, list)) else value)
+        for field, value in filters.items()
+    ))
+
+
+def get_loader(info: ResolveInfo, key: Hashable,
+               batch_load: Callable[[List[Hashable]], Awaitable[List[Any]]]) -> DataLoader:
+    """
+    Получение загрузчика, общего для всех резолверов запроса
+    @param info: данные запроса
+    @param key: ключ загрузчика
+    @param batch_load: функция пакетной загрузки (используется при создании загрузчика)
+    @return: загрузчик
+    """
+    loaders = info.context.setdefault('loaders', {})
+    loader = loaders.get(key)
+    if loader is None:
+        loader = loaders[key] = DataLoader(batch_load)
+    return loader
+
+
+def get_children_loader(info: ResolveInfo, filters: Optional[Dict[str, Any]] = None) -> DataLoader:
+    """
+    Загрузчик дочерних пунктов по ID родительских пунктов с фильтрацией и сортировкой на уровне базы данных
+    @param info: данные запроса
+    @param filters: фильтры дочерних пунктов
+    @return: загрузчик списков дочерних пунктов, отсортированных по порядковому ID
+    """
+    filters = filters or {}
+    session = info.context['session']  # type: AsyncSession
+
+    async def load_children(parent_ids: List[int]) -> List[List[ItemModel]]:
+        children_query = session.query(ItemModel).filter(ItemModel.parent_id.in_(parent_ids)).order_by(
+            ItemModel.parent_id, ItemModel.sorted_id
+        )
+        children = defaultdict(list)
+        for item in await session.all(await ItemFilter.filter_query(children_query, filters)):
+            children[item.parent_id].append(item)
+        return [children[parent_id] for parent_id in parent_ids]
+
+    return get_loader(info, ('children', _freeze(filters)), load_children)
+
+
+def get_exec_type_loader(info: ResolveInfo) -> DataLoader:
+    """
+    Загрузчик запускаемых типов по ID
+    @param info: данные запроса
+    @return: загрузчик запускаемых типов
+    """
+    session = info.context['session']  # type: AsyncSession
+
+    async def load_exec_types(exec_type_ids: List[int]) -> List[Optional[ExecutionTypeModel]]:
+        exec_types_query = session.query(ExecutionTypeModel).filter(ExecutionTypeModel.id.in_(exec_type_ids))
+        exec_types = {exec_type.id: exec_type for exec_type in await session.all(exec_types_query)}
+        return [exec_types.get(exec_type_id) for exec_type_id in exec_type_ids]
+
+    return get_loader(info, 'exec_type', load_exec_types)
@@ -1,17 +1,21 @@
 import logging
+import time
 from functools import wraps
 from typing import Callable, Any
 
+from item_menu.metrics import RESOLVER_DURATION, RESOLVER_ERRORS
+
 
 def query_log(func: Callable[..., Any]) -> Callable[..., Any]:
     """
-   Обработчик-декоратор для логирования запросов и мутаций
+   Обработчик-декоратор для логирования запросов и мутаций и учета их времени выполнения и ошибок в метриках
    """
     @wraps(func)
     async def wrapper(*args, **kwargs) -> Any:
         method = func.__qualname__
         method_params = '' if not kwargs else ' with params: {}'.format({**kwargs})
 
+        started = time.perf_counter()
         try:
             output = await func(*args, **kwargs)
             logging.debug(
@@ -25,7 +29,9 @@ def query_log(func: Callable[..., Any]) -> Callable[..., Any]:
                     method=method, method_params=method_params, e=e
                 )
             )
+            RESOLVER_ERRORS.inc(method, e.__class__.__name__)
             output = e
 
+        RESOLVER_DURATION.observe(time.perf_counter() - started, method)
         return output
     return wrapper
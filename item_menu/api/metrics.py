@@ -0,0 +1,75 @@
+"""
+Метрики сервиса в текстовом формате Prometheus
+"""
+from typing import Any, Dict, List
+
+from aiohttp import web
+from aiohttp.web_request import Request
+
+from item_menu.metrics import registry, render_gauges
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _render_caches(caches: Dict[str, Any]) -> List[str]:
+    """
+    Метрики кэшей по их статистике на момент запроса
+    @param caches: кэши по наименованиям
+    @return: строки метрик
+    """
+    stats = [((name,), cache.stats) for name, cache in sorted(caches.items())]
+    lines = []
+    lines.extend(render_gauges(
+        'item_menu_cache_hits_total', 'Cache hits', ('cache',),
+        ((labels, details['hits']) for labels, details in stats), 'counter'
+    ))
+    lines.extend(render_gauges(
+        'item_menu_cache_misses_total', 'Cache misses', ('cache',),
+        ((labels, details['misses']) for labels, details in stats), 'counter'
+    ))
+    lines.extend(render_gauges(
+        'item_menu_cache_hit_ratio', 'Cache hit ratio', ('cache',),
+        ((labels, details['hit_ratio']) for labels, details in stats)
+    ))
+    lines.extend(render_gauges(
+        'item_menu_cache_size', 'Cache entries', ('cache',),
+        ((labels, details['size']) for labels, details in stats if 'size' in details)
+    ))
+    return lines
+
+
+def _render_menu_listener(stats: Dict[str, Any]) -> List[str]:
+    """
+    Метрики слушателя уведомлений об изменении данных меню
+    @param stats: статистика слушателя
+    @return: строки метрик
+    """
+    return [
+        *render_gauges(
+            'item_menu_menu_listener_connected', 'Menu changes listener connection state', (),
+            [((), int(stats['connected']))]
+        ),
+        *render_gauges(
+            'item_menu_menu_listener_notifications_total', 'Received menu change notifications', (),
+            [((), stats['notifications'])], 'counter'
+        ),
+        *render_gauges(
+            'item_menu_menu_listener_reconnects_total', 'Menu changes listener reconnects', (),
+            [((), stats['reconnects'])], 'counter'
+        )
+    ]
+
+
+async def get_metrics(request: Request) -> web.Response:
+    """
+    Метрики процесса: задержки запросов, резолверов, сессий базы данных и запросов к сервису авторизации,
+    ошибки и статистика кэшей
+    @param request: данные запроса
+    @return: ответ в текстовом формате Prometheus
+    """
+    context = request.app.context
+    lines = registry.render()
+    lines.extend(_render_caches(context['caches']))
+    lines.extend(_render_menu_listener(context['menu_listener'].stats))
+    return web.Response(body='\n'.join(lines).encode() + b'\n', headers={'Content-Type': CONTENT_TYPE})
@@ -1,8 +1,9 @@
 from graphene import ObjectType
 
-from .update_mutations import UpdateRoot, UpdateItem, UpdateExecutionType
+from .update_mutations import UpdateRoot, UpdateItem, MoveItem, UpdateExecutionType
 from .create_mutations import CreateItem, CreateExecutionType
 from .delete_mutations import DeleteItem, DeleteExecutionType
+from .bulk_mutations import CreateItems, UpdateItems, MoveItems, DeleteItems
 
 
 class Mutation(ObjectType):
@@ -16,6 +17,9 @@ class Mutation(ObjectType):
     update_item = UpdateItem.Field(
         description='Обновить пункт'
     )
+    move_item = MoveItem.Field(
+        description='Переместить пункт вместе с вложенными пунктами к другому родительскому пункту'
+    )
     update_execution_type = UpdateExecutionType.Field(
         description='Обновить запускаемый тип'
     )
@@ -31,3 +35,15 @@ class Mutation(ObjectType):
     delete_execution_type = DeleteExecutionType.Field(
         description='Удалить запускаемый тип'
     )
+    create_items = CreateItems.Field(
+        description='Добавить пункты одной транзакцией'
+    )
+    update_items = UpdateItems.Field(
+        description='Обновить пункты одной транзакцией'
+    )
+    move_items = MoveItems.Field(
+        description='Переместить пункты одной транзакцией'
+    )
+    delete_items = DeleteItems.Field(
+        description='Удалить пункты одной транзакцией'
+    )
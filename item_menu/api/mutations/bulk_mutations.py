@@ -0,0 +1,399 @@
+"""
+Пакетные мутации пунктов: проверка всех пунктов одним запросом на каждый вид данных,
+пересчет порядка сортировки один раз на уровень и фиксация изменений одной транзакцией.
+Пункты, не прошедшие проверку, не изменяются, а ошибки возвращаются по каждому пункту
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from graphene import Mutation, InputObjectType, Int, String, Boolean, ID, NonNull
+from graphene import List as ListType
+from graphql import GraphQLError
+from sqlalchemy import bindparam, func
+
+from item_menu.api.logging import query_log
+from item_menu.api.schemas import ItemResult
+from item_menu.api.validators import (
+    validate_create_item, validate_empty_name, validate_sorted_id, validate_existed_execution_type,
+    validate_update_item, validate_delete_item, validate_move_item, validate_locked_item
+)
+from item_menu.database import AsyncSession
+from item_menu.database.models import ItemModel, ExecutionTypeModel
+from item_menu.database.siblings import SiblingOrder, get_locked_positions, lock_ancestors, lock_siblings
+from item_menu.database.utils import db_session_query
+
+
+UPDATE_FIELDS = ('name', 'full_name', 'key', 'visible')  # изменяемые поля пункта помимо порядка и типа
+
+
+class ItemCreateInput(InputObjectType):
+    """
+    Данные добавляемого пункта
+    """
+    parent_id = Int(required=True, description='ID родительского пункта')
+    sorted_id = Int(description='ID для сортировки на одном уровне')
+    name = String(required=True, description='Наименование пункта')
+    full_name = String(description='Полное наименование пункта')
+    key = String(description='Ключ запускаемого типа')
+    exec_type = String(description='Запускаемый тип')
+    visible = Boolean(description='Видимость пункта в меню')
+
+
+class ItemUpdateInput(InputObjectType):
+    """
+    Данные изменяемого пункта
+    """
+    id = ID(required=True, description='ID пункта')
+    sorted_id = Int(description='ID для сортировки на одном уровне')
+    name = String(description='Наименование пункта')
+    full_name = String(description='Полное наименование пункта')
+    key = String(description='Ключ запускаемого типа')
+    exec_type = String(description='Запускаемый тип')
+    visible = Boolean(description='Видимость пункта в меню')
+
+
+class ItemMoveInput(InputObjectType):
+    """
+    Новая позиция пункта
+    """
+    id = ID(required=True, description='ID пункта')
+    parent_id = Int(description='ID нового родительского пункта (по умолчанию текущий)')
+    sorted_id = Int(description='ID для сортировки на уровне (при смене уровня по умолчанию в конец уровня)')
+
+
+def _parse_id(value: Union[int, str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _get_items(session: AsyncSession, ids: Iterable[Optional[int]]) -> Dict[int, ItemModel]:
+    """
+    Получение пунктов одним запросом
+    @param session: сессия базы данных
+    @param ids: ID пунктов
+    @return: словарь ID - пункт
+    """
+    ids = {item_id for item_id in ids if item_id is not None}
+    if not ids:
+        return {}
+    items_query = session.query(ItemModel).populate_existing().filter(ItemModel.id.in_(ids))
+    return {item.id: item for item in await session.all(items_query)}
+
+
+async def _get_execution_types(session: AsyncSession,
+                               names: Iterable[Optional[str]]) -> Dict[str, ExecutionTypeModel]:
+    """
+    Получение запускаемых типов по наименованиям одним запросом
+    @param session: сессия базы данных
+    @param names: наименования запускаемых типов
+    @return: словарь наименование - запускаемый тип
+    """
+    names = {name for name in names if name is not None}
+    if not names:
+        return {}
+    execution_types_query = session.query(ExecutionTypeModel).filter(ExecutionTypeModel.name.in_(names))
+    return {execution_type.name: execution_type for execution_type in await session.all(execution_types_query)}
+
+
+async def _get_values(entry: Any, execution_types: Dict[str, ExecutionTypeModel]) -> Dict[str, Any]:
+    """
+    Изменяемые поля пункта с присвоением ID запускаемого типа по наименованию
+    @param entry: данные пункта
+    @param execution_types: словарь наименование - запускаемый тип
+    @return: словарь поле - значение
+    """
+    values = {field: entry.get(field) for field in UPDATE_FIELDS if entry.get(field) is not None}
+    if entry.get('exec_type') is not None:
+        values['exec_type_id'] = await validate_existed_execution_type(execution_types.get(entry.get('exec_type')))
+    return values
+
+
+async def _set_items(session: AsyncSession, results: List[ItemResult]):
+    """
+    Заполнение результатов пунктами после изменения одним запросом
+    @param session: сессия базы данных
+    @param results: результаты обработки пунктов
+    """
+    items = await _get_items(session, [_parse_id(result.id) for result in results if result.error is None])
+    for result in results:
+        if result.error is None:
+            result.item = items.get(int(result.id))
+
+
+async def _update_items(session: AsyncSession, entries: List[Any]) -> List[ItemResult]:
+    """
+    Пакетное изменение пунктов
+    @param session: сессия базы данных
+    @param entries: данные изменяемых пунктов
+    @return: результаты обработки пунктов
+    """
+    results = [ItemResult(index=index, id=entry.id) for index, entry in enumerate(entries)]
+    items = await _get_items(session, [_parse_id(entry.id) for entry in entries])
+    execution_types = await _get_execution_types(session, [entry.exec_type for entry in entries])
+
+    # блокировка и загрузка порядка уровней пунктов, позиция которых изменяется
+    parent_ids = {
+        items[_parse_id(entry.id)].parent_id for entry in entries
+        if _parse_id(entry.id) in items and entry.sorted_id is not None
+    }
+    await lock_siblings(session, *parent_ids)
+    order = await SiblingOrder.load(session, parent_ids)
+    positions = await get_locked_positions(session, [
+        _parse_id(entry.id) for entry in entries if _parse_id(entry.id) in items and entry.sorted_id is not None
+    ])
+
+    mappings = []
+    for result, entry in zip(results, entries):
+        item = items.get(_parse_id(entry.id))
+        try:
+            await validate_update_item(item, entry.name, entry.full_name, entry.sorted_id)
+            await validate_empty_name(entry.name, entry.full_name)
+            values = await _get_values(entry, execution_types)
+            if entry.sorted_id is not None:
+                await validate_locked_item(positions.get(item.id), item.parent_id)
+                await validate_sorted_id(order.count(item.parent_id) - 1, entry.sorted_id)
+        except GraphQLError as e:
+            result.error = e.message
+            continue
+
+        if entry.sorted_id is not None:
+            order.move(item.parent_id, item.id, entry.sorted_id)
+        if values:
+            mappings.append({'id': item.id, **values})
+
+    # поля пунктов изменяются запросами, сгруппированными по набору полей, порядок - одним запросом
+    if mappings:
+        await session.run(session.sync_session.bulk_update_mappings, ItemModel, mappings)
+        session.mark_changed(ItemModel.__tablename__)
+    await order.save(session)
+
+    await _set_items(session, results)
+    return results
+
+
+def _get_current_path(path: List[int], moves: List[Tuple[int, List[int]]]) -> List[int]:
+    """
+    Путь пункта с учетом выполненных ранее перемещений пакета
+    @param path: путь пункта в базе данных
+    @param moves: перемещения пакета (ID пункта, новый путь пункта) в порядке выполнения
+    @return: текущий путь пункта
+    """
+    for item_id, new_path in moves:
+        if item_id in path:
+            path = new_path + path[path.index(item_id) + 1:]
+    return path
+
+
+async def _move_items(session: AsyncSession, entries: List[Any]) -> List[ItemResult]:
+    """
+    Пакетное перемещение пунктов в пределах уровня либо к другим родительским пунктам
+    @param session: сессия базы данных
+    @param entries: новые позиции пунктов
+    @return: результаты обработки пунктов
+    """
+    results = [ItemResult(index=index, id=entry.id) for index, entry in enumerate(entries)]
+    # перемещаемые и новые родительские пункты получаются одним запросом
+    items = await _get_items(session, [_parse_id(entry.id) for entry in entries] + [
+        entry.parent_id for entry in entries
+    ])
+
+    # блокировка и загрузка порядка прежних и новых уровней
+    parent_ids = {
+        items[_parse_id(entry.id)].parent_id for entry in entries if _parse_id(entry.id) in items
+    } | {entry.parent_id for entry in entries if entry.parent_id is not None}
+    await lock_siblings(session, *parent_ids)
+    order = await SiblingOrder.load(session, parent_ids)
+    # пункты, перемещенные либо удаленные параллельной транзакцией до получения блокировки, не изменяются
+    positions = await get_locked_positions(session, [
+        _parse_id(entry.id) for entry in entries if _parse_id(entry.id) in items
+    ])
+    # пути новых родительских пунктов перечитываются после блокировки их предков для проверки цикла
+    parent_paths = await lock_ancestors(session, *{
+        entry.parent_id for entry in entries if entry.parent_id is not None and entry.parent_id in items
+    })
+
+    current_parent_ids = {item.id: item.parent_id for item in items.values()}
+    moves = []  # type: List[Tuple[int, List[int]]]
+    for result, entry in zip(results, entries):
+        item = items.get(_parse_id(entry.id))
+        parent_id = current_parent_ids.get(item.id) if item is not None else None
+        new_parent_id = entry.parent_id if entry.parent_id is not None else parent_id
+        try:
+            if item is not None:
+                await validate_locked_item(positions.get(item.id), item.parent_id)
+            if new_parent_id == parent_id:
+                await validate_update_item(item, None, None, entry.sorted_id)
+                if entry.sorted_id is not None:
+                    await validate_sorted_id(order.count(parent_id) - 1, entry.sorted_id)
+            else:
+                parent_path = parent_paths.get(new_parent_id)
+                await validate_move_item(
+                    item, items.get(new_parent_id) if parent_path is not None else None,
+                    parent_path and _get_current_path(parent_path, moves)
+                )
+                if entry.sorted_id is not None:
+                    await validate_sorted_id(order.count(new_parent_id), entry.sorted_id)
+        except GraphQLError as e:
+            result.error = e.message
+            continue
+
+        if new_parent_id == parent_id:
+            if entry.sorted_id is not None:
+                order.move(parent_id, item.id, entry.sorted_id)
+            continue
+        order.remove(parent_id, item.id)
+        order.insert(new_parent_id, item.id, entry.sorted_id)
+        current_parent_ids[item.id] = new_parent_id
+        moves.append((item.id, _get_current_path(parent_paths[new_parent_id], moves) + [item.id]))
+
+    if moves:
+        # родительские пункты изменяются в порядке перемещений, пути вложенных пунктов пересчитываются триггерами
+        await session.execute(
+            ItemModel.__table__.update().where(ItemModel.id == bindparam('item_id')).values(
+                parent_id=bindparam('new_parent_id')
+            ),
+            [{'item_id': item_id, 'new_parent_id': new_path[-2]} for item_id, new_path in moves]
+        )
+        session.mark_changed(ItemModel.__tablename__)
+    await order.save(session)
+
+    await _set_items(session, results)
+    return results
+
+
+class CreateItems(Mutation):
+    """
+    Пакетное добавление пунктов
+    """
+    class Arguments:
+        items = ListType(NonNull(ItemCreateInput), required=True, description='Добавляемые пункты')
+
+    results = ListType(NonNull(ItemResult), required=True, description='Результаты добавления пунктов')
+
+    @staticmethod
+    @query_log
+    @db_session_query()
+    async def mutate(_info, session: AsyncSession, items: List[ItemCreateInput]) -> Mutation:
+        results = [ItemResult(index=index) for index in range(len(items))]
+        parents = await _get_items(session, [entry.parent_id for entry in items])
+        execution_types = await _get_execution_types(session, [entry.exec_type for entry in items])
+
+        # блокировка и загрузка порядка уровней родительских пунктов
+        await lock_siblings(session, *parents)
+        order = await SiblingOrder.load(session, parents)
+
+        rows = {}  # type: Dict[int, Dict[str, Any]]
+        for index, (result, entry) in enumerate(zip(results, items)):
+            try:
+                await validate_create_item(parents.get(entry.parent_id))
+                await validate_empty_name(entry.name, entry.full_name)
+                values = await _get_values(entry, execution_types)
+                if entry.sorted_id is not None:
+                    await validate_sorted_id(order.count(entry.parent_id), entry.sorted_id)
+            except GraphQLError as e:
+                result.error = e.message
+                continue
+
+            # до получения ID пункт занимает позицию уровня под временным отрицательным ID
+            order.insert(entry.parent_id, -(index + 1), entry.sorted_id)
+            rows[-(index + 1)] = {
+                'parent_id': entry.parent_id, 'full_name': None, 'key': None, 'exec_type_id': None, 'visible': False,
+                **values
+            }
+
+        if rows:
+            # ID добавляемых пунктов получаются из последовательности одним запросом
+            ids_query = session.query(func.nextval(ItemModel.item_id_seq.name)).select_from(
+                func.generate_series(1, len(rows))
+            )
+            new_ids = [row[0] for row in await session.all(ids_query)]
+            changes = order.get_changes()
+            for new_id, (temporary_id, row) in zip(new_ids, rows.items()):
+                row.update(id=new_id, sorted_id=changes[temporary_id])
+                results[-temporary_id - 1].id = new_id
+
+            # порядок существующих пунктов уровней изменяется одним запросом, пункты добавляются одним запросом
+            await order.save(session, exclude=rows)
+            await session.execute(ItemModel.__table__.insert(), list(rows.values()))
+            session.mark_changed(ItemModel.__tablename__)
+
+        await _set_items(session, results)
+        return CreateItems(results=results)
+
+
+class UpdateItems(Mutation):
+    """
+    Пакетное изменение пунктов
+    """
+    class Arguments:
+        items = ListType(NonNull(ItemUpdateInput), required=True, description='Изменяемые пункты')
+
+    results = ListType(NonNull(ItemResult), required=True, description='Результаты изменения пунктов')
+
+    @staticmethod
+    @query_log
+    @db_session_query()
+    async def mutate(_info, session: AsyncSession, items: List[ItemUpdateInput]) -> Mutation:
+        return UpdateItems(results=await _update_items(session, items))
+
+
+class MoveItems(Mutation):
+    """
+    Пакетное перемещение пунктов в пределах уровня либо вместе с вложенными пунктами к другим родительским пунктам
+    """
+    class Arguments:
+        items = ListType(NonNull(ItemMoveInput), required=True, description='Новые позиции пунктов')
+
+    results = ListType(NonNull(ItemResult), required=True, description='Результаты перемещения пунктов')
+
+    @staticmethod
+    @query_log
+    @db_session_query()
+    async def mutate(_info, session: AsyncSession, items: List[ItemMoveInput]) -> Mutation:
+        return MoveItems(results=await _move_items(session, items))
+
+
+class DeleteItems(Mutation):
+    """
+    Пакетное удаление пунктов
+    """
+    class Arguments:
+        ids = ListType(NonNull(ID), required=True, description='ID удаляемых пунктов')
+
+    results = ListType(NonNull(ItemResult), required=True, description='Результаты удаления пунктов')
+
+    @staticmethod
+    @query_log
+    @db_session_query()
+    async def mutate(_info, session: AsyncSession, ids: List[Union[int, str]]) -> Mutation:
+        results = [ItemResult(index=index, id=item_id) for index, item_id in enumerate(ids)]
+        items = await _get_items(session, map(_parse_id, ids))
+
+        # блокировка и загрузка порядка уровней удаляемых пунктов
+        parent_ids = {item.parent_id for item in items.values()}
+        await lock_siblings(session, *parent_ids)
+        order = await SiblingOrder.load(session, parent_ids)
+        positions = await get_locked_positions(session, items)
+
+        deleted_ids = []
+        for result, item_id in zip(results, ids):
+            # повторно указанный пункт считается несуществующим
+            item = items.pop(_parse_id(item_id), None)
+            try:
+                await validate_delete_item(item)
+                await validate_locked_item(positions.get(item.id), item.parent_id)
+            except GraphQLError as e:
+                result.error = e.message
+                continue
+            order.remove(item.parent_id, item.id)
+            deleted_ids.append(item.id)
+
+        if deleted_ids:
+            # вложенные пункты удаляются каскадно
+            await session.delete(
+                session.query(ItemModel).filter(ItemModel.id.in_(deleted_ids)), synchronize_session=False
+            )
+            await order.save(session)
+
+        return DeleteItems(results=results)
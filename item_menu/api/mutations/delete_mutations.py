@@ -4,11 +4,12 @@
 from typing import Union
 
 from graphene import Mutation, String, ID
-from sqlalchemy.orm import Session
 
 from item_menu.api.logging import query_log
-from item_menu.api.validators import validate_delete_item, validate_existed_execution_type
+from item_menu.api.validators import validate_delete_item, validate_existed_execution_type, validate_locked_item
+from item_menu.database import AsyncSession
 from item_menu.database.models import ItemModel, ExecutionTypeModel
+from item_menu.database.siblings import get_locked_positions, lock_siblings, shift_siblings
 from item_menu.database.utils import db_session_query
 
 
@@ -24,20 +25,23 @@ class DeleteItem(Mutation):
     @staticmethod
     @query_log
     @db_session_query()
-    async def mutate(_info, session: Session, id: Union[int, str]) -> Mutation:
+    async def mutate(_info, session: AsyncSession, id: Union[int, str]) -> Mutation:
         # валидация наличия пункта
         item_query = session.query(ItemModel).filter_by(id=id)
-        item = item_query.first()
+        item = await session.first(item_query)
         await validate_delete_item(item)
 
-        # сдвиг назад порядка сортировки для пунктов одного уровня
-        one_level_items = session.query(ItemModel).filter_by(parent_id=item.parent_id)
-        for one_level_item in one_level_items.all():
-            if item.sorted_id < one_level_item.sorted_id:
-                one_level_item.sorted_id -= 1
+        # блокировка изменения порядка сортировки пунктов одного уровня
+        await lock_siblings(session, item.parent_id)
+        # текущий порядок сортировки пункта после получения блокировки
+        positions = await get_locked_positions(session, [item.id])
+        sorted_id = await validate_locked_item(positions.get(item.id), item.parent_id)
 
         item_name = item.name
-        item_query.delete()
+        await session.delete(item_query)
+
+        # сдвиг назад порядка сортировки для пунктов одного уровня
+        await shift_siblings(session, item.parent_id, -1, sorted_id + 1)
 
         return DeleteItem(
             message='Пункт с ID {item_id} и наименованием «{item_name}» удален'.format(
@@ -58,14 +62,14 @@ class DeleteExecutionType(Mutation):
     @staticmethod
     @query_log
     @db_session_query()
-    async def mutate(_info, session: Session, id: Union[int, str]) -> Mutation:
+    async def mutate(_info, session: AsyncSession, id: Union[int, str]) -> Mutation:
         # валидация наличия запускаемого типа
         execution_type_query = session.query(ExecutionTypeModel).filter_by(id=id)
-        execution_type = execution_type_query.first()
+        execution_type = await session.first(execution_type_query)
         await validate_existed_execution_type(execution_type, for_item=False)
 
         execution_type_name = execution_type.name
-        execution_type_query.delete()
+        await session.delete(execution_type_query)
 
         return DeleteExecutionType(
             message='Запускаемый тип с ID {execution_type_id} и наименованием «{execution_type_name}» удалён'.format(
@@ -5,15 +5,19 @@ from typing import Union
 
 import graphene
 from graphene import Mutation, Int, String, Boolean, ID
-from sqlalchemy.orm import Session
 
 from item_menu.api.logging import query_log
 from item_menu.api.schemas import ItemNode, Root, ExecutionType
 from item_menu.api.validators import (
     validate_sorted_id, validate_existed_execution_type, validate_empty_name,
-    validate_update_item, validate_not_existed_execution_type, validate_existed_paragraph
+    validate_update_item, validate_not_existed_execution_type, validate_existed_paragraph, validate_move_item,
+    validate_locked_item
 )
+from item_menu.database import AsyncSession
 from item_menu.database.models import RootModel, ItemModel, ExecutionTypeModel
+from item_menu.database.siblings import (
+    count_siblings, get_locked_positions, lock_ancestors, lock_siblings, shift_siblings
+)
 from item_menu.database.utils import db_session_query
 
 
@@ -35,13 +39,13 @@ class UpdateRoot(Mutation):
     @staticmethod
     @query_log
     @db_session_query()
-    async def mutate(_info, session: Session, item_id: Union[int, str]) -> RootModel:
+    async def mutate(_info, session: AsyncSession, item_id: Union[int, str]) -> RootModel:
         # валидация наличия пунктов с необходимым префиксом
         if item_id:
-            items = session.query(ItemModel).all()
+            items = await session.all(session.query(ItemModel))
             await validate_existed_paragraph(items, item_id)
 
-        root_item = session.query(RootModel).first()
+        root_item = await session.first(session.query(RootModel))
         root_item.item_id = item_id
 
         return root_item
@@ -65,9 +69,9 @@ class UpdateItem(Mutation):
     @staticmethod
     @query_log
     @db_session_query()
-    async def mutate(_info, session: Session, id: Union[int, str], **kwargs) -> ItemModel:
+    async def mutate(_info, session: AsyncSession, id: Union[int, str], **kwargs) -> ItemModel:
         item_query = session.query(ItemModel).filter_by(id=id)
-        item = item_query.first()
+        item = await session.first(item_query)
 
         # валидация наличия пункта и прав на изменения пункта
         name, full_name = kwargs.get('name'), kwargs.get('full_name')
@@ -77,33 +81,92 @@ class UpdateItem(Mutation):
         await validate_empty_name(name, full_name)
 
         # валидация порядка сортировки
-        sorted_id = kwargs.get('sorted_id')
         if sorted_id is not None:
-            # получение пунктов одного уровня
-            one_level_items_query = session.query(ItemModel).filter_by(parent_id=item.parent_id)
-            one_level_items = one_level_items_query.all()
-
-            await validate_sorted_id(len(one_level_items) - 1, sorted_id)
-
-            # сдвиг вперед и назад порядка сортировки для пунктов одного уровня
-            for one_level_item in one_level_items:
-                if sorted_id <= one_level_item.sorted_id < item.sorted_id:
-                    one_level_item.sorted_id += 1
-                elif sorted_id >= one_level_item.sorted_id > item.sorted_id:
-                    one_level_item.sorted_id -= 1
+            # блокировка изменения порядка сортировки пунктов одного уровня
+            await lock_siblings(session, item.parent_id)
+            # текущий порядок сортировки пункта после получения блокировки
+            positions = await get_locked_positions(session, [item.id])
+            current_sorted_id = await validate_locked_item(positions.get(item.id), item.parent_id)
+            await validate_sorted_id(await count_siblings(session, item.parent_id) - 1, sorted_id)
+
+            # сдвиг вперед либо назад порядка сортировки пунктов одного уровня между прежней и новой позицией
+            if sorted_id < current_sorted_id:
+                await shift_siblings(session, item.parent_id, 1, sorted_id, current_sorted_id - 1)
+            elif sorted_id > current_sorted_id:
+                await shift_siblings(session, item.parent_id, -1, current_sorted_id + 1, sorted_id)
 
         # валидация запускаемого типа
         if kwargs.get('exec_type') is not None:
             exec_type = kwargs.pop('exec_type')
             execution_type_query = session.query(ExecutionTypeModel).filter_by(name=exec_type)
             # присвоение ID по имени типа
-            kwargs['exec_type_id'] = await validate_existed_execution_type(execution_type_query.first())
+            kwargs['exec_type_id'] = await validate_existed_execution_type(await session.first(execution_type_query))
 
-        item_query.update(kwargs)
+        await session.update(item_query, kwargs)
 
         return item
 
 
+class MoveItem(Mutation):
+    """
+    Перемещение пункта вместе с вложенными пунктами к другому родительскому пункту
+    """
+    class Arguments:
+        id = ID(required=True, description='ID пункта')
+        new_parent_id = Int(required=True, description='ID нового родительского пункта')
+        sorted_id = Int(description='ID для сортировки на новом уровне (по умолчанию в конец уровня)')
+
+    Output = ItemNode
+
+    @staticmethod
+    @query_log
+    @db_session_query()
+    async def mutate(_info, session: AsyncSession, id: Union[int, str], new_parent_id: int,
+                     sorted_id: int = None) -> ItemModel:
+        items_query = session.query(ItemModel).filter(ItemModel.id.in_([id, new_parent_id]))
+        items = {str(item.id): item for item in await session.all(items_query)}
+        item, parent_item = items.get(str(id)), items.get(str(new_parent_id))
+
+        # предварительная валидация наличия пунктов и отсутствия цикла до получения блокировок
+        await validate_move_item(item, parent_item)
+
+        # блокировка изменения порядка сортировки прежнего и нового уровней
+        old_parent_id = item.parent_id
+        await lock_siblings(session, old_parent_id, new_parent_id)
+        # текущие родительский пункт и порядок сортировки пункта после получения блокировки
+        positions = await get_locked_positions(session, [item.id])
+        current_sorted_id = await validate_locked_item(positions.get(item.id), old_parent_id)
+        # валидация отсутствия цикла по пути нового родительского пункта, перечитанному после блокировки предков
+        parent_path = (await lock_ancestors(session, new_parent_id)).get(new_parent_id)
+        await validate_move_item(item, parent_item if parent_path is not None else None, parent_path)
+
+        if old_parent_id == new_parent_id:
+            new_level_count = await count_siblings(session, new_parent_id) - 1
+        else:
+            new_level_count = await count_siblings(session, new_parent_id)
+        if sorted_id is None:
+            sorted_id = new_level_count
+        await validate_sorted_id(new_level_count, sorted_id)
+
+        if old_parent_id == new_parent_id:
+            # перемещение в пределах уровня
+            if sorted_id < current_sorted_id:
+                await shift_siblings(session, old_parent_id, 1, sorted_id, current_sorted_id - 1)
+            elif sorted_id > current_sorted_id:
+                await shift_siblings(session, old_parent_id, -1, current_sorted_id + 1, sorted_id)
+        else:
+            # сдвиг назад пунктов прежнего уровня и вперед пунктов нового уровня
+            await shift_siblings(session, old_parent_id, -1, current_sorted_id + 1)
+            await shift_siblings(session, new_parent_id, 1, sorted_id)
+
+        # путь пункта и всех вложенных пунктов пересчитывается триггерами одним запросом
+        await session.update(
+            session.query(ItemModel).filter_by(id=item.id), {'parent_id': new_parent_id, 'sorted_id': sorted_id},
+            synchronize_session=False
+        )
+        return await session.first(session.query(ItemModel).populate_existing().filter_by(id=item.id))
+
+
 class UpdateExecutionType(graphene.Mutation):
     """
     Обновление запускаемого типа
@@ -117,10 +180,10 @@ class UpdateExecutionType(graphene.Mutation):
     @staticmethod
     @query_log
     @db_session_query()
-    async def mutate(_info, session: Session, id: Union[int, str], **kwargs) -> ExecutionTypeModel:
+    async def mutate(_info, session: AsyncSession, id: Union[int, str], **kwargs) -> ExecutionTypeModel:
         # валидация наличия запускаемого типа
         execution_type_query = session.query(ExecutionTypeModel).filter_by(id=id)
-        execution_type = execution_type_query.first()
+        execution_type = await session.first(execution_type_query)
         await validate_existed_execution_type(execution_type, for_item=False)
 
         # валидация отсутствия имени
@@ -129,7 +192,7 @@ class UpdateExecutionType(graphene.Mutation):
 
         # валидация имени
         execution_type_query = session.query(ExecutionTypeModel).filter_by(name=name)
-        await validate_not_existed_execution_type(execution_type_query.first())
+        await validate_not_existed_execution_type(await session.first(execution_type_query))
 
-        execution_type_query.update(kwargs)
+        await session.update(execution_type_query, kwargs)
         return execution_type
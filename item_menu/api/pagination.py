@@ -0,0 +1,229 @@
+"""
+Постраничная выборка по ключу сортировки (keyset-пагинация)
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Any, Awaitable, Callable, List, Optional
+
+from graphql import GraphQLError
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import ClauseElement
+
+from item_menu.database import AsyncSession
+
+
+CURSOR_PREFIX = 'keyset:'  # префикс курсора для отличия от курсоров по смещению
+
+
+class SortKey:
+    """
+    Поле ключа сортировки: выражение для запроса и его вычисление для объекта в памяти
+    """
+    def __init__(self, expression: Any, getter: Callable[[Any], Any], descending: bool = False):
+        """
+        Инициализация поля ключа сортировки
+        @param expression: выражение для сортировки в запросе
+        @param getter: функция получения значения поля из объекта
+        @param descending: флаг сортировки по убыванию
+        """
+        self.expression = expression
+        self.getter = getter
+        self.descending = descending
+
+    @property
+    def order_by(self) -> ClauseElement:
+        return self.expression.desc() if self.descending else self.expression.asc()
+
+    @property
+    def reverse_order_by(self) -> ClauseElement:
+        return self.expression.asc() if self.descending else self.expression.desc()
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Кодирование значений ключа сортировки в непрозрачный курсор
+    @param values: значения полей ключа сортировки
+    @return: курсор
+    """
+    return urlsafe_b64encode((CURSOR_PREFIX + json.dumps(values, separators=(',', ':'))).encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Получение значений ключа сортировки из курсора
+    @param cursor: курсор
+    @param size: количество полей ключа сортировки
+    @return: значения полей ключа сортировки
+    """
+    try:
+        value = urlsafe_b64decode(cursor.encode()).decode()
+        if value.startswith(CURSOR_PREFIX):
+            values = json.loads(value[len(CURSOR_PREFIX):])
+            if isinstance(values, list) and len(values) == size:
+                return values
+    except (ValueError, UnicodeError):
+        pass
+    raise GraphQLError('Некорректный курсор: {}'.format(cursor))
+
+
+def get_cursor(item: Any, sort_keys: List[SortKey]) -> str:
+    """
+    Курсор объекта по значениям его ключа сортировки
+    @param item: объект
+    @param sort_keys: поля ключа сортировки
+    @return: курсор
+    """
+    return encode_cursor([sort_key.getter(item) for sort_key in sort_keys])
+
+
+class KeysetPage:
+    """
+    Страница выборки вместе с признаками наличия соседних страниц
+    """
+    def __init__(self, items: List[Any], sort_keys: List[SortKey], has_previous_page: bool, has_next_page: bool,
+                 count: Callable[[], Awaitable[int]]):
+        """
+        Инициализация страницы
+        @param items: объекты страницы
+        @param sort_keys: поля ключа сортировки
+        @param has_previous_page: флаг наличия предыдущей страницы
+        @param has_next_page: флаг наличия следующей страницы
+        @param count: функция подсчета общего количества объектов (вызывается только при запросе количества)
+        """
+        self.items = items
+        self.sort_keys = sort_keys
+        self.has_previous_page = has_previous_page
+        self.has_next_page = has_next_page
+        self.count = count
+
+    def get_cursor(self, item: Any) -> str:
+        """
+        Курсор объекта страницы
+        @param item: объект
+        @return: курсор
+        """
+        return get_cursor(item, self.sort_keys)
+
+
+def _validate_limits(first: Optional[int], last: Optional[int], offset: Optional[int] = None):
+    if any(value is not None and value < 0 for value in (first, last, offset)):
+        raise GraphQLError('Размер страницы и смещение не могут быть отрицательными')
+
+
+def _get_keyset_criterion(sort_keys: List[SortKey], values: List[Any], after: bool) -> ClauseElement:
+    """
+    Условие выборки объектов, следующих за ключом (либо предшествующих ему) в порядке сортировки
+    @param sort_keys: поля ключа сортировки
+    @param values: значения полей ключа сортировки
+    @param after: флаг выборки объектов после ключа
+    @return: условие для фильтрации в запросе
+    """
+    criteria = []
+    for index, sort_key in enumerate(sort_keys):
+        greater = after != sort_key.descending
+        expression, value = sort_key.expression, values[index]
+        equal_prefix = [key.expression == values[i] for i, key in enumerate(sort_keys[:index])]
+        criteria.append(and_(*equal_prefix, expression > value if greater else expression < value))
+    return or_(*criteria)
+
+
+async def paginate_query(session: AsyncSession, query: Query, sort_keys: List[SortKey],
+                         first: int = None, last: int = None, after: str = None, before: str = None,
+                         offset: int = None) -> KeysetPage:
+    """
+    Постраничная выборка на уровне базы данных: условие по ключу курсора и ограничение количества строк в запросе
+    @param session: сессия базы данных
+    @param query: отфильтрованный запрос без сортировки
+    @param sort_keys: поля ключа сортировки (последнее поле должно быть уникальным)
+    @param first: количество объектов после курсора after
+    @param last: количество объектов перед курсором before
+    @param after: курсор, после которого начинается выборка
+    @param before: курсор, перед которым заканчивается выборка
+    @param offset: количество пропускаемых объектов (после курсора after)
+    @return: страница выборки
+    """
+    _validate_limits(first, last, offset)
+
+    async def count() -> int:
+        return await session.count(query.order_by(None))
+
+    page_query = query
+    if after is not None:
+        page_query = page_query.filter(_get_keyset_criterion(sort_keys, decode_cursor(after, len(sort_keys)), True))
+    if before is not None:
+        page_query = page_query.filter(_get_keyset_criterion(sort_keys, decode_cursor(before, len(sort_keys)), False))
+
+    has_previous_page, has_next_page = bool(after is not None or offset), before is not None
+    if last is not None and first is None and not offset:
+        # последние объекты выбираются в обратном порядке сортировки
+        items = await session.all(page_query.order_by(*[key.reverse_order_by for key in sort_keys]).limit(last + 1))
+        has_previous_page = len(items) > last
+        items = list(reversed(items[:last]))
+    else:
+        page_query = page_query.order_by(*[key.order_by for key in sort_keys])
+        if offset:
+            page_query = page_query.offset(offset)
+        # лишняя строка определяет наличие следующей страницы
+        items = await session.all(page_query.limit(first + 1) if first is not None else page_query)
+        if first is not None:
+            has_next_page = len(items) > first
+            items = items[:first]
+        if last is not None and len(items) > last:
+            has_previous_page = True
+            items = items[len(items) - last:]
+
+    return KeysetPage(items, sort_keys, has_previous_page, has_next_page, count)
+
+
+def _compare(sort_keys: List[SortKey], item: Any, values: List[Any]) -> int:
+    """
+    Сравнение объекта с ключом курсора в порядке сортировки
+    @return: -1, если объект предшествует ключу, 1 - если следует за ним, 0 - при совпадении
+    """
+    for sort_key, value in zip(sort_keys, values):
+        item_value = sort_key.getter(item)
+        if item_value != value:
+            result = -1 if item_value < value else 1
+            return -result if sort_key.descending else result
+    return 0
+
+
+def paginate_items(items: List[Any], sort_keys: List[SortKey],
+                   first: int = None, last: int = None, after: str = None, before: str = None,
+                   offset: int = None) -> KeysetPage:
+    """
+    Постраничная выборка из отсортированного списка объектов с такими же курсорами, как при выборке из базы данных
+    @param items: объекты, отсортированные по ключу сортировки
+    @param sort_keys: поля ключа сортировки
+    @param first: количество объектов после курсора after
+    @param last: количество объектов перед курсором before
+    @param after: курсор, после которого начинается выборка
+    @param before: курсор, перед которым заканчивается выборка
+    @param offset: количество пропускаемых объектов (после курсора after)
+    @return: страница выборки
+    """
+    _validate_limits(first, last, offset)
+    total_count = len(items)
+
+    async def count() -> int:
+        return total_count
+
+    if after is not None:
+        values = decode_cursor(after, len(sort_keys))
+        items = [item for item in items if _compare(sort_keys, item, values) > 0]
+    if before is not None:
+        values = decode_cursor(before, len(sort_keys))
+        items = [item for item in items if _compare(sort_keys, item, values) < 0]
+
+    has_previous_page, has_next_page = bool(after is not None or offset), before is not None
+    if offset:
+        items = items[offset:]
+    if first is not None and len(items) > first:
+        has_next_page = True
+        items = items[:first]
+    if last is not None and len(items) > last:
+        has_previous_page = True
+        items = items[len(items) - last:]
+
+    return KeysetPage(items, sort_keys, has_previous_page, has_next_page, count)
@@ -0,0 +1,136 @@
+"""
+Автоматически сохраняемые запросы (automatic persisted queries): клиент передает SHA-256 хэш текста запроса
+вместо самого текста, а текст отправляет только один раз после ответа PersistedQueryNotFound
+"""
+import json
+from hashlib import sha256
+from typing import Any, Dict, Mapping, Optional
+
+from dynaconf.utils.boxing import DynaBox
+from sqlalchemy.dialects.postgresql import insert
+
+from item_menu.cache import LRUCache
+from item_menu.database import Database
+from item_menu.database.models import PersistedQueryModel
+
+
+PERSISTED_QUERY_VERSION = 1  # поддерживаемая версия протокола
+
+
+class PersistedQueryError(Exception):
+    """
+    Ошибка обработки сохраненного запроса
+    """
+    def __init__(self, message: str, code: str, status: int):
+        """
+        Инициализация ошибки
+        @param message: сообщение (клиенты ориентируются на сообщение PersistedQueryNotFound)
+        @param code: код ошибки
+        @param status: HTTP-статус ответа
+        """
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.status = status
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'message': self.message, 'extensions': {'code': self.code}}
+
+
+class PersistedQueryStore:
+    """
+    Хранилище сохраненных запросов: LRU-кэш в памяти процесса и (опционально) таблица в базе данных,
+    общая для всех процессов сервиса
+    """
+    def __init__(self, db: Database, config: DynaBox):
+        """
+        Инициализация хранилища
+        @param db: база данных
+        @param config: данные конфигурации хранилища
+        """
+        self._db = db
+        self.enabled = config.enabled
+        self.use_database = config.database
+        self.queries = LRUCache(config.size)
+        self.registered = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика использования хранилища
+        @return: словарь счетчиков
+        """
+        return {**self.queries.stats, 'registered': self.registered}
+
+    async def get(self, query_hash: str) -> Optional[str]:
+        """
+        Получение текста запроса по хэшу
+        @param query_hash: SHA-256 хэш текста запроса
+        @return: текст запроса (опционально, если запрос не сохранен)
+        """
+        query = self.queries.get(query_hash)
+        if query is None and self.use_database:
+            async with self._db.asessioncontext() as session:
+                query = await session.scalar(
+                    session.query(PersistedQueryModel.query).filter(PersistedQueryModel.hash == query_hash)
+                )
+            if query is not None:
+                self.queries.set(query_hash, query)
+        return query
+
+    async def register(self, query_hash: str, query: str):
+        """
+        Сохранение текста запроса
+        @param query_hash: SHA-256 хэш текста запроса
+        @param query: текст запроса
+        """
+        if query_hash in self.queries:
+            return
+        self.queries.set(query_hash, query)
+        self.registered += 1
+        if self.use_database:
+            async with self._db.asessioncontext() as session:
+                await session.execute(
+                    insert(PersistedQueryModel).values(hash=query_hash, query=query).on_conflict_do_nothing()
+                )
+
+    async def resolve(self, data: Dict[str, Any], query_data: Mapping[str, str]) -> Dict[str, Any]:
+        """
+        Подстановка текста сохраненного запроса в параметры запроса либо сохранение переданного текста
+        @param data: параметры запроса из тела запроса
+        @param query_data: параметры запроса из строки запроса
+        @return: параметры запроса с текстом запроса
+        """
+        extensions = data.get('extensions') or query_data.get('extensions')
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise PersistedQueryError('Extensions are invalid JSON', 'BAD_REQUEST', 400)
+        persisted_query = (extensions or {}).get('persistedQuery') if isinstance(extensions, dict) else None
+        if not persisted_query:
+            return data
+        # данные расширения и текст запроса задаются клиентом: ошибки формата возвращаются клиенту
+        if not isinstance(persisted_query, dict):
+            raise PersistedQueryError('Persisted query extension must be an object', 'BAD_REQUEST', 400)
+
+        if persisted_query.get('version') != PERSISTED_QUERY_VERSION:
+            raise PersistedQueryError('Unsupported persisted query version', 'PERSISTED_QUERY_NOT_SUPPORTED', 400)
+        query_hash = persisted_query.get('sha256Hash')
+        if not isinstance(query_hash, str):
+            raise PersistedQueryError('Persisted query sha256Hash must be a string', 'BAD_REQUEST', 400)
+        query = data.get('query') or query_data.get('query')
+        if query and not isinstance(query, str):
+            raise PersistedQueryError('Query must be a string', 'BAD_REQUEST', 400)
+
+        if query:
+            if sha256(query.encode()).hexdigest() != query_hash:
+                raise PersistedQueryError('provided sha does not match query', 'BAD_REQUEST', 400)
+            await self.register(query_hash, query)
+            return data
+
+        query = await self.get(query_hash)
+        if query is None:
+            # клиент повторяет запрос вместе с текстом запроса
+            raise PersistedQueryError('PersistedQueryNotFound', 'PERSISTED_QUERY_NOT_FOUND', 200)
+        return {**data, 'query': query}
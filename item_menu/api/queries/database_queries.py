@@ -2,19 +2,22 @@
 Запросы для получения данных из базы данных
 """
 import typing
-from graphene import ObjectType, List, Argument, NonNull, Int
-from graphene_sqlalchemy import SQLAlchemyConnectionField
+from graphene import ObjectType, List, Argument, NonNull, Int, ID
+from graphql import GraphQLError
 from graphql import ResolveInfo
-from sqlalchemy.orm import Session
 
+from item_menu.api.connections import KeysetConnectionField
 from item_menu.api.filters import ItemFilter
 from item_menu.api.logging import query_log
 from item_menu.api.orders import ItemSort
-from item_menu.api.utils import get_user_items
+from item_menu.api.pagination import KeysetPage, SortKey, get_cursor, paginate_items, paginate_query
+from item_menu.api.utils import get_allowed_items, get_menu_tree
 from item_menu.auth_service import AuthService
+from item_menu.cache import MenuTree
+from item_menu.database import AsyncSession
 from item_menu.database.models import ItemModel, RootModel, ExecutionTypeModel
 from item_menu.api.schemas import ItemNode, ExecutionType
-from item_menu.database.sortings import get_paragraph_order, sort_by
+from item_menu.database.sortings import get_paragraph_order, sort_by, get_paragraph_key, sort_items, get_sort_keys
 from item_menu.database.utils import db_session_query
 
 
@@ -25,7 +28,7 @@ class ItemQuery(ObjectType):
     """
     Запросы пунктов меню
     """
-    user_items = SQLAlchemyConnectionField(
+    user_items = KeysetConnectionField(
         ItemNode,
         filters=Argument(ItemFilter, description='Фильтры пунктов'),
         description='Перечень всех доступных пользователю пунктов'
@@ -34,64 +37,114 @@ class ItemQuery(ObjectType):
         NonNull(ItemNode),
         sort=List(NonNull(ItemSort), description='Сортировка пунктов'),
         filters=Argument(ItemFilter, description='Фильтры пунктов'),
+        limit=Int(description='Количество пунктов'),
+        offset=Int(description='Количество пропускаемых пунктов'),
+        after=ID(description='ID последнего пункта предыдущей страницы (выборка по ключу сортировки)'),
         description='Список всех пунктов'
     )
 
     @staticmethod
     @query_log
     @db_session_query()
-    async def resolve_user_items(info: ResolveInfo, session: Session, **kwargs) -> ItemNode:
+    async def resolve_user_items(info: ResolveInfo, session: AsyncSession, **kwargs) -> KeysetPage:
         auth_service = info.context['auth']  # type: AuthService
-        user_permissions = await auth_service.user_perms(info)
+        permission_set = await auth_service.user_permission_set(info)
 
-        # фильтр по родительскому корневому ID и сортировка по цифровому префиксу имени пункта первого уровня
-        items_query = session.query(ItemModel).filter_by(
-            parent_id=ROOT_ID
-        ).order_by(
-            await get_paragraph_order(ItemModel)
-        )
+        tree = await get_menu_tree(info)
+        # фильтр по пунктам, к которым предоставлены права доступа, если пользователь ограничен в правах
+        if permission_set:
+            info.context['permission_filter'] = await get_allowed_items(info, session, permission_set, ROOT_ID, tree)
 
-        # добавляет фильтр по полученным о сервиса авторизации наименования пунктов,
-        # если пользователь ограничен в правах
-        if user_permissions:
-            info.context['permission_filter'] = await get_user_items(session, user_permissions, ROOT_ID)
-            items_query = items_query.filter(ItemModel.id.in_(info.context['permission_filter']))
-
-        items = items_query.all()
+        if tree is not None:
+            filter_item_id = tree.root_item_id
+        else:
+            current_tree_item = await session.first(session.query(RootModel))
+            filter_item_id = current_tree_item.item_id
 
         filters = kwargs.get('filters', {})
+        if 'permission_filter' in info.context:
+            filters.update(permission=info.context['permission_filter'])
         # добавляет фильтр по префиксу имени пункта первого уровня, если ID корневого пункта не равно 0
-        current_tree_item = session.query(RootModel).first()
-        filter_item_id = current_tree_item.item_id
         if filter_item_id:
             filters.update(paragraph=filter_item_id)
-        # фильтр пунктов первого уровня
-        if filters:
-            item_filter = ItemFilter(items, filters)
-            items = await item_filter.filter_items()
 
-        return items
+        # ключ сортировки по цифровому префиксу имени пункта первого уровня, курсоры страниц кодируют этот ключ
+        sort_keys = [
+            SortKey(await get_paragraph_order(ItemModel), get_paragraph_key),
+            SortKey(ItemModel.id, lambda x: x.id)
+        ]
+        page_args = {argument: kwargs.get(argument) for argument in ('first', 'last', 'after', 'before')}
+
+        if tree is not None:
+            # пункты первого уровня из кэша дерева, отсортированные по ключу сортировки
+            items = sorted(tree.get_children(ROOT_ID), key=lambda x: (get_paragraph_key(x), x.id))
+            if filters:
+                item_filter = ItemFilter(items, filters)
+                items = await item_filter.filter_items()
+            return paginate_items(items, sort_keys, **page_args)
+
+        # фильтр по родительскому корневому ID, остальные фильтры, сортировка и ограничение количества пунктов
+        # страницы выполняются на уровне базы данных
+        items_query = await ItemFilter.filter_query(session.query(ItemModel).filter_by(parent_id=ROOT_ID), filters)
+        return await paginate_query(session, items_query, sort_keys, **page_args)
 
     @staticmethod
     @query_log
     @db_session_query()
-    async def resolve_all_items(_info, session: Session, **kwargs) -> typing.List[ItemModel]:
-        items_query = session.query(ItemModel)
+    async def resolve_all_items(info: ResolveInfo, session: AsyncSession, **kwargs) -> typing.List[ItemModel]:
+        sort = kwargs.get('sort')
+        filters = kwargs.get('filters', {})
+        limit, offset, after_id = kwargs.get('limit'), kwargs.get('offset'), kwargs.get('after')
+        paginated = any(argument is not None for argument in (limit, offset, after_id))
+        # ключ сортировки страниц: поля сортировки и ID пункта
+        sort_keys = get_sort_keys(sort or [])
+
+        tree = await get_menu_tree(info)
+        if tree is not None:
+            items = list(tree.items.values())
+            # сортировка и фильтр пунктов в памяти
+            if sort or paginated:
+                items = sort_items(items, sort or [])
+            if filters:
+                item_filter = ItemFilter(items, filters)
+                items = await item_filter.filter_items()
+            if paginated:
+                after = await ItemQuery._get_after_cursor(session, after_id, sort_keys, tree)
+                items = paginate_items(items, sort_keys, first=limit, after=after, offset=offset).items
+            return items
+
+        items_query = await ItemFilter.filter_query(session.query(ItemModel), filters)
+        if paginated:
+            # условие по ключу сортировки, смещение и ограничение количества пунктов выполняются в запросе
+            after = await ItemQuery._get_after_cursor(session, after_id, sort_keys, tree)
+            page = await paginate_query(session, items_query, sort_keys, first=limit, after=after, offset=offset)
+            return page.items
 
         # сортировка пунктов
-        sort = kwargs.get('sort')
         if sort:
             items_query = await sort_by(items_query, sort)
+        return await session.all(items_query)
 
-        items = items_query.all()
-
-        # фильтр пунктов
-        filters = kwargs.get('filters', {})
-        if filters:
-            item_filter = ItemFilter(items, filters)
-            items = await item_filter.filter_items()
-
-        return items
+    @staticmethod
+    async def _get_after_cursor(session: AsyncSession, after_id: typing.Optional[str],
+                                sort_keys: typing.List[SortKey], tree: MenuTree = None) -> typing.Optional[str]:
+        """
+        Курсор по ключу сортировки последнего пункта предыдущей страницы
+        @param session: сессия базы данных
+        @param after_id: ID последнего пункта предыдущей страницы
+        @param sort_keys: поля ключа сортировки
+        @param tree: снимок дерева меню (опционально, если кэш отключен)
+        @return: курсор (опционально, если пункт не указан)
+        """
+        if after_id is None:
+            return None
+        if tree is not None:
+            item = tree.items.get(int(after_id))
+        else:
+            item = await session.first(session.query(ItemModel).filter_by(id=after_id))
+        if item is None:
+            raise GraphQLError('Пункт с ID {} не найден'.format(after_id))
+        return get_cursor(item, sort_keys)
 
 
 class RootQuery(ObjectType):
@@ -103,8 +156,11 @@ class RootQuery(ObjectType):
     @staticmethod
     @query_log
     @db_session_query()
-    async def resolve_current_tree_item(_info, session: Session) -> int:
-        current_tree_item = session.query(RootModel).first()
+    async def resolve_current_tree_item(info: ResolveInfo, session: AsyncSession) -> int:
+        tree = await get_menu_tree(info)
+        if tree is not None:
+            return tree.root_item_id
+        current_tree_item = await session.first(session.query(RootModel))
         return current_tree_item.item_id
 
 
@@ -117,5 +173,8 @@ class ExecutionTypeQuery(ObjectType):
     @staticmethod
     @query_log
     @db_session_query()
-    async def resolve_execution_types(_info, session: Session) -> typing.List[ExecutionTypeModel]:
-        return session.query(ExecutionTypeModel).all()
+    async def resolve_execution_types(info: ResolveInfo, session: AsyncSession) -> typing.List[ExecutionTypeModel]:
+        tree = await get_menu_tree(info)
+        if tree is not None:
+            return tree.execution_types
+        return await session.all(session.query(ExecutionTypeModel))
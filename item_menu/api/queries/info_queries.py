@@ -1,10 +1,12 @@
 """
 Информационные запросы
 """
-from graphene import ObjectType, String
+import typing
+from graphene import ObjectType, String, List, NonNull
 from graphql import ResolveInfo
 
 from item_menu.api.logging import query_log
+from item_menu.api.schemas import CacheStats
 
 
 class ServiceQuery(ObjectType):
@@ -12,8 +14,24 @@ class ServiceQuery(ObjectType):
     Сервисный запрос
     """
     item_menu_version = String(description='Версия сервиса пунктов меню')
+    cache_stats = List(NonNull(CacheStats), description='Статистика кэшей сервиса')
 
     @staticmethod
     @query_log
     async def resolve_item_menu_version(_, info: ResolveInfo) -> str:
         return info.context['config'].VERSION
+
+    @staticmethod
+    @query_log
+    async def resolve_cache_stats(_, info: ResolveInfo) -> typing.List[CacheStats]:
+        cache_stats = []
+        for name, cache in info.context['caches'].items():
+            details = dict(cache.stats)
+            cache_stats.append(CacheStats(
+                name=name,
+                hits=details.pop('hits'),
+                misses=details.pop('misses'),
+                hit_ratio=details.pop('hit_ratio'),
+                details=details
+            ))
+        return cache_stats
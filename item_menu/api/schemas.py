@@ -2,12 +2,16 @@
 Схемы для запросов
 """
 import typing
-from graphene import Node, NonNull, List, Argument, ID
+from graphene import Node, NonNull, List, Argument, ID, ObjectType, String, Int, Float, Field
+from graphene.types.generic import GenericScalar
 from graphene_sqlalchemy import SQLAlchemyObjectType
 from graphql import ResolveInfo
 
 from item_menu.api.connections import ItemConnection
 from item_menu.api.filters import ItemFilter
+from item_menu.api.loaders import get_children_loader, get_exec_type_loader
+from item_menu.cache import MenuTree
+from item_menu.database import AsyncSession
 from item_menu.database.models import ItemModel, RootModel, ExecutionTypeModel
 
 
@@ -16,6 +20,8 @@ class ItemNode(SQLAlchemyObjectType):
     Схема запросов пунктов
     """
     id = ID(required=True, description='Уникальный идентификатор пункта')
+    path = List(NonNull(ID), required=True, description='Путь от корневого пункта до пункта включительно')
+    depth = Int(required=True, description='Уровень вложенности пункта (0 - корневой пункт)')
     children = List(
         lambda: NonNull(ItemNode),
         filters=Argument(ItemFilter, description='Фильтры пунктов'),
@@ -28,19 +34,50 @@ class ItemNode(SQLAlchemyObjectType):
         interfaces = (Node,)
         connection_class = ItemConnection
 
-    async def resolve_children(self, info: ResolveInfo, **kwargs) -> typing.List[ItemModel]:
-        approved_children = self.children
+    @staticmethod
+    async def _load(item: ItemModel, info: ResolveInfo, attribute: str) -> typing.Any:
+        """
+        Получение связанных данных пункта из снимка дерева меню либо из базы данных
+        @param item: пункт
+        @param info: данные запроса
+        @param attribute: наименование связи
+        @return: значение связи
+        """
+        tree = info.context.get('menu_tree')  # type: MenuTree
+        # у пунктов из снимка дерева связи уже загружены
+        if tree is not None and tree.contains(item):
+            return getattr(item, attribute)
+        session = info.context['session']  # type: AsyncSession
+        return await session.load(item, attribute)
 
+    async def resolve_children(self, info: ResolveInfo, **kwargs) -> typing.List[ItemModel]:
         # фильтр пунктов, начиная со второго уровня
-        filters = kwargs.get('filters', {})
+        filters = kwargs.get('filters')
         # фильтр по пунктам, к которым предоставлены права доступа
         if 'permission_filter' in info.context:
-            filters.update(permission=info.context['permission_filter'])
-        if filters:
-            item_filter = ItemFilter(approved_children, filters)
-            approved_children = await item_filter.filter_items()
+            filters = {**(filters or {}), 'permission': info.context['permission_filter']}
+
+        tree = info.context.get('menu_tree')  # type: MenuTree
+        if tree is not None and tree.contains(self):
+            # дочерние пункты в снимке дерева уже отсортированы по порядковому ID, фильтр сохраняет порядок
+            if not filters:
+                return self.children
+            return await ItemFilter(self.children, filters).filter_items()
+
+        # дочерние пункты всех пунктов уровня загружаются одним запросом с фильтром и сортировкой по порядковому ID
+        return await get_children_loader(info, filters).load(self.id)
 
-        return sorted(approved_children, key=lambda x: x.sorted_id)  # сортировка по порядковому ID
+    async def resolve_parent(self, info: ResolveInfo) -> typing.Optional[ItemModel]:
+        return await ItemNode._load(self, info, 'parent')
+
+    async def resolve_exec_type(self, info: ResolveInfo) -> typing.Optional[ExecutionTypeModel]:
+        tree = info.context.get('menu_tree')  # type: MenuTree
+        if tree is not None and tree.contains(self):
+            return self.exec_type
+        if self.exec_type_id is None:
+            return None
+        # запускаемые типы всех пунктов уровня загружаются одним запросом
+        return await get_exec_type_loader(info).load(self.exec_type_id)
 
 
 class Root(SQLAlchemyObjectType):
@@ -59,3 +96,24 @@ class ExecutionType(SQLAlchemyObjectType):
     class Meta:
         model = ExecutionTypeModel
         description = 'Запускаемый тип'
+
+
+class ItemResult(ObjectType):
+    """
+    Схема результата обработки пункта в пакетной мутации
+    """
+    index = Int(required=True, description='Номер пункта в списке мутации')
+    id = ID(description='ID пункта')
+    item = Field(ItemNode, description='Пункт после изменения')
+    error = String(description='Ошибка обработки пункта (пункт не изменен)')
+
+
+class CacheStats(ObjectType):
+    """
+    Схема статистики кэша
+    """
+    name = String(required=True, description='Наименование кэша')
+    hits = Int(required=True, description='Количество попаданий')
+    misses = Int(required=True, description='Количество промахов')
+    hit_ratio = Float(required=True, description='Доля попаданий')
+    details = GenericScalar(description='Дополнительные счетчики кэша')
@@ -1,34 +1,73 @@
 """
 Утилиты для запросов
 """
-from typing import List
+from typing import FrozenSet, Iterable, Optional, Set
 
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from graphql import ResolveInfo
+from sqlalchemy import or_, func
 
+from item_menu.cache import MenuTree, MenuTreeCache, PermissionCache, PermissionSet
+from item_menu.database import AsyncSession
 from item_menu.database.models import ItemModel
 
 
-async def get_user_items(session: Session, user_permissions, root_id: int) -> List[int]:
+async def get_menu_tree(info: ResolveInfo) -> Optional[MenuTree]:
     """
-    Получение имен всех пунктов от конечного уровня дерева к корневому
+    Получение снимка дерева меню, единого для всех резолверов одного запроса
+    @param info: данные запроса
+    @return: снимок дерева (опционально, если кэш отключен)
+    """
+    menu_cache = info.context['menu_cache']  # type: MenuTreeCache
+    if not menu_cache.enabled:
+        return None
+    if 'menu_tree' not in info.context:
+        info.context['menu_tree'] = await menu_cache.get_tree()
+    return info.context['menu_tree']
+
+
+async def get_user_items(session: AsyncSession, user_permissions: Iterable[str], root_id: int,
+                         tree: MenuTree = None) -> Set[int]:
+    """
+    Получение ID всех пунктов от конечного уровня дерева к корневому
     @param session: сессия базы данных
     @param user_permissions: список наименований конечных пунктов, к которым нужно предоставить доступ
     @param root_id: корневой ID всех пунктов
-    @return: список ID всех пунктов, к которым предоставлен доступ
+    @param tree: снимок дерева меню (опционально, если кэш отключен)
+    @return: множество ID всех пунктов, к которым предоставлен доступ
     """
-    # все доступные конечные пункты
-    leaf_user_items = session.query(ItemModel).filter(or_(*[
+    if not user_permissions:
+        return set()
+    # обход предков по индексу снимка дерева без обращения к базе данных
+    if tree is not None:
+        return tree.get_user_items(user_permissions, root_id)
+
+    # все доступные конечные пункты вместе с предками из материализованного пути одним запросом
+    allowed_items = session.query(func.unnest(ItemModel.path).label('id')).filter(or_(*[
         ItemModel.name.contains(name) for name in user_permissions
-    ])).all()
-
-    allowed_items = []
-    for item in leaf_user_items:
-        allowed_items.append(item.id)
-        item_parent = item.parent
-        # проход по дереву снизу вверх
-        # обрываем цикл, если дошли до корневого ID либо если имя пункта уже находится в списке
-        while item_parent.id != root_id and item_parent.id not in allowed_items:
-            allowed_items.append(item_parent.id)
-            item_parent = item_parent.parent
+    ])).subquery()
+    allowed_items_query = session.query(allowed_items.c.id).filter(allowed_items.c.id != root_id).distinct()
+
+    rows = await session.all(allowed_items_query)
+    return {row.id for row in rows}
+
+
+async def get_allowed_items(info: ResolveInfo, session: AsyncSession, permission_set: PermissionSet, root_id: int,
+                            tree: MenuTree = None) -> FrozenSet[int]:
+    """
+    Получение ID доступных пунктов набора прав с кэшированием до изменения дерева меню
+    @param info: данные запроса
+    @param session: сессия базы данных
+    @param permission_set: набор прав пользователя
+    @param root_id: корневой ID всех пунктов
+    @param tree: снимок дерева меню (опционально, если кэш отключен)
+    @return: множество ID всех пунктов, к которым предоставлен доступ
+    """
+    # версия данных меню фиксируется до чтения дерева, поэтому результат не переживет последующих изменений
+    version = tree.version if tree is not None else info.context['menu_cache'].version
+    perms_cache = info.context['auth'].perms_cache  # type: PermissionCache
+    allowed_items = perms_cache.get_allowed_items(permission_set, version)
+    if allowed_items is None:
+        allowed_items = permission_set.set_allowed_items(
+            version, await get_user_items(session, permission_set.names, root_id, tree)
+        )
     return allowed_items
@@ -1,7 +1,7 @@
 """
 Валидаторы данных мутаций
 """
-from typing import Union, List
+from typing import Any, Union, List
 
 from graphql import GraphQLError
 from typing_extensions import NoReturn
@@ -108,6 +108,39 @@ async def validate_delete_item(item: ItemModel):
         raise GraphQLError('Нельзя удалять пункт первого уровня')
 
 
+async def validate_move_item(item: ItemModel, parent_item: ItemModel, parent_path: List[int] = None):
+    """
+    Валидация перемещения пункта к другому родительскому пункту
+    @param item: пункт
+    @param parent_item: новый родительский пункт
+    @param parent_path: текущий путь нового родительского пункта (опционально, путь из пункта)
+    """
+    if not item:
+        raise GraphQLError('Введен ID несуществующей пункта')
+    if not item.id:
+        raise GraphQLError('Нельзя перемещать корневой пункт')
+    if not item.parent_id:
+        raise GraphQLError('Нельзя перемещать пункт первого уровня')
+    await validate_create_item(parent_item)
+    # проверка по материализованному пути предков нового родительского пункта
+    if item.id in (parent_path if parent_path is not None else parent_item.path):
+        raise GraphQLError('Нельзя переместить пункт в него самого или во вложенный в него пункт')
+
+
+async def validate_locked_item(position: Any, parent_id: int) -> int:
+    """
+    Валидация позиции пункта, перечитанной после блокировки уровня
+    @param position: строка (id, parent_id, sorted_id) пункта либо None для удаленного пункта
+    @param parent_id: ID родительского пункта, уровень которого заблокирован
+    @return: текущий порядок сортировки пункта
+    """
+    if not position:
+        raise GraphQLError('Введен ID несуществующей пункта')
+    if position.parent_id != parent_id:
+        raise GraphQLError('Пункт с ID {} перемещен другим запросом, повторите операцию'.format(position.id))
+    return position.sorted_id
+
+
 async def validate_existed_paragraph(items: List[ItemModel], paragraph_value: Union[int, str]):
     """
     Валидация наличия пункта с заданным в значении префиксе
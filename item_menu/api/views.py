@@ -0,0 +1,184 @@
+"""
+GraphQL-view сервиса
+"""
+from functools import partial
+from typing import Any, Dict, Optional, Tuple
+
+from aiohttp import web
+from aiohttp.web_request import Request
+from aiohttp_graphql import GraphQLView
+from graphql import GraphQLBackend
+from graphql_server import HttpQueryError, encode_execution_results, get_graphql_params, run_http_query
+from promise import Promise
+
+from item_menu.api.etag import etag_matches, get_etag, get_menu_version, get_read_query_hash
+from item_menu.api.persisted_queries import PersistedQueryError, PersistedQueryStore
+from item_menu.cache import ResponseCache
+
+
+class ItemMenuGraphQLView(GraphQLView):
+    """
+    GraphQL-view с привязкой данных запроса к контексту выполнения
+    """
+    def __init__(self, backend: GraphQLBackend = None, persisted_queries: PersistedQueryStore = None,
+                 response_cache: ResponseCache = None, **kwargs):
+        """
+        Инициализация GraphQL-view
+        @param backend: бэкенд разбора и выполнения запросов (опционально, по умолчанию бэкенд graphql-core)
+        @param persisted_queries: хранилище сохраненных запросов (опционально)
+        @param response_cache: кэш ответов на запросы чтения (опционально)
+        """
+        super().__init__(**kwargs)
+        self.backend = backend
+        self.persisted_queries = persisted_queries
+        self.response_cache = response_cache
+
+    async def resolve_persisted_queries(self, request: Request, data: Any) -> Any:
+        """
+        Подстановка текстов сохраненных запросов по хэшам
+        @param request: данные запроса
+        @param data: параметры запроса (либо список параметров пакетного запроса)
+        @return: параметры запроса с текстами запросов
+        """
+        if self.persisted_queries is None or not self.persisted_queries.enabled:
+            return data
+        if isinstance(data, list):
+            return [
+                await self.persisted_queries.resolve(entry, {}) if isinstance(entry, dict) else entry for entry in data
+            ]
+        if isinstance(data, dict):
+            return await self.persisted_queries.resolve(data, request.query)
+        return data
+
+    async def get_read_key(self, request: Request, data: Dict[str, Any]) -> Optional[Tuple[int, str, str]]:
+        """
+        Получение ключа запроса чтения до его выполнения: результат запроса определяется ключом,
+        пока не изменились данные меню
+        @param request: данные запроса
+        @param data: параметры запроса
+        @return: версия данных меню, отпечаток прав пользователя и хэш запроса
+        (опционально, если запрос не является запросом чтения)
+        """
+        params = get_graphql_params(data, request.query)
+        query_hash = get_read_query_hash(
+            self.schema, self.backend, params.query, params.variables, params.operation_name
+        )
+        if query_hash is None:
+            return None
+
+        menu_version = await get_menu_version(request['session'])
+        if menu_version is None:
+            return None
+        # снимок дерева, построенный до изменений других процессов, не используется для ответа по новой версии
+        self.context['menu_cache'].sync_menu_version(menu_version)
+        try:
+            permission_set = await self.context['auth'].request_permission_set(request)
+        except Exception:
+            # ошибка сервиса авторизации возвращается при выполнении запроса
+            return None
+        fingerprint = permission_set.fingerprint if permission_set is not None else ''
+        return menu_version, fingerprint, query_hash
+
+    def get_context(self, request: Request) -> Dict[str, Any]:
+        """
+        Получение контекста выполнения запроса
+        @param request: данные запроса
+        @return: контекстный словарь запроса
+        """
+        context = super().get_context(request)
+        # сессия базы данных, открытая middleware для текущего запроса
+        context['session'] = request.get('session')
+        return context
+
+    async def __call__(self, request: Request) -> web.Response:
+        """
+        Обработка HTTP-запроса (в отличие от базового view разбор запросов выполняется переданным бэкендом)
+        @param request: данные запроса
+        @return: ответ
+        """
+        try:
+            data = await self.parse_body(request)
+            request_method = request.method.lower()
+            is_graphiql = self.is_graphiql(request)
+            is_pretty = self.is_pretty(request)
+
+            if request_method == 'options':
+                return self.process_preflight(request)
+
+            try:
+                data = await self.resolve_persisted_queries(request, data)
+            except PersistedQueryError as err:
+                return web.Response(
+                    text=self.encoder({'errors': [err.as_dict()]}),
+                    status=err.status,
+                    content_type='application/json'
+                )
+
+            # повторный запрос чтения без изменений меню и прав пользователя не выполняется:
+            # ответ 304 по If-None-Match либо тело ответа из кэша
+            config = self.context['config']
+            read_key = None
+            if not is_graphiql and isinstance(data, dict) and (
+                    config.CACHE.etag.enabled or self.response_cache is not None):
+                read_key = await self.get_read_key(request, data)
+            etag = get_etag(config.VERSION, *read_key) if read_key and config.CACHE.etag.enabled else None
+            if etag is not None and etag_matches(request.headers.get('If-None-Match'), etag):
+                return web.Response(status=304, headers={'ETag': etag})
+            cache_key = None
+            if read_key is not None and self.response_cache is not None:
+                menu_version, fingerprint, query_hash = read_key
+                cache_key = (query_hash, fingerprint, is_pretty)
+                body = self.response_cache.get(menu_version, cache_key)
+                if body is not None:
+                    return web.Response(
+                        body=body, headers={'ETag': etag} if etag else None, content_type='application/json'
+                    )
+
+            execution_results, all_params = run_http_query(
+                self.schema,
+                request_method,
+                data,
+                query_data=request.query,
+                batch_enabled=self.batch,
+                catch=is_graphiql,
+                # параметры выполнения
+                backend=self.backend,
+                return_promise=self.enable_async,
+                root_value=self.root_value,
+                context_value=self.get_context(request),
+                middleware=self.middleware,
+                executor=self.executor,
+            )
+
+            awaited_execution_results = await Promise.all(execution_results)
+            result, status_code = encode_execution_results(
+                awaited_execution_results,
+                is_batch=isinstance(data, list),
+                format_error=self.error_formatter,
+                encode=partial(self.encoder, pretty=is_pretty),
+            )
+
+            if is_graphiql:
+                return await self.render_graphiql(params=all_params[0], result=result)
+
+            headers = {}
+            # ответы с ошибками не кэшируются
+            if read_key is not None and status_code == 200 and not any(
+                execution_result and execution_result.errors for execution_result in awaited_execution_results
+            ):
+                if etag is not None:
+                    headers['ETag'] = etag
+                if cache_key is not None:
+                    self.response_cache.set(read_key[0], cache_key, result.encode())
+            return web.Response(text=result, status=status_code, headers=headers, content_type='application/json')
+
+        except HttpQueryError as err:
+            if err.headers and isinstance(err.headers.get('Allow'), list):
+                err.headers['Allow'] = ', '.join(err.headers['Allow'])
+
+            return web.Response(
+                text=self.encoder({'errors': [self.error_formatter(err)]}),
+                status=err.status_code,
+                headers=err.headers,
+                content_type='application/json'
+            )
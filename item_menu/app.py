@@ -1,6 +1,6 @@
 import logging.config
 from concurrent.futures.thread import ThreadPoolExecutor
-from multiprocessing import cpu_count
+from typing import Optional
 
 from aiohttp import web
 from aiohttp.web_urldispatcher import Resource
@@ -9,8 +9,13 @@ from dynaconf.utils.boxing import DynaBox
 from dynaconf.utils.files import read_file
 
 from item_menu.api import get_view
+from item_menu.api.backend import CachedDocumentBackend
+from item_menu.api.persisted_queries import PersistedQueryStore
+from item_menu.api.export import export_menu, import_menu, stream_items
+from item_menu.api.metrics import get_metrics
 from item_menu.auth_service import AuthService
-from item_menu.database import Database
+from item_menu.cache import MenuTreeCache, ResponseCache
+from item_menu.database import Database, MenuChangeListener
 
 
 class Application:
@@ -26,6 +31,16 @@ class Application:
         self._config.VERSION = read_file(config.VERSION_PATH)
         self._db = Database(self._config.POSTGRES)
         self._auth = AuthService(self._config.SERVICES.auth)
+        self._menu_cache = MenuTreeCache(self._db, self._config.CACHE.menu_tree)
+        # сброс кэша дерева после фиксации изменений в таблицах меню
+        self._db.add_commit_listener(self._menu_cache.on_commit)
+        # разобранные и проверенные документы запросов, общие для /graphql и /graphiql
+        self._graphql_backend = CachedDocumentBackend(self._config.CACHE.documents.size)
+        self._persisted_queries = PersistedQueryStore(self._db, self._config.CACHE.persisted_queries)
+        # тела ответов на запросы чтения по версии данных меню и правам пользователя
+        self._response_cache = ResponseCache(self._config.CACHE.responses.max_bytes)
+        # сброс кэшей по уведомлениям об изменениях меню, зафиксированных другими процессами
+        self._menu_listener = MenuChangeListener(self._db.url, self._config.NOTIFICATIONS, self._on_menu_change)
         self._app = web.Application(middlewares=[self._auth.login_required, self._db.db_session])
 
     async def _init_pool_thread(self, app: web.Application):
@@ -33,7 +48,10 @@ class Application:
         Добавление в приложение данных по многопоточным воркерам и событийному циклу
         @param app: приложение
         """
-        self._app['pool_thread'] = ThreadPoolExecutor(max_workers=cpu_count())
+        # в пуле выполняются все обращения к базе данных, поэтому количество потоков
+        # соответствует максимальному количеству соединений с базой данных
+        max_workers = self._config.POSTGRES.pool_size + self._config.POSTGRES.max_overflow
+        self._app['pool_thread'] = ThreadPoolExecutor(max_workers=max_workers)
         self._app['loop'] = app._loop
 
     async def _init_logging(self, _app):
@@ -44,11 +62,31 @@ class Application:
         logging.config.dictConfig(self._config.LOGGING)
         logging.info('Starting service v.{}'.format(self._config.VERSION))
 
-    async def _init_db(self, _app):
+    async def _init_db(self, app: web.Application):
         """
         Инициализация связи с базой данных
+        @param app: приложение
+        """
+        await self._db.initialize(app['pool_thread'])
+
+    def _on_menu_change(self, menu_version: Optional[int]):
+        """
+        Сброс кэшей данных меню по уведомлению об изменении
+        @param menu_version: версия данных меню (None - сброс без проверки версии)
+        """
+        if menu_version is None:
+            self._menu_cache.invalidate()
+            self._response_cache.invalidate()
+        else:
+            self._menu_cache.sync_menu_version(menu_version)
+            self._response_cache.sync_menu_version(menu_version)
+
+    async def _init_menu_listener(self, _app):
+        """
+        Запуск слушателя уведомлений об изменении данных меню
         """
-        await self._db.initialize()
+        if self._menu_listener.enabled:
+            await self._menu_listener.start()
 
     async def _init_auth(self, _app):
         """
@@ -80,11 +118,29 @@ class Application:
         app.context = {
             'config': self._config,
             'db': self._db,
-            'auth': self._auth
+            'auth': self._auth,
+            'menu_cache': self._menu_cache,
+            'menu_listener': self._menu_listener,
+            # кэши, статистика которых доступна в запросе cacheStats
+            'caches': {
+                'menu_tree': self._menu_cache,
+                'auth_tokens': self._auth.token_cache,
+                'auth_permissions': self._auth.perms_cache,
+                'auth_single_flight': self._auth.single_flight,
+                'graphql_documents': self._graphql_backend,
+                'persisted_queries': self._persisted_queries,
+                'graphql_responses': self._response_cache
+            }
         }
         # инициализация GraphQL-view
-        gqil_view = get_view(context=app.context, graphiql=True)
-        gql_view = get_view(context=app.context, graphiql=False)
+        gqil_view = get_view(context=app.context, graphiql=True, backend=self._graphql_backend)
+        gql_view = get_view(
+            context=app.context,
+            graphiql=False,
+            backend=self._graphql_backend,
+            persisted_queries=self._persisted_queries,
+            response_cache=self._response_cache if self._config.CACHE.responses.enabled else None
+        )
 
         # добавление graphiql-endpoint
         app.router.add_route('*', '/graphiql', gqil_view, name='graphiql')
@@ -93,6 +149,31 @@ class Application:
         await self._setup_cors(resource)
         # добавление всех доступных методов
         resource.add_route('*', gql_view)
+        # потоковая выгрузка пунктов
+        app.router.add_get('/items.ndjson', stream_items, name='items_ndjson')
+        if self._config.METRICS.enabled:
+            # метрики в формате Prometheus (без авторизации пользователя)
+            app.router.add_get('/metrics', get_metrics, name='metrics')
+            self._auth.public_paths.add('/metrics')
+        if self._config.ADMIN.enabled and not self._config.ADMIN.token:
+            # загрузка с заменой удаляет все меню, поэтому эндпоинты без токена не добавляются
+            logging.error('Admin endpoints are disabled: ADMIN.token is not set')
+        elif self._config.ADMIN.enabled:
+            # выгрузка и загрузка всего меню
+            app.router.add_get('/admin/menu/export', export_menu, name='admin_menu_export')
+            app.router.add_post('/admin/menu/import', import_menu, name='admin_menu_import')
+
+    async def _close_auth(self, _app):
+        """
+        Закрытие связи с сервисом авторизации
+        """
+        await self._auth.close()
+
+    async def _close_menu_listener(self, _app):
+        """
+        Остановка слушателя уведомлений об изменении данных меню
+        """
+        await self._menu_listener.stop()
 
     async def _close_db(self, _app):
         """
@@ -109,8 +190,13 @@ class Application:
             self._init_pool_thread,
             self._init_logging,
             self._init_db,
+            self._init_menu_listener,
             self._init_auth,
             self._init_views
         ])
-        self._app.on_cleanup.append(self._close_db)
+        self._app.on_cleanup.extend([
+            self._close_auth,
+            self._close_menu_listener,
+            self._close_db
+        ])
         return self._app
@@ -1,15 +1,22 @@
+import json
 import logging
-from asyncio import get_event_loop
+import time
+from asyncio import TimeoutError
+from base64 import urlsafe_b64decode
+from hashlib import sha256
 from typing import Any, Optional, Dict, List
 
-from aiohttp import web
+from aiohttp import web, ClientSession, ClientTimeout, TCPConnector, ClientError
 from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 from dynaconf.utils.boxing import DynaBox
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
-from graphql import ResolveInfo
+from gql import gql
+from graphql import ResolveInfo, GraphQLError
 from graphql.language.ast import Document
+from graphql.language.printer import print_ast
+
+from item_menu.cache import LRUCache, PermissionCache, PermissionSet, SingleFlight
+from item_menu.metrics import AUTH_DURATION, AUTH_ERRORS
 
 
 class AuthService:
@@ -23,7 +30,15 @@ class AuthService:
         """
         self._config = config
         self.enabled = self._config.enabled
-        self._client = None
+        self._http = None  # type: Optional[ClientSession]
+        # результаты проверки токенов по хэшу заголовка авторизации
+        self.token_cache = LRUCache(self._config.token_cache.size, self._config.token_cache.ttl)
+        # права пользователей по bearer-токену, общие для пользователей с одинаковыми правами
+        self.perms_cache = PermissionCache(self._config.perms_cache.size, self._config.perms_cache.ttl)
+        # одновременные одинаковые запросы к сервису выполняются один раз
+        self.single_flight = SingleFlight()
+        # пути, доступные без авторизации (метрики)
+        self.public_paths = set()
 
     @property
     def url(self) -> str:
@@ -63,8 +78,25 @@ class AuthService:
         }
         logging.info('Auth service integration is {}'.format(auth_status.get(self.enabled)))
         if self.enabled:
+            # единый HTTP-клиент с пулом постоянных соединений на все время работы приложения
+            self._http = ClientSession(
+                connector=TCPConnector(
+                    limit=self._config.pool_size,
+                    keepalive_timeout=self._config.keepalive_timeout
+                ),
+                # ограничение времени выполнения каждого запроса к сервису
+                timeout=ClientTimeout(total=self._config.timeout)
+            )
             await self._execute(for_init=True)
 
+    async def close(self):
+        """
+        Закрытие соединений с сервисом
+        """
+        if self._http is not None:
+            await self._http.close()
+            logging.info('Auth service connection is closed')
+
     async def _execute(self, header: str = None,
                        query: Document = None,
                        for_init: bool = False) -> Optional[Dict[str, str]]:
@@ -75,23 +107,92 @@ class AuthService:
         @param for_init: флаг цели запроса (для инициализации связи или нет)
         @return: ответ сервиса (опционально)
         """
-        self._client = Client(transport=RequestsHTTPTransport(self.url, headers={'Authorization': header}))
+        # в случае отсутствия запроса использует запрос по дефолту
+        query = query if query else self._get_ping_query()
+        if for_init:
+            return await self._post(header, query, for_init)
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            # одновременные запросы с одинаковыми заголовком и текстом запроса ожидают один ответ сервиса
+            result = await self.single_flight.run((header, print_ast(query)), self._post, header, query)
+            outcome = 'ok'
+            return result
+        except Exception as e:
+            AUTH_ERRORS.inc(e.__class__.__name__)
+            raise e
+        finally:
+            AUTH_DURATION.observe(time.perf_counter() - started, outcome)
+
+    async def _post(self, header: Optional[str], query: Document,
+                    for_init: bool = False) -> Optional[Dict[str, str]]:
+        """
+        Отправка запроса к сервису
+        @param header: заголовок
+        @param query: запрос
+        @param for_init: флаг цели запроса (для инициализации связи или нет)
+        @return: ответ сервиса (опционально)
+        """
+        headers = {'Authorization': header} if header else {}
         try:
-            # в случае отсутствия запроса использует запрос по дефолту
-            query = query if query else self._get_ping_query
-            result = await get_event_loop().run_in_executor(None, self._client.execute, query)
-            if not for_init:
-                query_name = query.definitions[0].name.value or \
-                             query.definitions[0].selection_set.selections[0].name.value
-                logging.debug('Successfully resolved auth service query: {}'.format(query_name))
-        except IOError as ioe:
-            if for_init and ioe.response.status_code in (200, 401):
-                logging.info('Successfully connected to auth service')
-                return None
-            logging.error('Connection to auth service is failed: {}'.format(ioe))
-            raise ioe
-
-        return result
+            async with self._http.post(self.url, json={'query': print_ast(query)}, headers=headers) as response:
+                if for_init and response.status in (200, 401):
+                    logging.info('Successfully connected to auth service')
+                    return None
+                response.raise_for_status()
+                payload = await response.json()
+        except (ClientError, TimeoutError) as e:
+            logging.error('Connection to auth service is failed: {!r}'.format(e))
+            raise e
+
+        errors = payload.get('errors')
+        if errors:
+            raise GraphQLError('Ошибка сервиса авторизации: {}'.format(errors[0].get('message')))
+
+        definition = query.definitions[0]
+        query_name = definition.name.value if definition.name else \
+            definition.selection_set.selections[0].name.value
+        logging.debug('Successfully resolved auth service query: {}'.format(query_name))
+        return payload.get('data')
+
+    async def user_permission_set(self, info: ResolveInfo) -> Optional[PermissionSet]:
+        """
+        Запрос набора прав к сервису с кэшированием по bearer-токену
+        @param info: данные запроса
+        @return: набор прав пользователя (опционально, если интеграция с сервисом отключена)
+        """
+        return await self.request_permission_set(info.context['request'])
+
+    async def request_permission_set(self, request: Request) -> Optional[PermissionSet]:
+        """
+        Запрос набора прав к сервису по HTTP-запросу (до выполнения GraphQL-запроса)
+        @param request: данные запроса
+        @return: набор прав пользователя (опционально, если интеграция с сервисом отключена)
+        """
+        if not self.enabled:
+            return None
+        # получение bearer-токена для заголовка
+        header = request.bearer_token
+        permission_set = self.perms_cache.get(header)
+        if permission_set is not None:
+            return permission_set
+
+        query = gql(
+            '''
+                query {
+                  allUserPerms(filters: {isAllow: true}) {
+                    permission {
+                      name
+                    }
+                  }
+                }
+            '''
+        )
+        result = await self._execute(header, query)
+        user_permissions = [
+            perm_dict.get('permission', {}).get('name') for perm_dict in result.get('allUserPerms', [])
+        ]
+        return self.perms_cache.set(header, user_permissions)
 
     async def user_perms(self, info: ResolveInfo) -> List[str]:
         """
@@ -99,26 +200,64 @@ class AuthService:
         @param info: данные запроса
         @return: список пунктов, к которым открыт доступ
         """
-        user_permissions = []
-        if self.enabled:
-            # получение bearer-токена для заголовка
-            header = info.context['request'].bearer_token
-            query = gql(
-                '''
-                    query {
-                      allUserPerms(filters: {isAllow: true}) {
-                        permission {
-                          name
-                        }
-                      }
-                    }
-                '''
-            )
-            result = await self._execute(header, query)
-            user_permissions = [
-                perm_dict.get('permission', {}).get('name') for perm_dict in result.get('allUserPerms', [])
-            ]
-        return user_permissions
+        permission_set = await self.user_permission_set(info)
+        return list(permission_set.names) if permission_set else []
+
+    @staticmethod
+    def _hash_header(header: str) -> str:
+        """
+        Хэш заголовка авторизации для использования в качестве ключа кэша
+        @param header: заголовок
+        @return: хэш заголовка
+        """
+        return sha256(header.encode()).hexdigest()
+
+    @staticmethod
+    def _get_token_expiry(token: str) -> Optional[float]:
+        """
+        Время истечения JWT-токена (без проверки подписи, только для ограничения времени кэширования)
+        @param token: токен
+        @return: UNIX-время истечения токена (опционально, если токен не является JWT)
+        """
+        try:
+            payload = token.split('.')[1]
+            claims = json.loads(urlsafe_b64decode(payload + '=' * (-len(payload) % 4)).decode())
+            return float(claims['exp'])
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            return None
+
+    async def _get_bearer_token(self, header: Optional[str]) -> str:
+        """
+        Получение bearer-токена по заголовку авторизации с кэшированием результата проверки
+        @param header: заголовок
+        @return: bearer-токен
+        """
+        cache_key = self._hash_header(header) if header else None
+        if cache_key is not None:
+            bearer_token = self.token_cache.get(cache_key)
+            if bearer_token is not None:
+                return bearer_token
+
+        result = await self._execute(header)
+        access_token = result.get('access_token')
+        bearer_token = 'Bearer {}'.format(access_token)
+
+        if cache_key is not None:
+            # время кэширования не превышает оставшееся время жизни токена
+            ttl = self.token_cache.ttl
+            expiry = self._get_token_expiry(access_token)
+            if expiry is not None:
+                ttl = min(ttl, expiry - time.time())
+            if ttl > 0:
+                self.token_cache.set(cache_key, bearer_token, ttl)
+        return bearer_token
+
+    def invalidate_token(self, header: str = None):
+        """
+        Сброс закэшированного результата проверки токена (например, при выходе пользователя)
+        @param header: заголовок авторизации (опционально, без него сбрасываются все результаты)
+        """
+        self.token_cache.invalidate(self._hash_header(header) if header else None)
 
     @web.middleware
     async def login_required(self, request: Request, handler: Any) -> Response:
@@ -128,13 +267,11 @@ class AuthService:
         @param handler: данные обработчика
         @return: ответ после прохождения авторизации
         """
-        if self.enabled:
+        if self.enabled and request.path not in self.public_paths:
             # получение аккаунта из заголовка
             header = request.headers.get('Authorization')
-
-            result = await self._execute(header)
             # в случае успеха присвоение bearer-токена
-            request.bearer_token = 'Bearer {}'.format(result.get('access_token'))
+            request.bearer_token = await self._get_bearer_token(header)
 
         response = await handler(request)
         return response
@@ -0,0 +1,18 @@
+from .counters import CacheCounters
+from .lru import LRUCache
+from .menu_tree import MenuTree, MenuTreeCache
+from .permissions import PermissionCache, PermissionSet
+from .responses import ResponseCache
+from .single_flight import SingleFlight
+
+
+__all__ = [
+    'CacheCounters',
+    'LRUCache',
+    'MenuTree',
+    'MenuTreeCache',
+    'PermissionCache',
+    'PermissionSet',
+    'ResponseCache',
+    'SingleFlight'
+]
@@ -0,0 +1,33 @@
+"""
+Счетчики использования кэшей
+"""
+from typing import Any, Dict
+
+
+class CacheCounters:
+    """
+    Счетчики попаданий и промахов кэша
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Доля попаданий в кэш
+        @return: доля попаданий от общего количества обращений
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Представление счетчиков в виде словаря
+        @return: словарь счетчиков
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hit_ratio
+        }
@@ -0,0 +1,100 @@
+"""
+LRU-кэш с ограничением времени жизни записей
+"""
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Hashable, Optional
+
+from item_menu.cache.counters import CacheCounters
+
+
+class LRUCache:
+    """
+    Кэш ограниченного размера с вытеснением давно не используемых записей и временем жизни записей
+    """
+    def __init__(self, maxsize: int, ttl: float = None):
+        """
+        Инициализация кэша
+        @param maxsize: максимальное количество записей
+        @param ttl: время жизни записи по умолчанию в секундах (опционально, без ограничения)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # ключ - (значение, момент устаревания записи)
+        self._data = OrderedDict()  # type: OrderedDict
+
+        self.counters = CacheCounters()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and not self._is_expired(entry[1])
+
+    @staticmethod
+    def _is_expired(expires_at: Optional[float]) -> bool:
+        return expires_at is not None and expires_at <= monotonic()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика использования кэша
+        @return: словарь счетчиков
+        """
+        return {
+            **self.counters.as_dict(),
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Получение значения из кэша
+        @param key: ключ
+        @param default: значение при отсутствии актуальной записи
+        @return: значение
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.counters.misses += 1
+            return default
+
+        value, expires_at = entry
+        if self._is_expired(expires_at):
+            del self._data[key]
+            self.expirations += 1
+            self.counters.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.counters.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """
+        Добавление значения в кэш
+        @param key: ключ
+        @param value: значение
+        @param ttl: время жизни записи в секундах (опционально, по умолчанию время жизни кэша)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (value, monotonic() + ttl if ttl is not None else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable = None):
+        """
+        Удаление записи либо всех записей кэша
+        @param key: ключ (опционально, без него кэш очищается полностью)
+        """
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
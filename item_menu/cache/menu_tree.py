@@ -0,0 +1,231 @@
+"""
+Кэш дерева меню в памяти процесса
+"""
+import logging
+import re
+import time
+from asyncio import Lock
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from dynaconf.utils.boxing import DynaBox
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from item_menu.cache.counters import CacheCounters
+from item_menu.database import Database
+from item_menu.database.models import ItemModel, ExecutionTypeModel, RootModel, MenuVersionModel
+
+
+# таблицы, изменение которых требует перестроения дерева
+MENU_TABLES = frozenset((ItemModel.__tablename__, ExecutionTypeModel.__tablename__, RootModel.__tablename__))
+
+
+class MenuTree:
+    """
+    Неизменяемый снимок дерева меню
+    """
+    def __init__(self, items: List[ItemModel], execution_types: List[ExecutionTypeModel], root_item_id: int,
+                 version: int = 0, menu_version: int = None):
+        """
+        Построение индексов дерева
+        @param items: список всех пунктов
+        @param execution_types: список всех запускаемых типов
+        @param root_item_id: ID корневого пункта для построения дерева
+        @param version: версия данных меню, по которой построен снимок
+        @param menu_version: версия данных меню в базе данных (menu_version), прочитанная до загрузки снимка
+        """
+        self.version = version
+        self.menu_version = menu_version
+        self.root_item_id = root_item_id
+        self.execution_types = sorted(execution_types, key=lambda x: x.id)
+        self.items = {item.id: item for item in items}
+        self.children = {}  # type: Dict[int, List[ItemModel]]
+        for item in sorted(items, key=lambda x: x.sorted_id):
+            self.children.setdefault(item.parent_id, []).append(item)
+
+        # связи проставляются как загруженные, поэтому отсоединенные от сессии объекты
+        # не обращаются к базе данных при чтении children, parent и exec_type
+        execution_types_index = {execution_type.id: execution_type for execution_type in execution_types}
+        for item in items:
+            set_committed_value(item, 'children', self.children.get(item.id, []))
+            set_committed_value(item, 'parent', self.items.get(item.parent_id))
+            set_committed_value(item, 'exec_type', execution_types_index.get(item.exec_type_id))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def contains(self, item: Any) -> bool:
+        """
+        Проверка принадлежности объекта снимку
+        @param item: объект ORM
+        @return: флаг принадлежности
+        """
+        return self.items.get(getattr(item, 'id', None)) is item
+
+    def get_children(self, parent_id: Optional[int]) -> List[ItemModel]:
+        """
+        Дочерние пункты, упорядоченные по порядку сортировки
+        @param parent_id: ID родительского пункта
+        @return: список дочерних пунктов
+        """
+        return self.children.get(parent_id, [])
+
+    def get_user_items(self, user_permissions: Iterable[str], root_id: int) -> Set[int]:
+        """
+        Получение ID пунктов, наименования которых содержат наименования прав, и всех их предков
+        @param user_permissions: наименования конечных пунктов, к которым нужно предоставить доступ
+        @param root_id: корневой ID всех пунктов
+        @return: множество ID всех пунктов, к которым предоставлен доступ
+        """
+        # одно регулярное выражение вместо проверки каждого наименования права для каждого пункта
+        pattern = re.compile('|'.join(re.escape(name) for name in user_permissions))
+
+        allowed_items = set()
+        for item in self.items.values():
+            if not pattern.search(item.name):
+                continue
+            allowed_items.add(item.id)
+            parent_id = item.parent_id
+            # обрываем проход, если дошли до корневого ID либо если предок уже добавлен вместе со своими предками
+            while parent_id is not None and parent_id != root_id and parent_id not in allowed_items:
+                allowed_items.add(parent_id)
+                parent_id = self.items[parent_id].parent_id
+        return allowed_items
+
+
+class MenuTreeCache:
+    """
+    Кэш дерева меню: все пункты и запускаемые типы загружаются одним обращением к базе данных
+    и перестраиваются после фиксации изменений в таблицах меню
+    """
+    def __init__(self, db: Database, config: DynaBox):
+        """
+        Инициализация кэша
+        @param db: база данных
+        @param config: данные конфигурации кэша
+        """
+        self._db = db
+        self.enabled = config.enabled
+        self._tree = None  # type: Optional[MenuTree]
+        self._version = 0
+        # наибольшая известная версия данных меню в базе данных (из запросов и уведомлений других процессов)
+        self._latest_menu_version = None  # type: Optional[int]
+        self._lock = Lock()
+
+        self.counters = CacheCounters()
+        self.rebuilds = 0
+        self.last_rebuild_time = 0.0
+        self.total_rebuild_time = 0.0
+
+    @property
+    def version(self) -> int:
+        """
+        Версия данных меню, увеличивается при каждой фиксации изменений в таблицах меню
+        @return: версия
+        """
+        return self._version
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика использования кэша
+        @return: словарь счетчиков
+        """
+        return {
+            **self.counters.as_dict(),
+            'size': len(self._tree) if self._tree else 0,
+            'rebuilds': self.rebuilds,
+            'last_rebuild_time': self.last_rebuild_time,
+            'total_rebuild_time': self.total_rebuild_time
+        }
+
+    async def get_tree(self) -> MenuTree:
+        """
+        Получение актуального снимка дерева
+        @return: снимок дерева
+        """
+        tree = self._tree
+        if tree is not None:
+            self.counters.hits += 1
+            return tree
+
+        self.counters.misses += 1
+        # перестроение выполняется один раз, остальные запросы ожидают его результат
+        async with self._lock:
+            if self._tree is None:
+                return await self._rebuild()
+            return self._tree
+
+    async def _rebuild(self) -> MenuTree:
+        """
+        Загрузка всех данных меню и построение снимка дерева
+        @return: снимок дерева
+        """
+        version = self._version
+        started = time.perf_counter()
+        async with self._db.asessioncontext() as session:
+            tree = await session.run(self._build_tree, session.sync_session, version)
+
+        self.last_rebuild_time = time.perf_counter() - started
+        self.total_rebuild_time += self.last_rebuild_time
+        self.rebuilds += 1
+        logging.debug('Menu tree cache is rebuilt in {:.4f}s: {} items'.format(self.last_rebuild_time, len(tree)))
+
+        # снимок не сохраняется, если во время перестроения были зафиксированы новые изменения
+        if version == self._version and not self._is_outdated(tree):
+            self._tree = tree
+        return tree
+
+    @staticmethod
+    def _build_tree(session: Session, version: int) -> MenuTree:
+        """
+        Построение снимка дерева в синхронной сессии
+        @param session: сессия базы данных
+        @param version: версия данных меню
+        @return: снимок дерева
+        """
+        menu_version = session.query(MenuVersionModel.version).scalar()
+        items = session.query(ItemModel).all()
+        execution_types = session.query(ExecutionTypeModel).all()
+        root_item = session.query(RootModel).first()
+        return MenuTree(items, execution_types, root_item.item_id if root_item else 0, version, menu_version)
+
+    def invalidate(self):
+        """
+        Сброс снимка дерева
+        """
+        self._version += 1
+        self._tree = None
+        logging.debug('Menu tree cache is invalidated')
+
+    def sync_menu_version(self, menu_version: int):
+        """
+        Сброс снимка дерева и версии кэша при изменениях, зафиксированных другими процессами
+        @param menu_version: текущая версия данных меню в базе данных
+        """
+        if self._latest_menu_version is not None and menu_version <= self._latest_menu_version:
+            return
+        self._latest_menu_version = menu_version
+        tree = self._tree
+        if tree is not None and tree.menu_version is not None and tree.menu_version >= menu_version:
+            return
+        # версия кэша увеличивается и без снимка дерева: по ней кэшируются доступные пункты наборов прав
+        # (в том числе при отключенном кэше дерева)
+        self.invalidate()
+
+    def _is_outdated(self, tree: MenuTree) -> bool:
+        """
+        Проверка построения снимка по более ранней версии данных меню, чем известная кэшу
+        @param tree: снимок дерева
+        @return: флаг устаревания снимка
+        """
+        return tree.menu_version is not None and self._latest_menu_version is not None \
+            and tree.menu_version < self._latest_menu_version
+
+    def on_commit(self, changed_tables: Iterable[str]):
+        """
+        Обработчик фиксации изменений в базе данных
+        @param changed_tables: наименования измененных таблиц
+        """
+        if MENU_TABLES.intersection(changed_tables):
+            self.invalidate()
@@ -0,0 +1,145 @@
+"""
+Кэш прав пользователей и вычисленных по ним доступных пунктов
+"""
+from hashlib import sha256
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from item_menu.cache.counters import CacheCounters
+from item_menu.cache.lru import LRUCache
+
+
+class PermissionSet:
+    """
+    Набор прав, общий для всех пользователей с одинаковыми правами
+    """
+    def __init__(self, names: Iterable[str]):
+        """
+        Инициализация набора прав
+        @param names: наименования прав
+        """
+        self.names = tuple(sorted(set(names)))
+        self.fingerprint = self.get_fingerprint(self.names)
+        # (версия дерева меню, ID доступных пунктов), вычисленные для этой версии дерева
+        self._allowed_items = None  # type: Optional[Tuple[int, FrozenSet[int]]]
+
+    def __bool__(self) -> bool:
+        return bool(self.names)
+
+    @staticmethod
+    def get_fingerprint(names: Iterable[str]) -> str:
+        """
+        Отпечаток набора прав, не зависящий от порядка и повторов наименований
+        @param names: наименования прав
+        @return: отпечаток
+        """
+        return sha256('\n'.join(sorted(set(names))).encode()).hexdigest()
+
+    def get_allowed_items(self, version: int) -> Optional[FrozenSet[int]]:
+        """
+        Получение ID доступных пунктов, вычисленных для версии дерева меню
+        @param version: версия дерева меню
+        @return: множество ID пунктов (опционально, если для этой версии дерева они не вычислялись)
+        """
+        allowed_items = self._allowed_items
+        if allowed_items is None or allowed_items[0] != version:
+            return None
+        return allowed_items[1]
+
+    def set_allowed_items(self, version: int, allowed_items: Iterable[int]) -> FrozenSet[int]:
+        """
+        Сохранение ID доступных пунктов, вычисленных для версии дерева меню
+        @param version: версия дерева меню
+        @param allowed_items: ID пунктов
+        @return: множество ID пунктов
+        """
+        allowed_items = frozenset(allowed_items)
+        # результат по более старой версии дерева не заменяет уже сохраненный
+        if self._allowed_items is None or self._allowed_items[0] <= version:
+            self._allowed_items = (version, allowed_items)
+        return allowed_items
+
+
+class PermissionCache:
+    """
+    Кэш прав пользователей: токен сопоставляется отпечатку набора прав,
+    а по отпечатку хранится набор прав вместе с вычисленными доступными пунктами
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Инициализация кэша
+        @param maxsize: максимальное количество записей
+        @param ttl: время жизни записи в секундах
+        """
+        self._tokens = LRUCache(maxsize, ttl)
+        self._permission_sets = LRUCache(maxsize, ttl)
+        # попадания и промахи по вычисленным доступным пунктам
+        self.allowed_items_counters = CacheCounters()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика использования кэша
+        @return: словарь счетчиков
+        """
+        return {
+            **self._tokens.stats,
+            'permission_sets': len(self._permission_sets),
+            'allowed_items_hits': self.allowed_items_counters.hits,
+            'allowed_items_misses': self.allowed_items_counters.misses
+        }
+
+    @staticmethod
+    def _hash_token(token: str) -> str:
+        return sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[PermissionSet]:
+        """
+        Получение набора прав пользователя
+        @param token: bearer-токен пользователя
+        @return: набор прав (опционально, если права не закэшированы)
+        """
+        fingerprint = self._tokens.get(self._hash_token(token))
+        if fingerprint is None:
+            return None
+        return self._permission_sets.get(fingerprint)
+
+    def set(self, token: str, names: Iterable[str]) -> PermissionSet:
+        """
+        Сохранение набора прав пользователя
+        @param token: bearer-токен пользователя
+        @param names: наименования прав
+        @return: набор прав, общий для всех пользователей с такими же правами
+        """
+        permission_set = PermissionSet(names)
+        # пользователи с одинаковыми правами используют одну запись вместе с вычисленными пунктами
+        shared_permission_set = self._permission_sets.get(permission_set.fingerprint)
+        if shared_permission_set is not None:
+            permission_set = shared_permission_set
+        self._permission_sets.set(permission_set.fingerprint, permission_set)
+        self._tokens.set(self._hash_token(token), permission_set.fingerprint)
+        return permission_set
+
+    def get_allowed_items(self, permission_set: PermissionSet, version: int) -> Optional[FrozenSet[int]]:
+        """
+        Получение ID доступных пунктов набора прав для версии дерева меню
+        @param permission_set: набор прав
+        @param version: версия дерева меню
+        @return: множество ID пунктов (опционально, если не вычислялись либо дерево изменилось)
+        """
+        allowed_items = permission_set.get_allowed_items(version)
+        if allowed_items is None:
+            self.allowed_items_counters.misses += 1
+        else:
+            self.allowed_items_counters.hits += 1
+        return allowed_items
+
+    def invalidate(self, token: str = None):
+        """
+        Сброс прав пользователя либо всех закэшированных прав
+        @param token: bearer-токен пользователя (опционально, без него кэш очищается полностью)
+        """
+        if token is None:
+            self._tokens.invalidate()
+            self._permission_sets.invalidate()
+        else:
+            self._tokens.invalidate(self._hash_token(token))
@@ -0,0 +1,107 @@
+"""
+Кэш сериализованных ответов на запросы чтения
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from item_menu.cache.counters import CacheCounters
+
+
+class ResponseCache:
+    """
+    Кэш тел ответов с ограничением общего объема и вытеснением давно не используемых ответов.
+    Ответы хранятся для одной версии данных меню: при появлении новой версии кэш очищается
+    """
+    def __init__(self, max_bytes: int):
+        """
+        Инициализация кэша
+        @param max_bytes: максимальный общий объем тел ответов в байтах
+        """
+        self.max_bytes = max_bytes
+        self.menu_version = None  # type: Optional[int]
+        self._data = OrderedDict()  # type: OrderedDict
+        self.bytes = 0
+
+        self.counters = CacheCounters()
+        self.evictions = 0
+        # ответы, превышающие объем кэша
+        self.rejections = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика использования кэша
+        @return: словарь счетчиков
+        """
+        return {
+            **self.counters.as_dict(),
+            'size': len(self._data),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'rejections': self.rejections,
+            'invalidations': self.invalidations
+        }
+
+    def sync_menu_version(self, menu_version: int) -> bool:
+        """
+        Очистка кэша при появлении новой версии данных меню
+        @param menu_version: версия данных меню запроса либо уведомления об изменении меню
+        @return: флаг соответствия версии запроса версии кэша
+        """
+        if self.menu_version is None or menu_version > self.menu_version:
+            self.invalidate()
+            self.menu_version = menu_version
+        return menu_version == self.menu_version
+
+    def get(self, menu_version: int, key: Hashable) -> Optional[bytes]:
+        """
+        Получение тела ответа
+        @param menu_version: версия данных меню
+        @param key: ключ запроса (хэш запроса с переменными, отпечаток прав пользователя)
+        @return: тело ответа (опционально, если ответ не закэширован)
+        """
+        body = self._data.get(key) if self.sync_menu_version(menu_version) else None
+        if body is None:
+            self.counters.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.counters.hits += 1
+        return body
+
+    def set(self, menu_version: int, key: Hashable, body: bytes):
+        """
+        Сохранение тела ответа
+        @param menu_version: версия данных меню, для которой получен ответ
+        @param key: ключ запроса
+        @param body: тело ответа
+        """
+        # ответ по устаревшей версии данных не сохраняется
+        if not self.sync_menu_version(menu_version):
+            return
+        if len(body) > self.max_bytes:
+            self.rejections += 1
+            return
+
+        previous = self._data.pop(key, None)
+        if previous is not None:
+            self.bytes -= len(previous)
+        self._data[key] = body
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    def invalidate(self):
+        """
+        Удаление всех ответов
+        """
+        if self._data:
+            self.invalidations += 1
+        self._data.clear()
+        self.bytes = 0
@@ -0,0 +1,47 @@
+"""
+Объединение одновременных одинаковых асинхронных вызовов
+"""
+from asyncio import Future, ensure_future, shield
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from item_menu.cache.counters import CacheCounters
+
+
+class SingleFlight:
+    """
+    Одновременные вызовы с одинаковым ключом ожидают результат одного выполняемого вызова
+    """
+    def __init__(self):
+        self._in_flight = {}  # type: Dict[Hashable, Future]
+        # попадание - вызов объединен с уже выполняемым, промах - вызов выполнен
+        self.counters = CacheCounters()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика объединения вызовов
+        @return: словарь счетчиков
+        """
+        return {
+            **self.counters.as_dict(),
+            'deduplicated': self.counters.hits,
+            'in_flight': len(self._in_flight)
+        }
+
+    async def run(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Выполнение вызова либо ожидание результата уже выполняемого вызова с тем же ключом
+        @param key: ключ вызова
+        @param func: асинхронная функция
+        @return: результат вызова
+        """
+        future = self._in_flight.get(key)
+        if future is None:
+            self.counters.misses += 1
+            future = ensure_future(func(*args, **kwargs))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.counters.hits += 1
+        # отмена одного из ожидающих запросов не отменяет общий вызов
+        return await shield(future)
@@ -1,6 +1,10 @@
 from .db import Database
+from .notifications import MenuChangeListener
+from .session import AsyncSession
 
 
 __all__ = [
-    'Database'
+    'Database',
+    'MenuChangeListener',
+    'AsyncSession'
 ]
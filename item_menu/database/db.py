@@ -1,5 +1,7 @@
 import logging
-from typing import Awaitable, Any, Coroutine
+import time
+from concurrent.futures import Executor
+from typing import Awaitable, Any, Callable, Coroutine, Iterable, Set
 
 from aiohttp import web
 from aiohttp.web_request import Request
@@ -8,7 +10,10 @@ from async_generator import yield_, async_generator, asynccontextmanager
 from dynaconf.utils.boxing import DynaBox
 from sqlalchemy import create_engine
 from sqlalchemy.exc import OperationalError
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import sessionmaker
+
+from item_menu.database.session import AsyncSession, track_changes
+from item_menu.metrics import DB_SESSION_DURATION, REQUEST_DURATION
 
 
 class Database:
@@ -23,6 +28,8 @@ class Database:
         self._config = config
         self._engine = None
         self._session = None
+        self._executor = None
+        self._commit_listeners = []
 
     @property
     def url(self) -> str:
@@ -39,41 +46,71 @@ class Database:
         }
         return 'postgresql://{user}:{password}@{host}:{port}/{name}'.format(**params)
 
-    async def initialize(self):
+    async def initialize(self, executor: Executor):
         """
         Инициализация связи с базой данных
+        @param executor: пул потоков, в котором выполняются все обращения к базе данных
         """
         logging.info('Connecting to DB {}'.format(self.url))
-        self._engine = create_engine(self.url)
+        self._engine = create_engine(
+            self.url,
+            pool_size=self._config.pool_size,
+            max_overflow=self._config.max_overflow
+        )
         self._session = sessionmaker(bind=self._engine)
+        track_changes(self._session)
+        self._executor = executor
 
         # проверка на наличие базы данных пинг-запросом
         async with self.asessioncontext() as session:
-            session.execute('SELECT 1;')
+            await session.execute('SELECT 1;')
             logging.info('Successfully connected to DB')
 
+    def add_commit_listener(self, listener: Callable[[Iterable[str]], Any]):
+        """
+        Подписка на фиксацию изменений в базе данных
+        @param listener: обработчик, получающий наименования измененных таблиц
+        """
+        self._commit_listeners.append(listener)
+
+    def _on_commit(self, changed_tables: Set[str]):
+        """
+        Оповещение подписчиков о фиксации изменений
+        @param changed_tables: наименования измененных таблиц
+        """
+        logging.debug('Committed changes in tables: {}'.format(', '.join(sorted(changed_tables))))
+        for listener in self._commit_listeners:
+            try:
+                listener(changed_tables)
+            except Exception as e:
+                logging.error('DB commit listener error: {}'.format(e))
+
     async def _asessioncontext(self):
         """
         Реализация контекстного менеджера сессии базы данных
         """
-        session = self._session(expire_on_commit=False)
+        session = AsyncSession(self._session(expire_on_commit=False), self._executor, self._on_commit)
+        started = time.perf_counter()
+        outcome = 'rollback'
         try:
             await yield_(session)
-            session.commit()
+            await session.commit()
+            outcome = 'commit'
         except OperationalError as oe:
-            session.rollback()
+            await session.rollback()
             logging.error('DB session error: {}'.format(oe))
             raise oe
         except Exception as e:
-            session.rollback()
+            await session.rollback()
             logging.error('DB session error: {}'.format(e))
             raise e
         finally:
-            session.close()
+            await session.close()
+            DB_SESSION_DURATION.observe(time.perf_counter() - started, outcome)
 
     @asynccontextmanager
     @async_generator
-    async def asessioncontext(self) -> Coroutine[Awaitable[Session], Any, Any]:
+    async def asessioncontext(self) -> Coroutine[Awaitable[AsyncSession], Any, Any]:
         """
         Интерфейс для работы с асинхронным контекстным менеджером сессии базы данных
         @return: контекстный менеджер сессии
@@ -88,10 +125,24 @@ class Database:
         @param handler: данные обработчика
         @return: ответ после оборачивания сессией
         """
-        async with self.asessioncontext() as request.app.context['session']:
-            logging.debug('Session is initialized: {}'.format(request.app.context['session']))
-            response = await handler(request)
-        return response
+        started = time.perf_counter()
+        status = 500
+        try:
+            # сессия привязывается к запросу, а не к общему контексту приложения,
+            # чтобы параллельные запросы не перезаписывали сессии друг друга
+            async with self.asessioncontext() as request['session']:
+                logging.debug('Session is initialized: {}'.format(request['session']))
+                response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise e
+        finally:
+            # метка маршрута - шаблон ресурса, а не путь запроса, чтобы количество серий не зависело от запросов
+            resource = request.match_info.route.resource
+            route = resource.canonical if resource is not None else 'unmatched'
+            REQUEST_DURATION.observe(time.perf_counter() - started, request.method, route, status)
 
     async def close(self):
         """
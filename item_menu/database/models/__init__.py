@@ -1,10 +1,14 @@
 from .base import BaseModel
-from .public import ItemModel, RootModel, ExecutionTypeModel
+from .public import ItemModel, RootModel, ExecutionTypeModel, PersistedQueryModel, MenuVersionModel, \
+    MenuVersionPendingModel
 
 
 __all__ = [
     'BaseModel',
     'ItemModel',
     'RootModel',
-    'ExecutionTypeModel'
+    'ExecutionTypeModel',
+    'PersistedQueryModel',
+    'MenuVersionModel',
+    'MenuVersionPendingModel'
 ]
@@ -1,18 +1,31 @@
 """
 Модели ORM для связи с базой данных
 """
-from sqlalchemy import BigInteger, Column, ForeignKey, Text, Sequence, Boolean, text
+from sqlalchemy import (
+    BigInteger, Column, ForeignKey, Text, Sequence, Boolean, text, Index, FetchedValue, any_, func, select, cast,
+    DateTime, CheckConstraint
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship, backref
+from sqlalchemy.sql.elements import ColumnElement
 
 from item_menu.database.models import BaseModel
 
 
 class ItemModel(BaseModel):
     __tablename__ = 'item'
-    __table_args__ = {
-        'schema': 'public',
-        'comment': 'Пункты меню'
-    }
+    __table_args__ = (
+        Index('ix_item_path', 'path', postgresql_using='gin'),
+        # триграммные индексы для поиска по частичному совпадению в наименованиях (расширение pg_trgm)
+        Index('ix_item_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        Index('ix_item_full_name_trgm', 'full_name', postgresql_using='gin',
+              postgresql_ops={'full_name': 'gin_trgm_ops'}),
+        {
+            'schema': 'public',
+            'comment': 'Пункты меню'
+        }
+    )
 
     item_id_seq = Sequence('item_id_seq', metadata=BaseModel.metadata)
     id = Column(
@@ -63,15 +76,57 @@ class ItemModel(BaseModel):
         doc='Видимость пункта в меню',
         comment='Видимость пункта в меню'
     )
+    # заполняется и поддерживается триггерами при добавлении пункта и изменении родительского пункта
+    path = Column(
+        ARRAY(BigInteger),
+        nullable=False,
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue(),
+        doc='Путь от корневого пункта до пункта включительно',
+        comment='Путь от корневого пункта до пункта включительно'
+    )
 
+    # дочерние пункты загружаются отсортированными по порядковому ID
     children = relationship(
         'ItemModel',
         backref=backref('parent', remote_side=[id]),
         uselist=True,
+        order_by=sorted_id,
         lazy='bulk'
     )
     exec_type = relationship('ExecutionTypeModel', lazy='bulk')
 
+    @hybrid_property
+    def depth(self) -> int:
+        """
+        Уровень вложенности пункта (0 - корневой пункт)
+        """
+        return len(self.path) - 1
+
+    @depth.expression
+    def depth(cls) -> ColumnElement:
+        return func.array_length(cls.path, 1) - 1
+
+    @classmethod
+    def subtree_of(cls, item_id: int) -> ColumnElement:
+        """
+        Условие выборки пункта и всех его потомков (по GIN-индексу пути)
+        @param item_id: ID пункта
+        @return: условие для фильтрации
+        """
+        return cls.path.contains(cast([item_id], ARRAY(BigInteger)))
+
+    @classmethod
+    def ancestors_of(cls, item_id: int) -> ColumnElement:
+        """
+        Условие выборки пункта и всех его предков (по первичному ключу из пути пункта)
+        @param item_id: ID пункта
+        @return: условие для фильтрации
+        """
+        # приведение типа оборачивает подзапрос, чтобы ANY применялся к элементам массива, а не к строкам
+        item_path = cast(select([cls.path]).where(cls.id == item_id).as_scalar(), ARRAY(BigInteger))
+        return cls.id == any_(item_path)
+
 
 class RootModel(BaseModel):
     __tablename__ = 'root'
@@ -110,3 +165,75 @@ class ExecutionTypeModel(BaseModel):
         doc='Наименование запускаемого типа',
         comment='Наименование запускаемого типа'
     )
+
+
+class PersistedQueryModel(BaseModel):
+    __tablename__ = 'persisted_query'
+    __table_args__ = {
+        'schema': 'public',
+        'comment': 'Сохраненные тексты GraphQL-запросов (automatic persisted queries)'
+    }
+
+    hash = Column(
+        Text,
+        primary_key=True,
+        doc='SHA-256 хэш текста запроса',
+        comment='SHA-256 хэш текста запроса'
+    )
+    query = Column(
+        Text,
+        nullable=False,
+        doc='Текст запроса',
+        comment='Текст запроса'
+    )
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        doc='Время сохранения запроса',
+        comment='Время сохранения запроса'
+    )
+
+
+class MenuVersionModel(BaseModel):
+    __tablename__ = 'menu_version'
+    __table_args__ = (
+        CheckConstraint('id', name='menu_version_single_row'),
+        {
+            'schema': 'public',
+            'comment': 'Версия данных меню, увеличивается при каждом изменении таблиц меню'
+        }
+    )
+
+    id = Column(
+        Boolean,
+        primary_key=True,
+        server_default=text('true'),
+        doc='Единственная строка таблицы',
+        comment='Единственная строка таблицы'
+    )
+    # увеличивается при фиксации транзакции, изменившей строки таблиц item, exec_type и root
+    version = Column(
+        BigInteger,
+        nullable=False,
+        server_default=text('0'),
+        doc='Версия данных меню',
+        comment='Версия данных меню'
+    )
+
+
+class MenuVersionPendingModel(BaseModel):
+    __tablename__ = 'menu_version_pending'
+    __table_args__ = {
+        'schema': 'public',
+        'comment': 'Транзакции, изменившие таблицы меню, до увеличения версии данных меню при фиксации'
+    }
+
+    # строка добавляется триггерами таблиц меню и удаляется отложенным триггером при фиксации транзакции
+    txid = Column(
+        BigInteger,
+        primary_key=True,
+        autoincrement=False,
+        doc='ID транзакции, изменившей таблицы меню',
+        comment='ID транзакции, изменившей таблицы меню'
+    )
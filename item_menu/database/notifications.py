@@ -0,0 +1,177 @@
+"""
+Уведомления PostgreSQL (LISTEN/NOTIFY) об изменении данных меню другими процессами
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+from dynaconf.utils.boxing import DynaBox
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+
+# канал уведомлений, в который триггеры таблиц меню публикуют версию данных меню (см. menu_version_increment)
+MENU_CHANNEL = 'menu_changes'
+# TCP keepalive соединения слушателя: обрыв связи без закрытия соединения обнаруживается за ~1 минуту
+KEEPALIVE_PARAMS = {
+    'keepalives': 1,
+    'keepalives_idle': 30,
+    'keepalives_interval': 10,
+    'keepalives_count': 3
+}
+
+
+class MenuChangeListener:
+    """
+    Слушатель уведомлений об изменении данных меню. Уведомления доставляются всем процессам сервиса
+    после фиксации транзакции, изменившей таблицы меню; при потере соединения выполняется
+    повторное подключение с экспоненциально растущей задержкой
+    """
+    def __init__(self, url: str, config: DynaBox, on_change: Callable[[Optional[int]], Any]):
+        """
+        Инициализация слушателя
+        @param url: URL базы данных
+        @param config: данные конфигурации уведомлений
+        @param on_change: обработчик, получающий версию данных меню
+        (None - после повторного подключения, когда уведомления могли быть пропущены)
+        """
+        self._url = url
+        self.enabled = config.enabled
+        self._reconnect_delay = config.reconnect_delay
+        self._max_reconnect_delay = config.max_reconnect_delay
+        self._on_change = on_change
+        self._task = None  # type: Optional[asyncio.Task]
+        self._connection = None
+
+        self.connected = False
+        self.notifications = 0
+        self.reconnects = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика слушателя
+        @return: словарь счетчиков
+        """
+        return {
+            'connected': self.connected,
+            'notifications': self.notifications,
+            'reconnects': self.reconnects
+        }
+
+    async def start(self):
+        """
+        Запуск фоновой задачи слушателя
+        """
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """
+        Остановка фоновой задачи слушателя
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _connect(self):
+        """
+        Открытие соединения слушателя и подписка на канал уведомлений (выполняется в пуле потоков)
+        @return: соединение psycopg2
+        """
+        connection = psycopg2.connect(self._url, **KEEPALIVE_PARAMS)
+        try:
+            connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with connection.cursor() as cursor:
+                cursor.execute('LISTEN {};'.format(MENU_CHANNEL))
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    async def _run(self):
+        """
+        Цикл подключения и получения уведомлений
+        """
+        loop = asyncio.get_event_loop()
+        delay = self._reconnect_delay
+        first_connection = True
+        while True:
+            try:
+                self._connection = await loop.run_in_executor(None, self._connect)
+                self.connected = True
+                delay = self._reconnect_delay
+                logging.info('Listening to DB channel {}'.format(MENU_CHANNEL))
+                if not first_connection:
+                    self.reconnects += 1
+                    # изменения, зафиксированные во время отсутствия соединения, неизвестны
+                    self._notify(None)
+                first_connection = False
+                await self._listen(self._connection)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error('DB notifications listener error: {}. Reconnecting in {:.1f}s'.format(e, delay))
+            finally:
+                self.connected = False
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._max_reconnect_delay)
+
+    async def _listen(self, connection: Any):
+        """
+        Получение уведомлений по готовности сокета соединения к чтению
+        @param connection: соединение psycopg2
+        """
+        loop = asyncio.get_event_loop()
+        lost = loop.create_future()
+
+        def on_readable():
+            try:
+                connection.poll()
+            except Exception as e:
+                if not lost.done():
+                    lost.set_exception(e)
+                return
+            while connection.notifies:
+                self._on_notify(connection.notifies.pop(0).payload)
+
+        fileno = connection.fileno()
+        loop.add_reader(fileno, on_readable)
+        try:
+            await lost
+        finally:
+            loop.remove_reader(fileno)
+
+    def _on_notify(self, payload: str):
+        """
+        Разбор уведомления
+        @param payload: данные уведомления (JSON с версией данных меню)
+        """
+        self.notifications += 1
+        try:
+            menu_version = int(json.loads(payload)['version'])
+        except (ValueError, TypeError, KeyError) as e:
+            logging.error('Invalid DB notification {!r}: {}'.format(payload, e))
+            menu_version = None
+        logging.debug('Menu changes are notified: {}'.format(payload))
+        self._notify(menu_version)
+
+    def _notify(self, menu_version: Optional[int]):
+        """
+        Вызов обработчика изменения данных меню
+        @param menu_version: версия данных меню (опционально)
+        """
+        try:
+            self._on_change(menu_version)
+        except Exception as e:
+            logging.error('DB notifications handler error: {}'.format(e))
@@ -0,0 +1,152 @@
+"""
+Асинхронная обертка над сессией базы данных
+"""
+from asyncio import Lock, get_event_loop
+from concurrent.futures import Executor
+from functools import partial
+from itertools import chain
+from typing import Any, Callable, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Query, Session, sessionmaker
+
+
+# ключ словаря данных сессии, в котором накапливаются наименования измененных таблиц
+CHANGED_TABLES_KEY = 'changed_tables'
+
+
+def mark_changed(session: Session, *tables: str):
+    """
+    Отметка таблиц, измененных в сессии
+    @param session: сессия базы данных
+    @param tables: наименования таблиц
+    """
+    session.info.setdefault(CHANGED_TABLES_KEY, set()).update(tables)
+
+
+def track_changes(session_factory: sessionmaker):
+    """
+    Регистрация обработчиков событий, собирающих наименования измененных в сессии таблиц
+    @param session_factory: фабрика сессий
+    """
+    @event.listens_for(session_factory, 'before_flush')
+    def before_flush(session: Session, _flush_context, _instances):
+        instances = chain(session.new, session.dirty, session.deleted)
+        mark_changed(session, *{instance.__table__.name for instance in instances})
+
+    @event.listens_for(session_factory, 'after_bulk_update')
+    def after_bulk_update(update_context):
+        mark_changed(update_context.session, update_context.mapper.local_table.name)
+
+    @event.listens_for(session_factory, 'after_bulk_delete')
+    def after_bulk_delete(delete_context):
+        mark_changed(delete_context.session, delete_context.mapper.local_table.name)
+
+
+class AsyncSession:
+    """
+    Прокси-класс сессии базы данных, выполняющий все обращения к базе данных в пуле потоков
+    """
+    def __init__(self, session: Session, executor: Executor,
+                 on_commit: Callable[[Set[str]], Any] = None):
+        """
+        Инициализация прокси-класса сессии
+        @param session: синхронная сессия базы данных
+        @param executor: пул потоков для выполнения блокирующих операций
+        @param on_commit: обработчик фиксации изменений, получающий наименования измененных таблиц
+        """
+        self._session = session
+        self._executor = executor
+        self._on_commit = on_commit
+        # сессия не потокобезопасна, поэтому операции одного запроса выполняются последовательно
+        self._lock = Lock()
+
+    @property
+    def sync_session(self) -> Session:
+        """
+        Синхронная сессия базы данных
+        @return: сессия
+        """
+        return self._session
+
+    @property
+    def info(self) -> dict:
+        """
+        Словарь пользовательских данных сессии
+        @return: словарь данных сессии
+        """
+        return self._session.info
+
+    def query(self, *entities, **kwargs) -> Query:
+        """
+        Построение запроса без обращения к базе данных
+        @param entities: сущности запроса
+        @return: запрос
+        """
+        return self._session.query(*entities, **kwargs)
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Выполнение блокирующей функции в пуле потоков
+        @param func: функция
+        @return: результат выполнения функции
+        """
+        async with self._lock:
+            return await get_event_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def all(self, query: Query) -> List[Any]:
+        return await self.run(query.all)
+
+    async def first(self, query: Query) -> Optional[Any]:
+        return await self.run(query.first)
+
+    async def scalar(self, query: Query) -> Any:
+        return await self.run(query.scalar)
+
+    async def count(self, query: Query) -> int:
+        return await self.run(query.count)
+
+    async def update(self, query: Query, values: dict, **kwargs) -> int:
+        return await self.run(query.update, values, **kwargs)
+
+    async def delete(self, query: Query, **kwargs) -> int:
+        return await self.run(query.delete, **kwargs)
+
+    async def load(self, instance: Any, attribute: str) -> Any:
+        """
+        Загрузка (в том числе ленивая) атрибута объекта ORM
+        @param instance: объект ORM
+        @param attribute: наименование атрибута
+        @return: значение атрибута
+        """
+        return await self.run(getattr, instance, attribute)
+
+    async def execute(self, *args, **kwargs) -> Any:
+        return await self.run(self._session.execute, *args, **kwargs)
+
+    async def add(self, instance: Any):
+        await self.run(self._session.add, instance)
+
+    async def flush(self):
+        await self.run(self._session.flush)
+
+    def mark_changed(self, *tables: str):
+        """
+        Отметка таблиц, измененных в обход ORM (например, текстовыми SQL-запросами)
+        @param tables: наименования таблиц
+        """
+        mark_changed(self._session, *tables)
+
+    async def commit(self):
+        await self.run(self._session.commit)
+
+        changed_tables = self._session.info.pop(CHANGED_TABLES_KEY, None)
+        if changed_tables and self._on_commit:
+            self._on_commit(changed_tables)
+
+    async def rollback(self):
+        await self.run(self._session.rollback)
+        self._session.info.pop(CHANGED_TABLES_KEY, None)
+
+    async def close(self):
+        await self.run(self._session.close)
@@ -0,0 +1,214 @@
+"""
+Порядок сортировки пунктов одного уровня: блокировка уровня и сдвиг порядка сортировки одним запросом,
+блокировка предков пункта при перемещении между ветвями
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func, select, text
+
+from item_menu.database import AsyncSession
+from item_menu.database.models import ItemModel
+
+
+# пространство ключей рекомендательных блокировок уровней меню (первый ключ pg_advisory_xact_lock)
+SIBLINGS_LOCK_NAMESPACE = 0x6d656e75
+
+
+def get_siblings_lock_key(parent_id: Optional[int]) -> int:
+    """
+    Ключ блокировки уровня в диапазоне int4 (совпадение ключей разных уровней приводит только к ожиданию)
+    @param parent_id: ID родительского пункта
+    @return: второй ключ pg_advisory_xact_lock
+    """
+    return ((parent_id or 0) + 2 ** 31) % 2 ** 32 - 2 ** 31
+
+
+async def lock_siblings(session: AsyncSession, *parent_ids: Optional[int]):
+    """
+    Блокировка изменения порядка сортировки пунктов одного уровня до завершения транзакции.
+    Изменения порядка на разных уровнях выполняются параллельно
+    @param session: сессия базы данных
+    @param parent_ids: ID родительских пунктов
+    """
+    # блокировки нескольких уровней берутся в порядке ключей, чтобы параллельные мутации не ждали друг друга по кругу
+    for key in sorted({get_siblings_lock_key(parent_id) for parent_id in parent_ids}):
+        await session.execute(select([func.pg_advisory_xact_lock(SIBLINGS_LOCK_NAMESPACE, key)]))
+
+
+async def lock_ancestors(session: AsyncSession, *item_ids: int) -> Dict[int, List[int]]:
+    """
+    Блокировка строк пунктов и всех их предков до завершения транзакции. Перемещения в разные ветви
+    с общими предками выполняются последовательно, поэтому проверка цикла по пути нового родительского пункта
+    не пропускает параллельного перемещения, образующего цикл
+    @param session: сессия базы данных
+    @param item_ids: ID пунктов
+    @return: словарь ID пункта - путь, перечитанный после получения блокировок (удаленные пункты отсутствуют)
+    """
+    if not item_ids:
+        return {}
+    paths_query = session.query(ItemModel.id, ItemModel.path).filter(ItemModel.id.in_(set(item_ids)))
+    locked_ids = set()  # type: Set[int]
+    while True:
+        paths = {row.id: row.path for row in await session.all(paths_query)}
+        ancestor_ids = {ancestor_id for path in paths.values() for ancestor_id in path}
+        # путь мог измениться до получения блокировки: блокируются предки, появившиеся в пути
+        if ancestor_ids <= locked_ids:
+            return paths
+        # строки блокируются в порядке ID, чтобы параллельные перемещения не ждали друг друга по кругу
+        await session.execute(
+            text('select id from public.item where id = any(:ids) order by id for update'),
+            {'ids': sorted(ancestor_ids - locked_ids)}
+        )
+        locked_ids |= ancestor_ids
+
+
+async def count_siblings(session: AsyncSession, parent_id: Optional[int]) -> int:
+    """
+    Количество пунктов одного уровня
+    @param session: сессия базы данных
+    @param parent_id: ID родительского пункта
+    @return: количество пунктов
+    """
+    return await session.count(session.query(ItemModel).filter_by(parent_id=parent_id))
+
+
+async def get_locked_positions(session: AsyncSession, item_ids: Iterable[int]) -> Dict[int, Any]:
+    """
+    Текущие родительские пункты и порядок сортировки пунктов, перечитанные одним запросом после блокировки уровней
+    (пункт мог быть перемещен или удален параллельной транзакцией до получения блокировки)
+    @param session: сессия базы данных
+    @param item_ids: ID пунктов
+    @return: словарь ID пункта - строка (id, parent_id, sorted_id), удаленные пункты отсутствуют
+    """
+    item_ids = set(item_ids)
+    if not item_ids:
+        return {}
+    rows_query = session.query(ItemModel.id, ItemModel.parent_id, ItemModel.sorted_id).filter(
+        ItemModel.id.in_(item_ids)
+    )
+    return {row.id: row for row in await session.all(rows_query)}
+
+
+async def shift_siblings(session: AsyncSession, parent_id: Optional[int], step: int,
+                         start: int, end: int = None) -> int:
+    """
+    Сдвиг порядка сортировки пунктов одного уровня в диапазоне одним запросом UPDATE
+    @param session: сессия базы данных
+    @param parent_id: ID родительского пункта
+    @param step: величина сдвига
+    @param start: начало диапазона порядка сортировки включительно
+    @param end: конец диапазона порядка сортировки включительно (опционально, до последнего пункта уровня)
+    @return: количество сдвинутых пунктов
+    """
+    if end is not None and end < start:
+        return 0
+    criterion = ItemModel.sorted_id.between(start, end) if end is not None else ItemModel.sorted_id >= start
+    # пункты сессии не синхронизируются: порядок сортировки сдвинутых пунктов перечитывается после фиксации
+    return await session.update(
+        session.query(ItemModel).filter(ItemModel.parent_id == parent_id, criterion),
+        {ItemModel.sorted_id: ItemModel.sorted_id + step},
+        synchronize_session=False
+    )
+
+
+class SiblingOrder:
+    """
+    Порядок пунктов уровней в памяти: изменения применяются последовательно, как при выполнении отдельных мутаций,
+    а в базу данных одним запросом записываются только изменившиеся порядковые ID
+    """
+    def __init__(self, rows: Iterable):
+        """
+        Инициализация порядка пунктов
+        @param rows: строки (id, parent_id, sorted_id), отсортированные по порядку сортировки на каждом уровне
+        """
+        self.siblings = defaultdict(list)  # type: Dict[Optional[int], List[int]]
+        self.sorted_ids = {}  # type: Dict[int, int]
+        for row in rows:
+            self.siblings[row.parent_id].append(row.id)
+            self.sorted_ids[row.id] = row.sorted_id
+
+    @classmethod
+    async def load(cls, session: AsyncSession, parent_ids: Iterable[Optional[int]]) -> 'SiblingOrder':
+        """
+        Загрузка порядка пунктов уровней одним запросом (уровни должны быть заблокированы)
+        @param session: сессия базы данных
+        @param parent_ids: ID родительских пунктов
+        @return: порядок пунктов
+        """
+        parent_ids = {parent_id for parent_id in parent_ids if parent_id is not None}
+        if not parent_ids:
+            return cls([])
+        rows_query = session.query(ItemModel.id, ItemModel.parent_id, ItemModel.sorted_id).filter(
+            ItemModel.parent_id.in_(parent_ids)
+        ).order_by(ItemModel.parent_id, ItemModel.sorted_id, ItemModel.id)
+        return cls(await session.all(rows_query))
+
+    def count(self, parent_id: Optional[int]) -> int:
+        return len(self.siblings[parent_id])
+
+    def insert(self, parent_id: Optional[int], item_id: int, sorted_id: int = None) -> int:
+        """
+        Добавление пункта на уровень со сдвигом вперед следующих пунктов
+        @param parent_id: ID родительского пункта
+        @param item_id: ID пункта
+        @param sorted_id: позиция пункта (опционально, в конец уровня)
+        @return: позиция пункта
+        """
+        siblings = self.siblings[parent_id]
+        if sorted_id is None:
+            sorted_id = len(siblings)
+        siblings.insert(sorted_id, item_id)
+        return sorted_id
+
+    def remove(self, parent_id: Optional[int], item_id: int):
+        """
+        Удаление пункта с уровня со сдвигом назад следующих пунктов
+        @param parent_id: ID родительского пункта
+        @param item_id: ID пункта
+        """
+        self.siblings[parent_id].remove(item_id)
+
+    def move(self, parent_id: Optional[int], item_id: int, sorted_id: int):
+        """
+        Перемещение пункта на позицию уровня со сдвигом пунктов между прежней и новой позицией
+        @param parent_id: ID родительского пункта
+        @param item_id: ID пункта
+        @param sorted_id: новая позиция пункта
+        """
+        self.remove(parent_id, item_id)
+        self.insert(parent_id, item_id, sorted_id)
+
+    def get_changes(self) -> Dict[int, int]:
+        """
+        Изменившиеся порядковые ID пунктов
+        @return: словарь ID пункта - новый порядковый ID
+        """
+        return {
+            item_id: sorted_id
+            for siblings in self.siblings.values()
+            for sorted_id, item_id in enumerate(siblings)
+            if self.sorted_ids.get(item_id) != sorted_id
+        }
+
+    async def save(self, session: AsyncSession, exclude: Iterable[int] = ()) -> int:
+        """
+        Запись изменившихся порядковых ID одним запросом UPDATE
+        @param session: сессия базы данных
+        @param exclude: ID пунктов, не записываемых в запросе (например, добавляемых с готовым порядковым ID)
+        @return: количество измененных пунктов
+        """
+        exclude = set(exclude)
+        changes = {item_id: sorted_id for item_id, sorted_id in self.get_changes().items() if item_id not in exclude}
+        if not changes:
+            return 0
+        await session.execute(text('''
+            update public.item
+            set sorted_id = changes.sorted_id
+            from unnest(cast(:ids as int8[]), cast(:sorted_ids as int8[])) as changes(id, sorted_id)
+            where item.id = changes.id
+        '''), {'ids': list(changes), 'sorted_ids': list(changes.values())})
+        # запрос выполняется в обход ORM
+        session.mark_changed(ItemModel.__tablename__)
+        self.sorted_ids.update(changes)
+        return len(changes)
@@ -1,6 +1,7 @@
 """
 Сортировки для запросов на уровне базы данных
 """
+from operator import attrgetter
 from typing import List
 
 from sqlalchemy import cast, func, String, Integer, text
@@ -8,8 +9,9 @@ from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Query
 from sqlalchemy.sql.elements import Cast
 
-from item_menu.api.orders import ItemSort
-from item_menu.database.models import BaseModel
+from item_menu.api.orders import ItemSort, SortOrderEnum
+from item_menu.api.pagination import SortKey
+from item_menu.database.models import BaseModel, ItemModel
 
 
 async def get_paragraph_order(model: BaseModel) -> Cast:
@@ -40,3 +42,41 @@ async def sort_by(query: Query, sort: List[ItemSort]) -> Query:
         sort_fields_and_rules = text('{} {} nulls {}'.format(s.field, s.order, s.nulls))
         order.append(sort_fields_and_rules)
     return query.order_by(*order)
+
+
+def get_paragraph_key(item: ItemModel) -> List[int]:
+    """
+    Ключ сортировки в памяти, аналогичный сортировке по числовому параграфовидному префиксу наименования
+    @param item: пункт
+    @return: список чисел префикса наименования
+    """
+    return [int(number) for number in item.name.split(' ')[0].split('.')]
+
+
+def sort_items(items: List[ItemModel], sort: List[ItemSort]) -> List[ItemModel]:
+    """
+    Сортировка пунктов в памяти по введенным в правила данным
+    @param items: список пунктов
+    @param sort: список правил сортировки
+    @return: список пунктов, отсортированный по введенным правилам сортировки
+    """
+    items = sorted(items, key=attrgetter('id'))
+    # устойчивая сортировка от последнего правила к первому;
+    # поля сортировки не допускают null-значений, поэтому порядок null-значений не учитывается
+    for s in reversed(sort):
+        items.sort(key=attrgetter(s.field), reverse=s.order == SortOrderEnum.DESC.value)
+    return items
+
+
+def get_sort_keys(sort: List[ItemSort]) -> List[SortKey]:
+    """
+    Ключ сортировки для keyset-пагинации по введенным в правила данным
+    @param sort: список правил сортировки
+    @return: поля ключа сортировки, дополненные уникальным ID пункта
+    """
+    sort_keys = [
+        SortKey(getattr(ItemModel, s.field), attrgetter(s.field), s.order == SortOrderEnum.DESC.value) for s in sort
+    ]
+    if not any(s.field == 'id' for s in sort):
+        sort_keys.append(SortKey(ItemModel.id, attrgetter('id')))
+    return sort_keys
@@ -0,0 +1,397 @@
+"""
+Выгрузка и загрузка всего меню (пункты, запускаемые типы и корневой пункт) в форматах JSON и CSV.
+Загрузка выполняется командой COPY во временные таблицы и объединением с таблицами меню несколькими
+запросами на все строки: порядок сортировки и пути вычисляются до вставки, построчные триггеры пунктов пропускаются
+"""
+import csv
+import io
+import json
+from collections import OrderedDict
+from typing import Any, Dict, IO, Iterator, List
+
+from psycopg2 import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from item_menu.database.session import mark_changed
+
+
+FORMATS = ('json', 'csv')
+# таблицы меню в порядке загрузки (по внешним ключам) и их выгружаемые столбцы с типами временных таблиц
+TABLES = OrderedDict([
+    ('exec_type', OrderedDict([('id', 'int8'), ('name', 'text')])),
+    ('item', OrderedDict([
+        ('id', 'int8'), ('parent_id', 'int8'), ('sorted_id', 'int8'), ('name', 'text'), ('full_name', 'text'),
+        ('key', 'text'), ('exec_type_id', 'int8'), ('visible', 'bool')
+    ])),
+    ('root', OrderedDict([('item_id', 'int8')]))
+])
+PRIMARY_KEYS = {'exec_type': 'id', 'item': 'id', 'root': 'item_id'}
+
+
+class TransferError(ValueError):
+    """
+    Ошибка данных загружаемого меню
+    """
+
+
+def _get_columns(table: str) -> str:
+    return ', '.join(TABLES[table])
+
+
+def _get_cursor(session: Session) -> Any:
+    """
+    Курсор DBAPI-соединения транзакции сессии (для команды COPY)
+    @param session: сессия базы данных
+    @return: курсор psycopg2
+    """
+    return session.connection().connection.cursor()
+
+
+def export_csv(session: Session, table: str, output: IO):
+    """
+    Выгрузка таблицы меню в формате CSV с заголовком командой COPY
+    @param session: сессия базы данных
+    @param table: наименование таблицы
+    @param output: файл для записи
+    """
+    if table not in TABLES:
+        raise TransferError('Unknown table: {}'.format(table))
+    with _get_cursor(session) as cursor:
+        query = 'select {columns} from public.{table} order by {key}'.format(
+            columns=_get_columns(table), table=table, key=PRIMARY_KEYS[table]
+        )
+        cursor.copy_expert('copy ({}) to stdout with (format csv, header true)'.format(query), output)
+
+
+def iter_json(session: Session, batch_size: int = 1000) -> Iterator[str]:
+    """
+    Выгрузка всех таблиц меню одним JSON-документом {"exec_type": [...], "item": [...], "root": [...]}.
+    Строки читаются серверным курсором порциями, поэтому объем памяти не зависит от количества пунктов
+    @param session: сессия базы данных
+    @param batch_size: количество строк, читаемых за одно обращение к базе данных
+    @return: итератор частей документа
+    """
+    connection = session.connection().connection
+    for index, table in enumerate(TABLES):
+        yield '{}{}: ['.format('{' if not index else '], ', json.dumps(table))
+        with connection.cursor(name='menu_export_{}'.format(table)) as cursor:
+            cursor.itersize = batch_size
+            cursor.execute('select {columns} from public.{table} order by {key}'.format(
+                columns=_get_columns(table), table=table, key=PRIMARY_KEYS[table]
+            ))
+            columns = list(TABLES[table])
+            separator = ''
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield separator + ', '.join(
+                    json.dumps(dict(zip(columns, row)), ensure_ascii=False) for row in rows
+                )
+                separator = ', '
+    yield ']}'
+
+
+def _to_copy_text(value: Any) -> str:
+    """
+    Значение поля в текстовом формате команды COPY
+    @param value: значение
+    @return: строка значения
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _rows_to_copy_text(table: str, rows: List[Dict[str, Any]]) -> IO[str]:
+    """
+    Преобразование строк JSON-документа в данные команды COPY в текстовом формате
+    (с перечнем отсутствующих в строке столбцов в последнем поле)
+    @param table: наименование таблицы
+    @param rows: строки таблицы
+    @return: файл данных
+    """
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise TransferError('Table {} must be a list of objects'.format(table))
+    columns = list(TABLES[table])
+    data = io.StringIO()
+    for row in rows:
+        unknown_columns = set(row) - set(columns)
+        if unknown_columns:
+            raise TransferError('Unknown columns of table {}: {}'.format(table, ', '.join(sorted(unknown_columns))))
+        if PRIMARY_KEYS[table] not in row:
+            raise TransferError('Table {} must contain column {}'.format(table, PRIMARY_KEYS[table]))
+        absent_columns = [column for column in columns if column not in row]
+        data.write('\t'.join(_to_copy_text(row.get(column)) for column in columns))
+        data.write('\t{{{}}}\n'.format(','.join(absent_columns)))
+    data.seek(0)
+    return data
+
+
+def import_json(session: Session, data: IO[str], replace: bool = False) -> Dict[str, int]:
+    """
+    Загрузка меню из JSON-документа выгрузки (без замены меню отсутствующие в строке поля существующих строк
+    не изменяются, при замене - заполняются значениями по умолчанию)
+    @param session: сессия базы данных
+    @param data: файл JSON-документа
+    @param replace: флаг замены меню (строки, отсутствующие в документе, удаляются)
+    @return: количество загруженных строк по таблицам
+    """
+    try:
+        document = json.load(data)
+    except ValueError as e:
+        raise TransferError('Invalid JSON: {}'.format(e))
+    if not isinstance(document, dict):
+        raise TransferError('JSON document must be an object with tables')
+    tables = OrderedDict(
+        (table, _rows_to_copy_text(table, document[table])) for table in TABLES if table in document
+    )
+    return _import(session, tables, 'text', replace)
+
+
+def import_csv(session: Session, tables: Dict[str, IO[str]], replace: bool = False) -> Dict[str, int]:
+    """
+    Загрузка меню из файлов CSV с заголовком (по одному файлу на таблицу; без замены меню отсутствующие
+    в заголовке столбцы существующих строк не изменяются, при замене - заполняются значениями по умолчанию)
+    @param session: сессия базы данных
+    @param tables: словарь наименование таблицы - файл CSV
+    @param replace: флаг замены меню (строки загружаемых таблиц, отсутствующие в файлах, удаляются)
+    @return: количество загруженных строк по таблицам
+    """
+    unknown_tables = set(tables) - set(TABLES)
+    if unknown_tables:
+        raise TransferError('Unknown tables: {}'.format(', '.join(sorted(unknown_tables))))
+    tables = OrderedDict((table, tables[table]) for table in TABLES if table in tables)
+    return _import(session, tables, 'csv', replace)
+
+
+def _read_header(table: str, data: IO[str]) -> List[str]:
+    """
+    Чтение заголовка файла CSV: загружаются только перечисленные в нем столбцы
+    @param table: наименование таблицы
+    @param data: файл CSV
+    @return: столбцы таблицы
+    """
+    columns = next(csv.reader([data.readline()]), [])
+    unknown_columns = set(columns) - set(TABLES[table])
+    if unknown_columns:
+        raise TransferError('Unknown columns of table {}: {}'.format(table, ', '.join(sorted(unknown_columns))))
+    if PRIMARY_KEYS[table] not in columns:
+        raise TransferError('Table {} must contain column {}'.format(table, PRIMARY_KEYS[table]))
+    return columns
+
+
+def _import(session: Session, tables: Dict[str, IO[str]], copy_format: str, replace: bool) -> Dict[str, int]:
+    """
+    Загрузка таблиц меню через временные таблицы в транзакции сессии
+    @param session: сессия базы данных
+    @param tables: словарь наименование таблицы - файл данных команды COPY
+    @param copy_format: формат данных команды COPY (text либо csv с заголовком)
+    @param replace: флаг замены строк загружаемых таблиц
+    @return: количество загруженных строк по таблицам
+    """
+    options = 'format csv' if copy_format == 'csv' else 'format text'
+    counts = OrderedDict()
+    try:
+        with _get_cursor(session) as cursor:
+            # построчные триггеры пунктов пропускаются до конца транзакции
+            cursor.execute("set local item_menu.bulk_import = 'on'")
+            for table, data in tables.items():
+                if copy_format == 'csv':
+                    columns = _read_header(table, data)
+                    absent_columns = [column for column in TABLES[table] if column not in columns]
+                else:
+                    # перечень отсутствующих столбцов указан в каждой строке
+                    columns = list(TABLES[table]) + ['absent_columns']
+                    absent_columns = []
+                cursor.execute(
+                    'create temp table {table}_import ({columns}, absent_columns text[] default %s) '
+                    'on commit drop'.format(
+                        table=table, columns=', '.join('{} {}'.format(*column) for column in TABLES[table].items())
+                    ),
+                    (absent_columns,)
+                )
+                cursor.copy_expert('copy {table}_import ({columns}) from stdin with ({options})'.format(
+                    table=table, columns=', '.join(columns), options=options
+                ), data)
+                if not replace:
+                    _fill_absent_columns(cursor, table)
+                cursor.execute('select count(*) from {}_import'.format(table))
+                counts[table] = cursor.fetchone()[0]
+                # временные таблицы не обрабатываются autovacuum, статистика нужна планировщику объединения
+                cursor.execute('analyze {}_import'.format(table))
+
+            if 'exec_type' in tables:
+                cursor.execute('''
+                    insert into public.exec_type (id, name)
+                    select id, name from exec_type_import
+                    on conflict (id) do update set name = excluded.name
+                ''')
+            if 'item' in tables:
+                _merge_items(cursor)
+            if replace and 'item' in tables:
+                # вложенные пункты удаляются каскадно
+                cursor.execute('''
+                    delete from public.item
+                    where not exists (select from item_import where item_import.id = item.id)
+                ''')
+            if replace and 'exec_type' in tables:
+                cursor.execute('''
+                    delete from public.exec_type
+                    where not exists (select from exec_type_import where exec_type_import.id = exec_type.id)
+                ''')
+            if 'root' in tables:
+                if counts['root'] != 1:
+                    raise TransferError('Table root must contain exactly one row')
+                cursor.execute('delete from public.root')
+                cursor.execute('insert into public.root (item_id) select item_id from root_import')
+
+            # последовательности продолжаются после загруженных ID; setval не откатывается с транзакцией,
+            # поэтому последовательность только увеличивается
+            for table in ('item', 'exec_type'):
+                cursor.execute('''
+                    select setval('public.{table}_id_seq', max(id)) from public.{table}
+                    having max(id) > (select last_value from public.{table}_id_seq)
+                '''.format(table=table))
+            # временные таблицы удаляются сразу: в транзакции может быть выполнено несколько загрузок
+            for table in tables:
+                cursor.execute('drop table {}_import'.format(table))
+    except (DataError, IntegrityError) as e:
+        # недопустимые значения и нарушения внешних ключей в загружаемых данных
+        raise TransferError(str(e).strip())
+
+    # изменения выполнены в обход ORM
+    mark_changed(session, *tables)
+    return counts
+
+
+def _fill_absent_columns(cursor: Any, table: str):
+    """
+    Заполнение отсутствующих в загрузке столбцов существующих строк их текущими значениями,
+    чтобы объединение не перезаписывало их значениями по умолчанию.
+    Порядок сортировки пункта, перемещаемого к другому родительскому пункту, не сохраняется
+    (пункт добавляется в конец нового уровня)
+    @param cursor: курсор транзакции загрузки
+    @param table: наименование таблицы
+    """
+    key = PRIMARY_KEYS[table]
+    values = []
+    for column in TABLES[table]:
+        if column == key:
+            continue
+        value = "case when '{column}' = any(imported.absent_columns) then existing.{column} " \
+                "else imported.{column} end".format(column=column)
+        if column == 'sorted_id':
+            parent_id = "case when 'parent_id' = any(imported.absent_columns) then existing.parent_id " \
+                        "else imported.parent_id end"
+            value = "case when '{column}' = any(imported.absent_columns) " \
+                    "and {parent_id} is not distinct from existing.parent_id then existing.{column} " \
+                    "else imported.{column} end".format(column=column, parent_id=parent_id)
+        values.append('{} = {}'.format(column, value))
+    if not values:
+        return
+    cursor.execute('''
+        update {table}_import imported
+        set {values}
+        from public.{table} existing
+        where existing.{key} = imported.{key} and cardinality(imported.absent_columns) > 0
+    '''.format(table=table, values=', '.join(values), key=key))
+
+
+def _merge_items(cursor: Any):
+    """
+    Объединение загруженных пунктов с таблицей пунктов.
+    Незаданный порядок сортировки продолжает порядок уровня, незаданное полное наименование - наименование.
+    Пути вычисляются до вставки одним рекурсивным запросом, поэтому пункты записываются один раз
+    @param cursor: курсор транзакции загрузки
+    """
+    cursor.execute('''
+        with numbered as (
+            select id, parent_id, row_number() over (partition by parent_id order by id) as number
+            from item_import
+            where sorted_id is null
+        ), last_sorted as (
+            select parent_id, max(sorted_id) as sorted_id
+            from (
+                select parent_id, sorted_id from item_import where sorted_id is not null
+                union all
+                select parent_id, sorted_id from public.item
+                where parent_id in (select parent_id from numbered)
+                    and not exists (select from item_import where item_import.id = item.id)
+            ) siblings
+            group by parent_id
+        )
+        update item_import
+        set sorted_id = coalesce(last_sorted.sorted_id, -1) + numbered.number
+        from numbered
+        left join last_sorted on last_sorted.parent_id is not distinct from numbered.parent_id
+        where item_import.id = numbered.id
+    ''')
+    _compute_paths(cursor)
+    cursor.execute('''
+        insert into public.item (id, parent_id, sorted_id, name, full_name, key, exec_type_id, visible, path)
+        select item_import.id, parent_id, sorted_id, name, coalesce(full_name, name), key, exec_type_id,
+               coalesce(visible, false), item_path.path
+        from item_import
+        join item_path on item_path.id = item_import.id
+        on conflict (id) do update set
+            parent_id = excluded.parent_id,
+            sorted_id = excluded.sorted_id,
+            name = excluded.name,
+            full_name = excluded.full_name,
+            key = excluded.key,
+            exec_type_id = excluded.exec_type_id,
+            visible = excluded.visible,
+            path = excluded.path
+    ''')
+    # пути вложенных пунктов, перемещенных загрузкой вместе с родительскими пунктами
+    cursor.execute('''
+        update public.item
+        set path = item_path.path
+        from item_path
+        where item.id = item_path.id and item.path is distinct from item_path.path
+    ''')
+    cursor.execute('drop table item_path')
+
+
+def _compute_paths(cursor: Any):
+    """
+    Вычисление путей всех пунктов после объединения (загруженные пункты заменяют существующие)
+    одним рекурсивным запросом от корневых пунктов во временную таблицу item_path.
+    Загруженные пункты, недостижимые от корневых пунктов, образуют цикл либо ссылаются на отсутствующий пункт
+    @param cursor: курсор транзакции загрузки
+    """
+    cursor.execute('''
+        create temp table item_tree on commit drop as
+        select id, parent_id from item_import
+        union all
+        select id, parent_id from public.item
+        where not exists (select from item_import where item_import.id = item.id)
+    ''')
+    cursor.execute('analyze item_tree')
+    cursor.execute('''
+        create temp table item_path on commit drop as
+        with recursive tree as (
+            select id, array[id] as path
+            from item_tree
+            where parent_id is null
+            union all
+            select item_tree.id, tree.path || item_tree.id
+            from item_tree
+            join tree on item_tree.parent_id = tree.id
+        )
+        select id, path from tree
+    ''')
+    cursor.execute('drop table item_tree')
+    cursor.execute('''
+        select id from item_import
+        where not exists (select from item_path where item_path.id = item_import.id)
+        limit 1
+    ''')
+    row = cursor.fetchone()
+    if row is not None:
+        raise TransferError('Item {} is in a cycle of parent items or its parent item does not exist'.format(row[0]))
+    cursor.execute('create unique index on item_path (id)')
+    cursor.execute('analyze item_path')
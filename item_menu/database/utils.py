@@ -1,11 +1,14 @@
 """
 Утилиты для работы с базой данных
 """
+import time
 from functools import wraps
 from typing import Any, Callable
 
 from graphql import ResolveInfo
-from sqlalchemy.orm import Session
+
+from item_menu.database.session import AsyncSession
+from item_menu.metrics import DB_QUERY_DURATION
 
 
 def db_session_query(method: str = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
@@ -20,15 +23,17 @@ def db_session_query(method: str = None) -> Callable[[Callable[..., Any]], Calla
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
         @wraps(func)
         async def wrapper(_, info: ResolveInfo, *args, **kwargs) -> Any:
-            session = info.context['session']  # type: Session
+            session = info.context['session']  # type: AsyncSession
+            started = time.perf_counter()
             output = await func(info, session, *args, **kwargs)
 
             # если запрос на добавление данных, то добавляем к сессии выходные данных запроса
             if method == 'add':
-                session.add(output)
-                session.commit()
-                output = session.query(output.__class__).filter_by(id=output.id).first()
+                await session.add(output)
+                await session.commit()
+                output = await session.first(session.query(output.__class__).filter_by(id=output.id))
 
+            DB_QUERY_DURATION.observe(time.perf_counter() - started, func.__qualname__, method or 'query')
             return output
         return wrapper
     return decorator
@@ -0,0 +1,225 @@
+"""
+Метрики сервиса в формате Prometheus: счетчики и гистограммы задержек, агрегируемые в памяти процесса.
+Значения изменяются только в потоке событийного цикла, поэтому запись выполняется без блокировок
+"""
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+# границы корзин гистограмм задержек (в секундах)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: Any) -> str:
+    """
+    Экранирование значения метки
+    @param value: значение
+    @return: экранированная строка
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    """
+    Представление меток серии
+    @param names: наименования меток
+    @param values: значения меток
+    @return: строка меток в фигурных скобках (пустая строка без меток)
+    """
+    labels = ','.join('{}="{}"'.format(name, _escape(value)) for name, value in zip(names, values))
+    return '{{{}}}'.format(labels) if labels else ''
+
+
+def _format_value(value: float) -> str:
+    """
+    Представление значения метрики
+    @param value: значение
+    @return: строка значения
+    """
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Монотонно возрастающий счетчик с метками
+    """
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        """
+        Инициализация счетчика
+        @param name: наименование метрики
+        @param documentation: описание метрики
+        @param labels: наименования меток
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}  # type: Dict[Tuple[Any, ...], float]
+
+    def inc(self, *label_values: Any, amount: float = 1):
+        """
+        Увеличение счетчика
+        @param label_values: значения меток
+        @param amount: величина увеличения
+        """
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values: Any) -> float:
+        """
+        Значение счетчика
+        @param label_values: значения меток
+        @return: значение
+        """
+        return self._values.get(label_values, 0)
+
+    def render(self) -> List[str]:
+        """
+        Представление метрики в текстовом формате Prometheus
+        @return: строки метрики
+        """
+        lines = ['# HELP {} {}'.format(self.name, self.documentation), '# TYPE {} counter'.format(self.name)]
+        for label_values, value in sorted(self._values.items()):
+            lines.append('{}{} {}'.format(self.name, _format_labels(self.labels, label_values), _format_value(value)))
+        return lines
+
+
+class _HistogramSeries:
+    """
+    Серия гистограммы: количество наблюдений по корзинам (без накопления) и сумма значений
+    """
+    __slots__ = ('counts', 'sum')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class Histogram:
+    """
+    Гистограмма распределения значений с метками
+    """
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Инициализация гистограммы
+        @param name: наименование метрики
+        @param documentation: описание метрики
+        @param labels: наименования меток
+        @param buckets: возрастающие верхние границы корзин (корзина +Inf добавляется автоматически)
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # type: Dict[Tuple[Any, ...], _HistogramSeries]
+
+    def observe(self, value: float, *label_values: Any):
+        """
+        Учет наблюдения
+        @param value: значение
+        @param label_values: значения меток
+        """
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = _HistogramSeries(len(self.buckets) + 1)
+        # корзина с наименьшей границей, не меньшей значения
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+
+    def count(self, *label_values: Any) -> int:
+        """
+        Количество наблюдений серии
+        @param label_values: значения меток
+        @return: количество наблюдений
+        """
+        series = self._series.get(label_values)
+        return sum(series.counts) if series is not None else 0
+
+    def render(self) -> List[str]:
+        """
+        Представление метрики в текстовом формате Prometheus
+        @return: строки метрики
+        """
+        lines = ['# HELP {} {}'.format(self.name, self.documentation), '# TYPE {} histogram'.format(self.name)]
+        names = self.labels + ('le',)
+        for label_values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series.counts):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(
+                    self.name, _format_labels(names, label_values + (_format_value(bound),)), cumulative
+                ))
+            labels = _format_labels(self.labels, label_values)
+            lines.append('{}_sum{} {}'.format(self.name, labels, _format_value(series.sum)))
+            lines.append('{}_count{} {}'.format(self.name, labels, cumulative))
+        return lines
+
+
+def render_gauges(name: str, documentation: str, labels: Tuple[str, ...],
+                  values: Iterable[Tuple[Tuple[Any, ...], float]], metric_type: str = 'gauge') -> List[str]:
+    """
+    Представление значений, вычисляемых при запросе метрик (статистика кэшей)
+    @param name: наименование метрики
+    @param documentation: описание метрики
+    @param labels: наименования меток
+    @param values: значения меток и значение метрики
+    @param metric_type: тип метрики (gauge либо counter)
+    @return: строки метрики
+    """
+    lines = ['# HELP {} {}'.format(name, documentation), '# TYPE {} {}'.format(name, metric_type)]
+    for label_values, value in values:
+        lines.append('{}{} {}'.format(name, _format_labels(labels, label_values), _format_value(value)))
+    return lines
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса
+    """
+    def __init__(self):
+        self._metrics = []  # type: List[Any]
+
+    def register(self, metric: Any) -> Any:
+        """
+        Регистрация метрики
+        @param metric: счетчик либо гистограмма
+        @return: зарегистрированная метрика
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> List[str]:
+        """
+        Представление всех метрик в текстовом формате Prometheus
+        @return: строки метрик
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return lines
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    'item_menu_http_request_duration_seconds', 'HTTP request latency', ('method', 'route', 'status')
+))
+RESOLVER_DURATION = registry.register(Histogram(
+    'item_menu_resolver_duration_seconds', 'GraphQL query and mutation resolver latency', ('resolver',)
+))
+RESOLVER_ERRORS = registry.register(Counter(
+    'item_menu_resolver_errors_total', 'GraphQL query and mutation resolver errors', ('resolver', 'error')
+))
+DB_QUERY_DURATION = registry.register(Histogram(
+    'item_menu_db_query_duration_seconds', 'Resolver DB session query latency', ('resolver', 'method')
+))
+DB_SESSION_DURATION = registry.register(Histogram(
+    'item_menu_db_session_duration_seconds', 'DB session lifetime including commit or rollback', ('outcome',)
+))
+AUTH_DURATION = registry.register(Histogram(
+    'item_menu_auth_request_duration_seconds', 'Auth service request latency', ('outcome',)
+))
+AUTH_ERRORS = registry.register(Counter(
+    'item_menu_auth_errors_total', 'Auth service request errors', ('error',)
+))
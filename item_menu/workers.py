@@ -0,0 +1,250 @@
+"""
+Многопроцессный режим сервиса (prefork): мастер-процесс открывает порт и запускает процессы-обработчики,
+принимающие соединения на общем сокете
+"""
+import logging
+import os
+import select
+import signal
+import socket
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from dynaconf.utils.boxing import DynaBox
+
+
+# минимальное время работы процесса, после которого он перезапускается без задержки
+MIN_WORKER_UPTIME = 1.0
+# интервал проверки сигналов и завершившихся процессов мастером (в секундах)
+POLL_INTERVAL = 0.1
+
+
+def get_worker_count(config: DynaBox) -> int:
+    """
+    Количество процессов-обработчиков
+    @param config: данные конфигурации приложения
+    @return: количество процессов (0 в конфигурации - по количеству ядер процессора)
+    """
+    return config.WORKERS.count or os.cpu_count() or 1
+
+
+def get_worker_pool_size(config: DynaBox, workers: int) -> Tuple[int, int]:
+    """
+    Размер пула соединений с базой данных одного процесса
+    @param config: данные конфигурации приложения
+    @param workers: количество процессов
+    @return: количество постоянных и дополнительных соединений
+    """
+    postgres = config.POSTGRES
+    max_connections = postgres.get('max_connections', 0)
+    if not max_connections:
+        return postgres.pool_size, postgres.max_overflow
+    # общее количество соединений делится между процессами с учетом соединения слушателя уведомлений
+    connections = max_connections // workers - (1 if config.NOTIFICATIONS.enabled else 0)
+    if connections < 1:
+        raise ValueError('POSTGRES.max_connections={} is not enough for {} workers'.format(max_connections, workers))
+    pool_size = min(postgres.pool_size, connections)
+    return pool_size, connections - pool_size
+
+
+class WorkerPool:
+    """
+    Мастер-процесс: запуск процессов-обработчиков, перезапуск завершившихся процессов,
+    плавный перезапуск всех процессов по SIGHUP и остановка по SIGTERM/SIGINT
+    """
+    def __init__(self, config: DynaBox, run_worker: Callable[[socket.socket, Callable[[], Any]], Any]):
+        """
+        Инициализация мастер-процесса
+        @param config: данные конфигурации приложения
+        @param run_worker: функция запуска сервиса в процессе-обработчике, получающая общий сокет
+        и функцию оповещения мастера о готовности к приему соединений
+        """
+        self._config = config
+        self._run_worker = run_worker
+        self.count = get_worker_count(config)
+        self._sock = None  # type: socket.socket
+        # процессы-обработчики: PID -> время запуска
+        self._workers = {}  # type: Dict[int, float]
+        self._stopping = False
+        self._restart_requested = False
+
+    def _bind(self) -> socket.socket:
+        """
+        Открытие общего сокета, наследуемого процессами-обработчиками
+        @return: сокет
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('0.0.0.0', self._config.PORT))
+        sock.listen(socket.SOMAXCONN)
+        sock.setblocking(False)
+        return sock
+
+    def _spawn(self) -> Tuple[int, int]:
+        """
+        Запуск процесса-обработчика
+        @return: PID процесса и дескриптор канала оповещения о готовности
+        """
+        ready_fd, ready_write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_fd)
+            self._run_child(ready_write_fd)
+        os.close(ready_write_fd)
+        self._workers[pid] = time.monotonic()
+        logging.info('Worker {} is started'.format(pid))
+        return pid, ready_fd
+
+    def _run_child(self, ready_fd: int):
+        """
+        Выполнение процесса-обработчика (процесс завершается без возврата в код мастера)
+        @param ready_fd: дескриптор канала оповещения о готовности
+        """
+        code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, signal.SIG_DFL)
+            postgres = self._config.POSTGRES
+            postgres.pool_size, postgres.max_overflow = get_worker_pool_size(self._config, self.count)
+
+            def on_ready():
+                try:
+                    os.write(ready_fd, b'1')
+                except OSError:
+                    # мастер перестал ожидать готовности процесса
+                    pass
+                os.close(ready_fd)
+
+            self._run_worker(self._sock, on_ready)
+        except BaseException as e:
+            logging.error('Worker {} is stopped due to: {}'.format(os.getpid(), e))
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _wait_ready(self, ready_fds: Dict[int, int]):
+        """
+        Ожидание готовности запущенных процессов к приему соединений
+        @param ready_fds: дескрипторы каналов оповещения о готовности: дескриптор -> PID процесса
+        """
+        deadline = time.monotonic() + self._config.WORKERS.startup_timeout
+        pending = dict(ready_fds)
+        while pending and not self._stopping:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                logging.error('Workers {} are not ready in time'.format(', '.join(map(str, pending.values()))))
+                break
+            readable, _, _ = select.select(list(pending), [], [], min(timeout, POLL_INTERVAL))
+            # канал закрывается без оповещения, если процесс завершился до готовности
+            for fd in readable:
+                pending.pop(fd)
+        for fd in ready_fds:
+            os.close(fd)
+
+    def _on_stop(self, signum: int, _frame: Any):
+        """
+        Обработчик сигнала остановки
+        @param signum: номер сигнала
+        """
+        logging.info('Stopping workers by signal {}'.format(signum))
+        self._stopping = True
+
+    def _on_restart(self, _signum: int, _frame: Any):
+        """
+        Обработчик сигнала перезапуска
+        """
+        self._restart_requested = True
+
+    def _restart(self):
+        """
+        Плавный перезапуск: прежние процессы завершают обработку текущих запросов
+        после готовности новых процессов, соединения в очереди общего сокета не теряются.
+        Настройки порта и мастер-процесса применяются только после его перезапуска
+        """
+        self._restart_requested = False
+        logging.info('Restarting workers')
+        # новые процессы запускаются с перечитанной конфигурацией (в том числе с новым количеством процессов)
+        try:
+            self._config.reload()
+            self.count = get_worker_count(self._config)
+        except Exception as e:
+            logging.error('Config is not reloaded: {}'.format(e))
+        previous = list(self._workers)
+        ready_fds = {}
+        for _ in range(self.count):
+            pid, ready_fd = self._spawn()
+            ready_fds[ready_fd] = pid
+        self._wait_ready(ready_fds)
+        self._terminate(previous)
+
+    def _terminate(self, pids: Any):
+        """
+        Отправка сигнала завершения процессам-обработчикам
+        @param pids: PID процессов
+        """
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self):
+        """
+        Обработка завершившихся процессов: процессы, завершившиеся не по запросу мастера, перезапускаются
+        """
+        while self._workers:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            started = self._workers.pop(pid, None)
+            if started is None:
+                continue
+            logging.info('Worker {} is stopped with status {}'.format(pid, status))
+            if self._stopping or len(self._workers) >= self.count:
+                continue
+            # процесс, завершающийся сразу после запуска, перезапускается с задержкой
+            if time.monotonic() - started < MIN_WORKER_UPTIME:
+                time.sleep(MIN_WORKER_UPTIME)
+            _, ready_fd = self._spawn()
+            os.close(ready_fd)
+
+    def _stop(self):
+        """
+        Остановка всех процессов: по истечении времени завершения запросов процессы завершаются принудительно
+        """
+        self._terminate(list(self._workers))
+        deadline = time.monotonic() + self._config.WORKERS.shutdown_timeout + MIN_WORKER_UPTIME
+        while self._workers and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(POLL_INTERVAL)
+        for pid in list(self._workers):
+            logging.error('Worker {} is killed'.format(pid))
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self._workers.pop(pid)
+
+    def run(self):
+        """
+        Запуск мастер-процесса до получения сигнала остановки
+        """
+        self._sock = self._bind()
+        logging.info('Starting {} workers on http://0.0.0.0:{}'.format(self.count, self._config.PORT))
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_restart)
+
+        ready_fds = {}
+        for _ in range(self.count):
+            pid, ready_fd = self._spawn()
+            ready_fds[ready_fd] = pid
+        self._wait_ready(ready_fds)
+
+        try:
+            while not self._stopping:
+                if self._restart_requested:
+                    self._restart()
+                self._reap()
+                time.sleep(POLL_INTERVAL)
+        finally:
+            self._stop()
+            self._sock.close()
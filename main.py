@@ -1,21 +1,51 @@
 #!/usr/bin/python3
-import logging
+import logging.config
+import socket
+from typing import Any, Callable
 
 from aiohttp import web
 from dynaconf import settings
 
-from item_menu.app import Application
+from item_menu.workers import WorkerPool, get_worker_count
 
 
 # настройка позволяет прописывать переменные окружения без префикса
 settings.configure(ENVVAR_PREFIX_FOR_DYNACONF=False)
 
 
-if __name__ == '__main__':
-    app = Application(settings)
+def run(sock: socket.socket = None, on_ready: Callable[[], Any] = None):
+    """
+    Запуск сервиса в текущем процессе
+    @param sock: общий сокет мастер-процесса (опционально, по умолчанию сервис открывает порт PORT)
+    @param on_ready: функция оповещения мастер-процесса о готовности к приему соединений (опционально)
+    """
+    # приложение импортируется в процессе-обработчике, поэтому при перезапуске процессов
+    # мастер-процессом загружается актуальный код сервиса
+    from item_menu.app import Application
+
+    app = Application(settings).init_app()
+    if on_ready is not None:
+        async def notify_ready(_app):
+            on_ready()
+        app.on_startup.append(notify_ready)
 
     try:
-        web.run_app(app.init_app(), port=settings.PORT)
+        web.run_app(
+            app,
+            port=settings.PORT if sock is None else None,
+            sock=sock,
+            # адрес выводится мастер-процессом
+            print=print if sock is None else None,
+            shutdown_timeout=settings.WORKERS.shutdown_timeout
+        )
         logging.info('Service is stopped')
     except RuntimeError as re:
         logging.error('Service is stopped due to: {}'.format(re))
+
+
+if __name__ == '__main__':
+    if get_worker_count(settings) > 1:
+        logging.config.dictConfig(settings.LOGGING)
+        WorkerPool(settings, run).run()
+    else:
+        run()
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""
+Выгрузка и загрузка меню (пункты, запускаемые типы и корневой пункт).
+JSON - один документ со всеми таблицами, CSV - каталог с файлами exec_type.csv, item.csv и root.csv
+"""
+import argparse
+import logging
+import os
+import sys
+from contextlib import ExitStack
+
+from dynaconf import settings
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from item_menu.database import Database
+from item_menu.database.transfer import FORMATS, TABLES, TransferError, export_csv, import_csv, import_json, iter_json
+
+
+# настройка позволяет прописывать переменные окружения без префикса
+settings.configure(ENVVAR_PREFIX_FOR_DYNACONF=False)
+
+
+def export_menu(session: Session, args: argparse.Namespace):
+    """
+    Выгрузка меню в файл JSON (либо в стандартный вывод) или в каталог файлов CSV
+    @param session: сессия базы данных
+    @param args: аргументы командной строки
+    """
+    if args.format == 'json':
+        with ExitStack() as stack:
+            output = sys.stdout if args.output == '-' else stack.enter_context(
+                open(args.output, 'w', encoding='utf-8')
+            )
+            for chunk in iter_json(session, settings.EXPORT.batch_size):
+                output.write(chunk)
+        return
+
+    os.makedirs(args.output, exist_ok=True)
+    for table in TABLES:
+        with open(os.path.join(args.output, '{}.csv'.format(table)), 'w', encoding='utf-8', newline='') as output:
+            export_csv(session, table, output)
+
+
+def import_menu(session: Session, args: argparse.Namespace) -> dict:
+    """
+    Загрузка меню из файла JSON (либо из стандартного ввода) или из каталога файлов CSV
+    @param session: сессия базы данных
+    @param args: аргументы командной строки
+    @return: количество загруженных строк по таблицам
+    """
+    if args.format == 'json':
+        if args.input == '-':
+            return import_json(session, sys.stdin, args.replace)
+        with open(args.input, encoding='utf-8') as data:
+            return import_json(session, data, args.replace)
+
+    with ExitStack() as stack:
+        # загружаются таблицы, файлы которых есть в каталоге
+        tables = {
+            table: stack.enter_context(open(path, encoding='utf-8', newline=''))
+            for table, path in ((table, os.path.join(args.input, '{}.csv'.format(table))) for table in TABLES)
+            if os.path.exists(path)
+        }
+        if not tables:
+            raise TransferError('No table files in {}'.format(args.input))
+        return import_csv(session, tables, args.replace)
+
+
+def main(args: argparse.Namespace):
+    logging.basicConfig(level=logging.INFO, format='%(levelname)-8s %(message)s')
+    engine = create_engine(Database(settings.POSTGRES).url)
+    session = Session(bind=engine)
+    try:
+        if args.command == 'export':
+            export_menu(session, args)
+        else:
+            counts = import_menu(session, args)
+            session.commit()
+            logging.info('Imported rows: {}'.format(', '.join('{}={}'.format(*count) for count in counts.items())))
+    except TransferError as e:
+        session.rollback()
+        logging.error('Menu transfer is failed: {}'.format(e))
+        sys.exit(1)
+    finally:
+        session.close()
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    export_parser = commands.add_parser('export', help='выгрузка меню')
+    export_parser.add_argument('--format', choices=FORMATS, default='json')
+    export_parser.add_argument('--output', required=True, help='файл JSON ("-" - стандартный вывод) либо каталог CSV')
+
+    import_parser = commands.add_parser('import', help='загрузка меню')
+    import_parser.add_argument('--format', choices=FORMATS, default='json')
+    import_parser.add_argument('--input', required=True, help='файл JSON ("-" - стандартный ввод) либо каталог CSV')
+    import_parser.add_argument('--replace', action='store_true', help='удалить строки, отсутствующие в загрузке')
+
+    main(parser.parse_args())
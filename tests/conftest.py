@@ -1,16 +1,32 @@
 import json
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import count
 from os import chdir, getcwd
 from sys import path
+from typing import Any
 
 import pytest
 from dynaconf import settings
+from graphql.execution.executors.asyncio import AsyncioExecutor
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
 
+from item_menu.api import schema
 from item_menu.app import Application
+from item_menu.database import AsyncSession, Database
+from item_menu.database.models import ItemModel
 
 # chdir('../item_menu')
 # path.insert(0, getcwd())
 
+SEED_ROOT_ID = 10 ** 9  # ID корневого пункта тестовых данных, не пересекающийся с рабочими данными
+SEED_PARENT_ID = SEED_ROOT_ID + 1  # ID родительского пункта уровня тестовых данных
+# ID вложенных пунктов тестовых данных (аргументы ID пунктов в мутациях - 32-битные числа)
+CHILD_IDS = count(SEED_ROOT_ID + 10000)
+
 
 @pytest.yield_fixture
 def loop():
@@ -35,3 +51,126 @@ async def cli(aiohttp_client):
 async def json_request():
     with open('autoroute_request.json', 'r', encoding='utf-8') as fh:
         return json.load(fh)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(Database(settings.POSTGRES).url)
+    try:
+        engine.connect().close()
+    except OperationalError:
+        pytest.skip('Database is not available')
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def connection(engine):
+    connection = engine.connect()
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def session(connection):
+    """
+    Сессия в транзакции, которая откатывается по завершении теста
+    """
+    transaction = connection.begin()
+    yield Session(bind=connection)
+    transaction.rollback()
+
+
+async def execute_query(loop, session: Session, query: str, statements: list = None, variables: dict = None,
+                        context: dict = None, expect_errors: bool = False) -> Any:
+    """
+    Выполнение запроса GraphQL в сессии тестовых данных
+    @param loop: событийный цикл
+    @param session: сессия базы данных
+    @param query: текст запроса
+    @param statements: список для сбора выполненных SQL-запросов (опционально)
+    @param variables: переменные запроса (опционально)
+    @param context: дополнительные данные контекста (опционально)
+    @param expect_errors: флаг ожидаемых ошибок запроса
+    @return: данные ответа либо ошибки запроса, если они ожидаются
+    """
+    def before_cursor_execute(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    if statements is not None:
+        event.listen(session.connection(), 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = await schema.execute(
+            query,
+            variables=variables,
+            context_value={'session': AsyncSession(session, ThreadPoolExecutor(1)), **(context or {})},
+            executor=AsyncioExecutor(loop),
+            return_promise=True
+        )
+    finally:
+        if statements is not None:
+            event.remove(session.connection(), 'before_cursor_execute', before_cursor_execute)
+    if expect_errors:
+        assert result.errors
+        return result.errors
+    assert not result.errors, result.errors
+    return result.data
+
+
+def get_order(session: Session, parent_id: int) -> list:
+    """
+    ID пунктов уровня в порядке сортировки; порядок сортировки должен быть непрерывным
+    """
+    rows = session.query(ItemModel.id, ItemModel.sorted_id).filter_by(parent_id=parent_id).order_by(
+        ItemModel.sorted_id
+    ).all()
+    assert [row.sorted_id for row in rows] == list(range(len(rows)))
+    return [row.id for row in rows]
+
+
+def seed_level(session: Session, size: int):
+    """
+    Добавление корневого пункта тестовых данных и уровня пунктов родительского пункта SEED_PARENT_ID
+    @param size: количество пунктов уровня
+    """
+    session.execute(ItemModel.__table__.insert(), [
+        {'id': SEED_ROOT_ID, 'parent_id': None, 'sorted_id': 0, 'name': 'seed', 'full_name': 'seed'},
+        {'id': SEED_PARENT_ID, 'parent_id': SEED_ROOT_ID, 'sorted_id': 0, 'name': 'seed', 'full_name': 'seed'}
+    ])
+    session.execute(ItemModel.__table__.insert(), [
+        {'id': SEED_PARENT_ID + 1 + n, 'parent_id': SEED_PARENT_ID, 'sorted_id': n,
+         'name': 'seed {}'.format(n), 'full_name': 'seed'} for n in range(size)
+    ])
+
+
+def seed_children(session: Session, parent_id: int, size: int) -> list:
+    """
+    Добавление вложенных пунктов
+    @return: ID добавленных пунктов
+    """
+    ids = [next(CHILD_IDS) for _ in range(size)]
+    session.execute(ItemModel.__table__.insert(), [
+        {'id': item_id, 'parent_id': parent_id, 'sorted_id': n, 'name': 'child', 'full_name': 'child'}
+        for n, item_id in enumerate(ids)
+    ])
+    return ids
+
+
+@contextmanager
+def change_before_lock(session: Session, *statements: str):
+    """
+    Выполнение запросов параллельной транзакции, зафиксированной до получения мутацией блокировки уровня
+    @param statements: SQL-запросы
+    """
+    pending = list(statements)
+
+    def after_cursor_execute(_conn, cursor, statement, *_args):
+        if 'pg_advisory_xact_lock' in statement:
+            while pending:
+                cursor.execute(pending.pop(0))
+
+    event.listen(session.connection(), 'after_cursor_execute', after_cursor_execute)
+    try:
+        yield
+    finally:
+        event.remove(session.connection(), 'after_cursor_execute', after_cursor_execute)
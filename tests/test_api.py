@@ -1,3 +1,6 @@
+import json
+
+
 async def test_get_without_data(cli, base_url):
     resp = await cli.get(base_url)
     assert resp.status == 400
@@ -13,3 +16,11 @@ async def test_get_without_json(cli, base_url):
 async def test_post_without_json(cli, base_url):
     resp = await cli.post(base_url, json={'id': 1})
     assert resp.status == 400
+
+
+async def test_stream_items(cli):
+    resp = await cli.get('/items.ndjson')
+    assert resp.status == 200
+    assert resp.headers['Content-Type'].startswith('application/x-ndjson')
+    lines = (await resp.text()).splitlines()
+    assert all('id' in json.loads(line) for line in lines)
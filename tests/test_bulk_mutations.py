@@ -0,0 +1,179 @@
+"""
+Тесты пакетных мутаций пунктов. Данные создаются в транзакции, которая откатывается по завершении
+"""
+import pytest
+from sqlalchemy.orm import Session
+
+from tests.conftest import (
+    SEED_PARENT_ID, SEED_ROOT_ID, change_before_lock, execute_query, get_order, seed_children, seed_level
+)
+
+
+SEED_SIZE = 100
+
+
+@pytest.fixture
+def session(session):
+    seed_level(session, SEED_SIZE)
+    return session
+
+
+async def test_create_items(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+    statements = []
+
+    data = await execute_query(loop, session, '''
+        mutation {{
+          createItems(items: [
+            {{parentId: {parent}, sortedId: 0, name: "A"}},
+            {{parentId: {missing}, name: "B"}},
+            {{parentId: {parent}, name: "C", visible: true}},
+            {{parentId: {parent}, sortedId: 0, name: "D", fullName: "Пункт D"}},
+            {{parentId: {parent}, sortedId: 1000, name: "E"}}
+          ]) {{ results {{ index id error item {{ name fullName sortedId visible path }} }} }}
+        }}
+    '''.format(parent=SEED_PARENT_ID, missing=SEED_ROOT_ID - 1), statements)
+
+    results = data['createItems']['results']
+    assert [result['error'] is None for result in results] == [True, False, True, True, False]
+    a, c, d = (results[index]['item'] for index in (0, 2, 3))
+    # позиции добавленных пунктов совпадают с последовательным выполнением отдельных мутаций
+    assert (d['sortedId'], a['sortedId'], c['sortedId']) == (0, 1, SEED_SIZE + 2)
+    assert (a['fullName'], d['fullName'], c['visible']) == ('A', 'Пункт D', True)
+    assert a['path'] == [str(SEED_ROOT_ID), str(SEED_PARENT_ID), results[0]['id']]
+    assert get_order(session, SEED_PARENT_ID) == [int(results[3]['id']), int(results[0]['id'])] + ids + [int(results[2]['id'])]
+
+    # одна вставка и один сдвиг порядка сортировки на все пункты
+    assert len([statement for statement in statements if statement.startswith('INSERT')]) == 1
+    assert len([statement for statement in statements if statement.lstrip().lower().startswith('update')]) == 1
+
+
+async def test_update_and_move_items(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+
+    data = await execute_query(loop, session, '''
+        mutation {{
+          updateItems(items: [
+            {{id: {0}, name: "renamed", sortedId: 0}},
+            {{id: {1}, sortedId: {2}}},
+            {{id: {1}, name: "renamed", sortedId: 1000}}
+          ]) {{ results {{ id error item {{ name sortedId }} }} }}
+        }}
+    '''.format(ids[50], ids[10], SEED_SIZE))
+    results = data['updateItems']['results']
+    assert results[0]['item'] == {'name': 'renamed', 'sortedId': 0}
+    assert results[1]['error'] and results[2]['error']
+    ids = [ids[50]] + ids[:50] + ids[51:]
+    assert get_order(session, SEED_PARENT_ID) == ids
+
+    data = await execute_query(loop, session, '''
+        mutation {{
+          moveItems(items: [{{id: {0}, sortedId: 99}}, {{id: {1}, sortedId: 0}}, {{id: "unknown", sortedId: 0}}]) {{
+            results {{ error item {{ sortedId }} }}
+          }}
+        }}
+    '''.format(ids[0], ids[1]))
+    results = data['moveItems']['results']
+    assert [result['item'] and result['item']['sortedId'] for result in results] == [99, 0, None]
+    assert results[2]['error']
+    assert get_order(session, SEED_PARENT_ID) == ids[1:] + ids[:1]
+
+
+async def test_delete_items(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+
+    data = await execute_query(loop, session, '''
+        mutation {{ deleteItems(ids: [{0}, {1}, {0}, {2}]) {{ results {{ id error }} }} }}
+    '''.format(ids[3], ids[7], SEED_ROOT_ID))
+    results = data['deleteItems']['results']
+    assert [result['error'] is None for result in results] == [True, True, False, False]
+    assert get_order(session, SEED_PARENT_ID) == ids[:3] + ids[4:7] + ids[8:]
+
+
+async def test_move_items_between_parents(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+    children = seed_children(session, ids[5], 2)
+
+    data = await execute_query(loop, session, '''
+        mutation {{
+          moveItems(items: [
+            {{id: {a}, parentId: {b}}},
+            {{id: {b}, parentId: {a}}},
+            {{id: {child}, parentId: {parent}, sortedId: 0}},
+            {{id: {c}, sortedId: 0}}
+          ]) {{ results {{ error item {{ sortedId path }} }} }}
+        }}
+    '''.format(a=ids[1], b=ids[2], child=children[1], parent=SEED_PARENT_ID, c=ids[50]))
+    results = data['moveItems']['results']
+    # второе перемещение образует цикл после первого
+    assert [result['error'] is None for result in results] == [True, False, True, True]
+    assert results[0]['item']['path'] == [str(i) for i in (SEED_ROOT_ID, SEED_PARENT_ID, ids[2], ids[1])]
+    assert results[2]['item']['path'] == [str(i) for i in (SEED_ROOT_ID, SEED_PARENT_ID, children[1])]
+
+    assert get_order(session, SEED_PARENT_ID) == [ids[50], children[1], ids[0]] + ids[2:50] + ids[51:]
+    assert get_order(session, ids[2]) == [ids[1]]
+    assert get_order(session, ids[5]) == children[:1]
+
+
+def _move_to_empty_level(item_id: int, parent_id: int) -> tuple:
+    """
+    Запросы перемещения пункта уровня тестовых данных на пустой уровень другого пункта
+    """
+    return (
+        'update public.item set sorted_id = sorted_id - 1 where parent_id = {} and sorted_id > '
+        '(select sorted_id from public.item where id = {})'.format(SEED_PARENT_ID, item_id),
+        'update public.item set parent_id = {}, sorted_id = 0 where id = {}'.format(parent_id, item_id)
+    )
+
+
+async def test_bulk_mutations_fail_items_changed_before_lock(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+    children = seed_children(session, ids[5], 1)
+
+    delete_child = 'delete from public.item where id = {}'.format(children[0])
+    with change_before_lock(session, *_move_to_empty_level(ids[1], ids[20]), delete_child):
+        data = await execute_query(loop, session, '''
+            mutation {{
+              moveItems(items: [
+                {{id: {0}, sortedId: 10}}, {{id: {1}, parentId: {2}}}, {{id: {3}, sortedId: 0}}
+              ]) {{ results {{ error }} }}
+            }}
+        '''.format(ids[1], children[0], SEED_PARENT_ID, ids[2]))
+    errors = [result['error'] for result in data['moveItems']['results']]
+    assert 'перемещен другим запросом' in errors[0] and 'несуществующей' in errors[1] and errors[2] is None
+    assert get_order(session, ids[20]) == [ids[1]]
+    ids = [ids[2], ids[0]] + ids[3:]
+    assert get_order(session, SEED_PARENT_ID) == ids
+
+    with change_before_lock(session, *_move_to_empty_level(ids[1], ids[20])):
+        data = await execute_query(loop, session, '''
+            mutation {{
+              updateItems(items: [{{id: {0}, sortedId: 0, name: "A"}}, {{id: {1}, sortedId: 0, name: "B"}}]) {{
+                results {{ error }}
+              }}
+            }}
+        '''.format(ids[1], ids[2]))
+    errors = [result['error'] for result in data['updateItems']['results']]
+    assert 'перемещен другим запросом' in errors[0] and errors[1] is None
+    ids = [ids[2], ids[0]] + ids[3:]
+    assert get_order(session, SEED_PARENT_ID) == ids
+
+    with change_before_lock(session, *_move_to_empty_level(ids[1], ids[20])):
+        data = await execute_query(loop, session, '''
+            mutation {{ deleteItems(ids: [{0}, {1}]) {{ results {{ error }} }} }}
+        '''.format(ids[1], ids[2]))
+    errors = [result['error'] for result in data['deleteItems']['results']]
+    assert 'перемещен другим запросом' in errors[0] and errors[1] is None
+    assert get_order(session, SEED_PARENT_ID) == [ids[0]] + ids[3:]
+
+
+async def test_move_items_rejects_cycle_made_before_lock(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+
+    # параллельная транзакция перемещает новый родительский пункт в перемещаемый пункт
+    with change_before_lock(session, *_move_to_empty_level(ids[20], ids[5])):
+        data = await execute_query(loop, session, '''
+            mutation {{ moveItems(items: [{{id: {}, parentId: {}}}]) {{ results {{ error }} }} }}
+        '''.format(ids[5], ids[20]))
+    assert 'вложенный' in data['moveItems']['results'][0]['error']
+    assert get_order(session, ids[5]) == [ids[20]]
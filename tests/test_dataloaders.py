@@ -0,0 +1,106 @@
+"""
+Тест пакетной загрузки дочерних пунктов и запускаемых типов: количество запросов в базу данных
+не зависит от размера дерева. Данные создаются в транзакции, которая откатывается по завершении
+"""
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.orm import Session
+
+from item_menu.database.models import ItemModel, ExecutionTypeModel
+from tests.conftest import SEED_ROOT_ID, execute_query
+
+
+DEPTH = 5
+
+TREE_QUERY = '''
+    query ($id: Int) {{
+      allItems(filters: {{id: $id}}) {{
+        id
+        execType {{ name }}
+        {children}
+      }}
+    }}
+'''
+CHILDREN_QUERY = 'children{arguments} {{ id execType {{ name }} {children} }}'
+
+
+def _seed_tree(session: Session, root_id: int, branching: int) -> int:
+    """
+    Создание дерева пунктов заданной глубины
+    @param session: сессия базы данных
+    @param root_id: ID корневого пункта
+    @param branching: количество дочерних пунктов каждого пункта
+    @return: количество созданных пунктов
+    """
+    exec_type_ids = [root_id + n for n in range(branching)]
+    session.execute(ExecutionTypeModel.__table__.insert(), [
+        {'id': exec_type_id, 'name': 'seed {}'.format(exec_type_id)} for exec_type_id in exec_type_ids
+    ])
+    level = [{'id': root_id, 'parent_id': None, 'sorted_id': 0, 'name': '1 seed', 'full_name': 'seed'}]
+    next_id, count = root_id + 1, 0
+    for _ in range(DEPTH + 1):
+        session.execute(ItemModel.__table__.insert(), level)
+        count += len(level)
+        children = []
+        for parent in level:
+            for n in range(branching):
+                children.append({
+                    # порядковые ID обратны порядку добавления пунктов
+                    'id': next_id, 'parent_id': parent['id'], 'sorted_id': branching - n, 'name': '{} seed'.format(n + 1),
+                    'full_name': 'seed', 'exec_type_id': exec_type_ids[n]
+                })
+                next_id += 1
+        level = children
+    return count
+
+
+def _get_tree_query(children_arguments: str) -> str:
+    """
+    Запрос дерева пунктов на всю глубину
+    @param children_arguments: аргументы поля дочерних пунктов
+    @return: текст запроса
+    """
+    children = ''
+    for _ in range(DEPTH):
+        children = CHILDREN_QUERY.format(arguments=children_arguments, children=children)
+    return TREE_QUERY.format(children=children)
+
+
+async def _count_statements(loop, connection, branching: int, children_arguments: str) -> int:
+    """
+    Количество запросов в базу данных при запросе дерева пунктов
+    @return: количество выполненных SQL-запросов
+    """
+    transaction = connection.begin()
+    try:
+        session = Session(bind=connection)
+        _seed_tree(session, SEED_ROOT_ID, branching)
+        statements = []
+        data = await execute_query(
+            loop, session, _get_tree_query(children_arguments), statements,
+            variables={'id': SEED_ROOT_ID}, context={'menu_cache': SimpleNamespace(enabled=False)}
+        )
+        level = data['allItems']
+        for _ in range(DEPTH):
+            # дочерние пункты отсортированы по порядковому ID на уровне базы данных
+            assert all(
+                [child['id'] for child in item['children']] == sorted((child['id'] for child in item['children']),
+                                                                      key=int, reverse=True)
+                for item in level
+            )
+            level = [child for item in level for child in item['children']]
+            assert all(item['execType'] is not None for item in level)
+        assert len(level) == branching ** DEPTH
+        return len(statements)
+    finally:
+        transaction.rollback()
+
+
+@pytest.mark.parametrize('children_arguments', ['', '(filters: {visible: false})'])
+async def test_tree_query_statements_do_not_grow_with_tree(loop, connection, children_arguments):
+    small_tree_statements = await _count_statements(loop, connection, 2, children_arguments)
+    large_tree_statements = await _count_statements(loop, connection, 3, children_arguments)
+    assert small_tree_statements == large_tree_statements
+    # запрос корневого пункта и по одному запросу дочерних пунктов и запускаемых типов на уровень
+    assert small_tree_statements <= 1 + 2 * (DEPTH + 1)
@@ -0,0 +1,32 @@
+"""
+Тесты кэша документов GraphQL-запросов
+"""
+import pytest
+from graphql.error import GraphQLSyntaxError
+
+from item_menu.api import schema
+from item_menu.api.backend import CachedDocumentBackend
+
+
+def test_documents_are_cached():
+    backend = CachedDocumentBackend(maxsize=1)
+    document = backend.document_from_string(schema, '{ rootItem }')
+    assert backend.document_from_string(schema, '{ rootItem }') is document
+    assert document.get_operation_type(None) == 'query'
+
+    backend.document_from_string(schema, '{ allItems { id } }')
+    assert backend.document_from_string(schema, '{ rootItem }') is not document
+    assert backend.stats['hits'] == 1
+    assert backend.stats['evictions'] == 2
+
+
+def test_invalid_documents():
+    backend = CachedDocumentBackend(maxsize=10)
+    document = backend.document_from_string(schema, '{ unknownField }')
+    result = document.execute(operation_name=None, variable_values=None)
+    assert result.invalid
+    assert 'unknownField' in result.errors[0].message
+
+    with pytest.raises(GraphQLSyntaxError):
+        backend.document_from_string(schema, '{ rootItem ')
+    assert len(backend.documents) == 1
@@ -0,0 +1,48 @@
+"""
+Тесты ETag ответов на запросы чтения
+"""
+from item_menu.api.etag import etag_matches, get_etag, get_read_query_hash
+from item_menu.api import schema
+
+
+def test_read_query_hash():
+    query_hash = get_read_query_hash(schema, None, '{ rootItem }', None, None)
+    assert query_hash is not None
+    assert get_read_query_hash(schema, None, '{ rootItem }', {'a': 1}, None) != query_hash
+    # мутации, изменчивые поля и ошибки разбора выполняются без ETag
+    assert get_read_query_hash(schema, None, 'mutation { deleteItem(id: 1) { ok } }', None, None) is None
+    assert get_read_query_hash(schema, None, '{ rootItem cacheStats { name } }', None, None) is None
+    assert get_read_query_hash(schema, None, '{ rootItem', None, None) is None
+    assert get_read_query_hash(schema, None, 'query A { rootItem } query B { rootItem }', None, None) is None
+    assert get_read_query_hash(schema, None, 'query A { rootItem } mutation B { x }', None, 'A') is not None
+
+
+def test_etag_matches():
+    etag = get_etag('1.0', 5, 'fingerprint', 'hash')
+    assert etag != get_etag('1.0', 6, 'fingerprint', 'hash')
+    assert etag != get_etag('1.0', 5, 'other', 'hash')
+    assert etag_matches(etag, etag)
+    assert etag_matches('"other", W/{}'.format(etag), etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+async def test_not_modified(cli, base_url):
+    resp = await cli.post(base_url, json={'query': '{ rootItem }'})
+    assert resp.status == 200
+    etag = resp.headers.get('ETag')
+    if etag is None:
+        # ETag не формируется без таблицы версии данных меню
+        return
+
+    resp = await cli.post(base_url, json={'query': '{ rootItem }'}, headers={'If-None-Match': etag})
+    assert resp.status == 304
+    assert resp.headers['ETag'] == etag
+
+    resp = await cli.get(base_url, params={'query': '{ rootItem }'}, headers={'If-None-Match': etag})
+    assert resp.status == 304
+
+    resp = await cli.post(base_url, json={'query': '{ executionTypes { id } }'}, headers={'If-None-Match': etag})
+    assert resp.status == 200
+    assert resp.headers['ETag'] != etag
@@ -0,0 +1,34 @@
+"""
+Тесты фильтров пунктов
+"""
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+from item_menu.api.filters import ItemFilter
+from item_menu.database.models import ItemModel
+
+
+async def _compile(filters: dict) -> str:
+    query = await ItemFilter.filter_query(Query(ItemModel), filters)
+    return str(query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+
+
+async def test_filter_query_predicates(loop):
+    sql = await _compile({'id': 3, 'visible': True, 'paragraph': 1, 'permission': {1, 3}})
+    assert 'item.id = 3' in sql
+    assert 'item.visible = true' in sql
+    assert "item.name LIKE '1.' || '%%'" in sql
+    assert 'item.id IN (1, 3)' in sql
+
+    # пустой набор прав не допускает ни одного пункта
+    assert 'false' in await _compile({'permission': set()})
+
+
+async def test_filter_query_name_like_escaping(loop):
+    query = await ItemFilter.filter_query(Query(ItemModel), {'name_like': ' 100%_ '})
+    compiled = query.statement.compile(dialect=postgresql.dialect())
+    assert 'item.name ILIKE' in str(compiled) and 'item.full_name ILIKE' in str(compiled)
+    assert set(compiled.params.values()) == {'%100\\%\\_%'}
+
+    items = [ItemModel(id=1, name='1.1 Отчет 100%_', full_name='')]
+    assert await ItemFilter(items, {'name_like': ' 100%_ '}).filter_items() == items
@@ -0,0 +1,36 @@
+"""
+Тесты LRU-кэша
+"""
+from unittest import mock
+
+from item_menu.cache import LRUCache
+
+
+def test_lru_cache_eviction():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    # вытесняется давно не используемая запись
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+    assert cache.stats['evictions'] == 1
+    assert cache.stats['hits'] == 2
+    assert cache.stats['misses'] == 1
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(maxsize=10, ttl=60)
+    with mock.patch('item_menu.cache.lru.monotonic', return_value=100):
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=5)
+    with mock.patch('item_menu.cache.lru.monotonic', return_value=110):
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+    assert cache.stats['expirations'] == 1
+
+    cache.invalidate('a')
+    assert len(cache) == 0
@@ -0,0 +1,55 @@
+"""
+Тесты слушателя уведомлений об изменении данных меню
+"""
+import asyncio
+
+from dynaconf import settings
+from dynaconf.utils.boxing import DynaBox
+
+from item_menu.database import Database, MenuChangeListener
+
+
+CONFIG = DynaBox({'enabled': True, 'reconnect_delay': 0.05, 'max_reconnect_delay': 0.2})
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError('Condition is not met in {}s'.format(timeout))
+
+
+def test_invalid_payload():
+    changes = []
+    listener = MenuChangeListener('', CONFIG, changes.append)
+    listener._on_notify('{"version": 7}')
+    listener._on_notify('not json')
+    assert changes == [7, None]
+    assert listener.notifications == 2
+
+
+async def test_notify_on_commit(loop, engine):
+    changes = []
+    listener = MenuChangeListener(Database(settings.POSTGRES).url, CONFIG, changes.append)
+    await listener.start()
+    try:
+        await wait_for(lambda: listener.connected)
+        # изменение без затронутых строк не увеличивает версию данных меню
+        version = engine.execute('select version from menu_version').scalar()
+        engine.execute('update exec_type set name = name where false')
+        assert engine.execute('select version from menu_version').scalar() == version
+        engine.execute('update exec_type set name = name where id = (select min(id) from exec_type)')
+        version = engine.execute('select version from menu_version').scalar()
+        await wait_for(lambda: version in changes)
+
+        # после разрыва соединения слушатель подключается повторно и сбрасывает кэши без проверки версии
+        engine.execute(
+            "select pg_terminate_backend(pid) from pg_stat_activity "
+            "where query = 'LISTEN menu_changes;' and pid <> pg_backend_pid()"
+        )
+        await wait_for(lambda: listener.reconnects == 1 and listener.connected)
+        assert changes[-1] is None
+    finally:
+        await listener.stop()
+    assert not listener.connected
@@ -0,0 +1,91 @@
+"""
+Тесты кэша дерева меню
+"""
+from types import SimpleNamespace
+
+from dynaconf.utils.boxing import DynaBox
+
+from item_menu.api import utils
+from item_menu.cache import MenuTree, MenuTreeCache, PermissionCache
+from item_menu.database import MenuChangeListener
+from item_menu.database.models import ItemModel, ExecutionTypeModel
+
+
+def _build_tree() -> MenuTree:
+    execution_types = [ExecutionTypeModel(id=1, name='form')]
+    items = [
+        ItemModel(id=0, parent_id=None, sorted_id=0, name='root', full_name='root'),
+        ItemModel(id=2, parent_id=1, sorted_id=1, name='1.1.2 B', full_name='B', exec_type_id=1),
+        ItemModel(id=1, parent_id=0, sorted_id=0, name='1.1 A', full_name='A'),
+        ItemModel(id=3, parent_id=1, sorted_id=0, name='1.1.1 C', full_name='C'),
+    ]
+    return MenuTree(items, execution_types, root_item_id=0)
+
+
+def test_menu_tree_index():
+    tree = _build_tree()
+    assert len(tree) == 4
+    assert [item.id for item in tree.get_children(1)] == [3, 2]
+    assert tree.get_children(3) == []
+
+    item = tree.items[2]
+    assert tree.contains(item)
+    assert not tree.contains(ItemModel(id=2))
+    # связи проставлены без обращения к базе данных
+    assert item.parent is tree.items[1]
+    assert item.exec_type.name == 'form'
+    assert [child.id for child in tree.items[1].children] == [3, 2]
+
+
+def test_menu_tree_cache_invalidation():
+    cache = MenuTreeCache(db=None, config=SimpleNamespace(enabled=True))
+    cache._tree = _build_tree()
+
+    cache.on_commit({'unknown'})
+    assert cache._tree is not None
+
+    cache.on_commit({'item'})
+    assert cache._tree is None
+
+
+def test_menu_tree_cache_sync_menu_version():
+    cache = MenuTreeCache(db=None, config=SimpleNamespace(enabled=True))
+    cache._tree = _build_tree()
+    cache._tree.menu_version = 5
+
+    cache.sync_menu_version(5)
+    assert cache._tree is not None
+
+    # снимок по более ранней версии сбрасывается и не сохраняется после перестроения
+    cache.sync_menu_version(6)
+    assert cache._tree is None
+    assert cache._is_outdated(_build_tree()) is False
+    tree = _build_tree()
+    tree.menu_version = 5
+    assert cache._is_outdated(tree)
+
+
+async def test_allowed_items_recomputed_after_notification(loop, monkeypatch):
+    cache = MenuTreeCache(db=None, config=SimpleNamespace(enabled=False))
+    perms_cache = PermissionCache(maxsize=10, ttl=60)
+    permission_set = perms_cache.set('Bearer a', ['1.1.1'])
+    info = SimpleNamespace(context={'menu_cache': cache, 'auth': SimpleNamespace(perms_cache=perms_cache)})
+    listener = MenuChangeListener('', DynaBox({'enabled': True, 'reconnect_delay': 1, 'max_reconnect_delay': 1}),
+                                  cache.sync_menu_version)
+    calls = []
+
+    async def get_user_items(*_args):
+        calls.append(1)
+        return {len(calls)}
+
+    monkeypatch.setattr(utils, 'get_user_items', get_user_items)
+    listener._on_notify('{"version": 5}')
+    assert await utils.get_allowed_items(info, None, permission_set, 0) == {1}
+    assert await utils.get_allowed_items(info, None, permission_set, 0) == {1}
+
+    # изменение другого процесса сбрасывает доступные пункты без снимка дерева, повтор уведомления - нет
+    listener._on_notify('{"version": 6}')
+    assert await utils.get_allowed_items(info, None, permission_set, 0) == {2}
+    listener._on_notify('{"version": 6}')
+    assert await utils.get_allowed_items(info, None, permission_set, 0) == {2}
+    assert len(calls) == 2
@@ -0,0 +1,41 @@
+"""
+Тесты метрик сервиса
+"""
+from item_menu.metrics import Counter, Histogram
+
+
+def test_histogram_render():
+    histogram = Histogram('latency_seconds', 'Latency', ('resolver',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, 'Query.resolve_items')
+
+    assert histogram.count('Query.resolve_items') == 4
+    assert histogram.count('unknown') == 0
+    lines = histogram.render()
+    assert lines[:2] == ['# HELP latency_seconds Latency', '# TYPE latency_seconds histogram']
+    # корзины накопительные, граница корзины включается в нее
+    assert 'latency_seconds_bucket{resolver="Query.resolve_items",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{resolver="Query.resolve_items",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{resolver="Query.resolve_items",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{resolver="Query.resolve_items"} 2.65' in lines
+    assert 'latency_seconds_count{resolver="Query.resolve_items"} 4' in lines
+
+
+def test_counter_render():
+    counter = Counter('errors_total', 'Errors', ('error',))
+    counter.inc('Value"Error')
+    counter.inc('Value"Error', amount=2)
+    assert counter.get('Value"Error') == 3
+    assert counter.render()[-1] == 'errors_total{error="Value\\"Error"} 3'
+
+
+async def test_metrics_endpoint(cli, base_url):
+    await cli.post(base_url, json={'query': '{ executionTypes { id } }'})
+    resp = await cli.get('/metrics')
+    assert resp.status == 200
+    assert resp.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = await resp.text()
+    assert 'item_menu_http_request_duration_seconds_count{method="POST",route="/graphql",status="200"}' in text
+    assert 'item_menu_resolver_duration_seconds_bucket{resolver="ExecutionTypeQuery.resolve_execution_types"' in text
+    assert 'item_menu_db_session_duration_seconds_count{outcome="commit"}' in text
+    assert 'item_menu_cache_hit_ratio{cache="menu_tree"}' in text
@@ -0,0 +1,102 @@
+"""
+Тесты перемещения пункта вместе с вложенными пунктами. Данные создаются в транзакции, которая откатывается
+по завершении
+"""
+import pytest
+
+from item_menu.database.models import ItemModel
+from tests.conftest import (
+    SEED_PARENT_ID, SEED_ROOT_ID, change_before_lock, execute_query, get_order, seed_children, seed_level
+)
+
+
+SEED_SIZE = 30
+
+
+@pytest.fixture
+def session(session):
+    seed_level(session, SEED_SIZE)
+    return session
+
+
+def _get_paths(session, item_id: int) -> dict:
+    """
+    Пути пункта и всех вложенных пунктов
+    @return: словарь ID пункта - путь
+    """
+    rows = session.query(ItemModel.id, ItemModel.path).filter(ItemModel.path.any(item_id)).all()
+    return {row.id: row.path for row in rows}
+
+
+async def test_move_item_with_subtree(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+    children = seed_children(session, ids[5], 3)
+    grandchildren = seed_children(session, children[0], 2)
+    target_children = seed_children(session, ids[20], 3)
+    statements = []
+
+    data = await execute_query(loop, session, '''
+        mutation {{ moveItem(id: {}, newParentId: {}, sortedId: 1) {{ id sortedId path }} }}
+    '''.format(ids[5], ids[20]), statements)
+    assert data['moveItem']['sortedId'] == 1
+    assert data['moveItem']['path'] == [str(i) for i in (SEED_ROOT_ID, SEED_PARENT_ID, ids[20], ids[5])]
+    # сдвиг обоих уровней и изменение родительского пункта независимо от размера поддерева
+    assert len([statement for statement in statements if statement.startswith('UPDATE')]) == 3
+
+    assert get_order(session, SEED_PARENT_ID) == ids[:5] + ids[6:]
+    assert get_order(session, ids[20]) == target_children[:1] + [ids[5]] + target_children[1:]
+    path = session.query(ItemModel.path).filter_by(id=grandchildren[1]).scalar()
+    assert path == [SEED_ROOT_ID, SEED_PARENT_ID, ids[20], ids[5], children[0], grandchildren[1]]
+
+
+async def test_move_subtree_across_parents(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+    children = seed_children(session, ids[5], 2)
+    grandchildren = seed_children(session, children[0], 2)
+    great_grandchildren = seed_children(session, grandchildren[1], 2)
+    target = seed_children(session, seed_children(session, ids[20], 1)[0], 1)[0]
+    new_prefix = [SEED_ROOT_ID, SEED_PARENT_ID, ids[20], get_order(session, ids[20])[0], target]
+
+    # поддерево перемещается с третьего уровня на пятый к пункту другой ветви
+    data = await execute_query(loop, session, '''
+        mutation {{ moveItem(id: {}, newParentId: {}) {{ sortedId path }} }}
+    '''.format(children[0], target))
+    assert data['moveItem'] == {'sortedId': 0, 'path': [str(i) for i in new_prefix + [children[0]]]}
+
+    assert _get_paths(session, children[0]) == {
+        children[0]: new_prefix + [children[0]],
+        grandchildren[0]: new_prefix + [children[0], grandchildren[0]],
+        grandchildren[1]: new_prefix + [children[0], grandchildren[1]],
+        great_grandchildren[0]: new_prefix + [children[0], grandchildren[1], great_grandchildren[0]],
+        great_grandchildren[1]: new_prefix + [children[0], grandchildren[1], great_grandchildren[1]]
+    }
+    # прежняя ветвь не содержит перемещенных пунктов, порядок прежнего уровня непрерывен
+    assert _get_paths(session, ids[5]) == {
+        ids[5]: [SEED_ROOT_ID, SEED_PARENT_ID, ids[5]],
+        children[1]: [SEED_ROOT_ID, SEED_PARENT_ID, ids[5], children[1]]
+    }
+    assert get_order(session, ids[5]) == children[1:]
+
+
+async def test_move_item_rejects_cycle(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+    children = seed_children(session, ids[5], 2)
+
+    errors = await execute_query(loop, session, '''
+        mutation {{ moveItem(id: {}, newParentId: {}) {{ id }} }}
+    '''.format(ids[5], children[1]), expect_errors=True)
+    assert 'вложенный' in errors[0].message
+    assert get_order(session, SEED_PARENT_ID) == ids
+
+
+async def test_move_item_rejects_cycle_made_before_lock(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+
+    # параллельная транзакция перемещает новый родительский пункт в перемещаемый пункт
+    with change_before_lock(session, 'update public.item set parent_id = {}, sorted_id = 0 where id = {}'.format(
+        ids[5], ids[20]
+    )):
+        errors = await execute_query(loop, session, '''
+            mutation {{ moveItem(id: {}, newParentId: {}) {{ id }} }}
+        '''.format(ids[5], ids[20]), expect_errors=True)
+    assert 'вложенный' in errors[0].message
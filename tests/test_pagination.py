@@ -0,0 +1,46 @@
+"""
+Тесты keyset-пагинации
+"""
+import pytest
+from graphql import GraphQLError
+
+from item_menu.api.pagination import SortKey, decode_cursor, encode_cursor, paginate_items
+from item_menu.database.models import ItemModel
+from item_menu.database.sortings import get_paragraph_key
+
+
+SORT_KEYS = [SortKey(None, get_paragraph_key), SortKey(ItemModel.id, lambda x: x.id)]
+ITEMS = [
+    ItemModel(id=1, name='1.1 A'),
+    ItemModel(id=4, name='1.2 B'),
+    ItemModel(id=2, name='1.10 C'),
+    ItemModel(id=3, name='2.1 D'),
+]
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor([[1, 10], 2])
+    assert decode_cursor(cursor, 2) == [[1, 10], 2]
+    for invalid_cursor in ('garbage', encode_cursor([1]), 'YXJyYXljb25uZWN0aW9uOjA='):
+        with pytest.raises(GraphQLError):
+            decode_cursor(invalid_cursor, 2)
+
+
+async def test_paginate_items_forward(loop):
+    page = paginate_items(ITEMS, SORT_KEYS, first=2)
+    assert [item.id for item in page.items] == [1, 4]
+    assert page.has_next_page and not page.has_previous_page
+    assert await page.count() == 4
+
+    page = paginate_items(ITEMS, SORT_KEYS, first=2, after=page.get_cursor(page.items[-1]))
+    assert [item.id for item in page.items] == [2, 3]
+    assert page.has_previous_page and not page.has_next_page
+
+
+def test_paginate_items_backward():
+    page = paginate_items(ITEMS, SORT_KEYS, last=2, before=encode_cursor([[2, 1], 3]))
+    assert [item.id for item in page.items] == [4, 2]
+    assert page.has_previous_page and page.has_next_page
+
+    with pytest.raises(GraphQLError):
+        paginate_items(ITEMS, SORT_KEYS, last=-1)
@@ -0,0 +1,37 @@
+"""
+Тесты кэша прав пользователей
+"""
+from item_menu.cache import PermissionCache
+
+
+def test_permission_cache_shared_sets():
+    cache = PermissionCache(maxsize=10, ttl=60)
+    assert cache.get('Bearer a') is None
+
+    first = cache.set('Bearer a', ['1.1.2', '1.1.1'])
+    second = cache.set('Bearer b', ['1.1.1', '1.1.2', '1.1.1'])
+    # пользователи с одинаковыми правами используют одну запись
+    assert first is second
+    assert cache.get('Bearer b') is first
+    assert first.names == ('1.1.1', '1.1.2')
+    assert cache.stats['permission_sets'] == 1
+
+    cache.invalidate('Bearer a')
+    assert cache.get('Bearer a') is None
+    assert cache.get('Bearer b') is first
+
+
+def test_permission_cache_allowed_items_version():
+    cache = PermissionCache(maxsize=10, ttl=60)
+    permission_set = cache.set('Bearer a', ['1.1.1'])
+    assert cache.get_allowed_items(permission_set, version=0) is None
+
+    permission_set.set_allowed_items(0, {1, 3})
+    assert cache.get_allowed_items(permission_set, version=0) == {1, 3}
+    # после изменения дерева меню вычисленные пункты не используются
+    assert cache.get_allowed_items(permission_set, version=1) is None
+    # результат по устаревшей версии дерева не заменяет более новый
+    permission_set.set_allowed_items(1, {1})
+    permission_set.set_allowed_items(0, {1, 3})
+    assert cache.get_allowed_items(permission_set, version=1) == {1}
+    assert cache.stats['allowed_items_hits'] == 2
@@ -0,0 +1,44 @@
+"""
+Тесты автоматически сохраняемых запросов
+"""
+import json
+from hashlib import sha256
+
+QUERY = '{ rootItem }'
+EXTENSIONS = {'persistedQuery': {'version': 1, 'sha256Hash': sha256(QUERY.encode()).hexdigest()}}
+
+
+async def test_persisted_query_flow(cli, base_url):
+    resp = await cli.post(base_url, json={'extensions': EXTENSIONS})
+    assert resp.status == 200
+    resp_json = await resp.json()
+    assert resp_json['errors'][0]['message'] == 'PersistedQueryNotFound'
+    assert resp_json['errors'][0]['extensions']['code'] == 'PERSISTED_QUERY_NOT_FOUND'
+
+    resp = await cli.post(base_url, json={'query': QUERY, 'extensions': EXTENSIONS})
+    assert resp.status == 200
+    assert 'rootItem' in (await resp.json())['data']
+
+    resp = await cli.post(base_url, json={'extensions': EXTENSIONS})
+    assert 'rootItem' in (await resp.json())['data']
+
+    resp = await cli.get(base_url, params={'extensions': json.dumps(EXTENSIONS)})
+    assert resp.status == 200
+    assert 'rootItem' in (await resp.json())['data']
+
+
+async def test_persisted_query_hash_mismatch(cli, base_url):
+    resp = await cli.post(base_url, json={'query': '{ allItems { id } }', 'extensions': EXTENSIONS})
+    assert resp.status == 400
+    assert (await resp.json())['errors'][0]['message'] == 'provided sha does not match query'
+
+
+async def test_persisted_query_invalid_input(cli, base_url):
+    for body in (
+        {'extensions': {'persistedQuery': 'x'}},
+        {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': ['x']}}},
+        {'query': ['{ rootItem }'], 'extensions': EXTENSIONS}
+    ):
+        resp = await cli.post(base_url, json=body)
+        assert resp.status == 400, body
+        assert (await resp.json())['errors'][0]['extensions']['code'] == 'BAD_REQUEST'
@@ -0,0 +1,45 @@
+"""
+Тесты кэша ответов на запросы чтения
+"""
+from item_menu.cache import ResponseCache
+
+
+def test_memory_budget_eviction():
+    cache = ResponseCache(max_bytes=10)
+    cache.set(1, 'a', b'1234')
+    cache.set(1, 'b', b'1234')
+    assert cache.get(1, 'a') == b'1234'
+    # вытесняется давно не используемый ответ
+    cache.set(1, 'c', b'1234')
+    assert cache.get(1, 'b') is None
+    assert (cache.get(1, 'a'), cache.get(1, 'c')) == (b'1234', b'1234')
+    assert cache.bytes == 8
+
+    cache.set(1, 'd', b'x' * 11)
+    assert cache.get(1, 'd') is None
+    assert cache.stats['evictions'] == 1 and cache.stats['rejections'] == 1
+    assert cache.stats['hits'] == 3 and cache.stats['misses'] == 2
+
+
+def test_menu_version_invalidation():
+    cache = ResponseCache(max_bytes=100)
+    cache.set(1, 'a', b'old')
+    assert cache.get(2, 'a') is None
+    assert len(cache) == 0 and cache.bytes == 0
+    # ответ, полученный по устаревшей версии данных меню, не сохраняется
+    cache.set(1, 'a', b'old')
+    assert cache.get(2, 'a') is None
+    cache.set(2, 'a', b'new')
+    assert cache.get(2, 'a') == b'new'
+
+
+async def test_response_cache_hit(cli, base_url):
+    query = '{ allItems { id name } }'
+    first = await cli.post(base_url, json={'query': query})
+    second = await cli.post(base_url, json={'query': query})
+    assert first.status == second.status == 200
+    assert await first.read() == await second.read()
+
+    resp = await cli.post(base_url, json={'query': '{ cacheStats { name hits misses } }'})
+    stats = {cache['name']: cache for cache in (await resp.json())['data']['cacheStats']}
+    assert (stats['graphql_responses']['hits'], stats['graphql_responses']['misses']) == (1, 1)
@@ -0,0 +1,90 @@
+"""
+Тесты сдвига порядка сортировки пунктов одного уровня в мутациях: один запрос UPDATE на мутацию
+независимо от количества пунктов уровня. Данные создаются в транзакции, которая откатывается по завершении
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from graphql import GraphQLError
+from sqlalchemy.orm import Session
+
+from item_menu.api.validators import validate_locked_item
+from item_menu.database import AsyncSession
+from item_menu.database.siblings import get_locked_positions, get_siblings_lock_key
+from tests.conftest import SEED_PARENT_ID, SEED_ROOT_ID, execute_query, get_order, seed_level
+
+
+SEED_SIZE = 200
+
+
+@pytest.fixture
+def session(session):
+    seed_level(session, SEED_SIZE)
+    return session
+
+
+async def _execute(loop, session: Session, query: str) -> list:
+    """
+    Выполнение мутации
+    @return: выполненные запросы UPDATE
+    """
+    statements = []
+    await execute_query(loop, session, query, statements)
+    return [statement for statement in statements if statement.startswith('UPDATE')]
+
+
+def test_siblings_lock_key():
+    assert get_siblings_lock_key(None) == 0
+    assert get_siblings_lock_key(10) == 10
+    assert get_siblings_lock_key(2 ** 31) == -2 ** 31
+    assert -2 ** 31 <= get_siblings_lock_key(2 ** 62 + 5) < 2 ** 31
+
+
+async def test_update_item_shifts_siblings_with_one_statement(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+    moved_id = ids[150]
+
+    statements = await _execute(loop, session, '''
+        mutation {{ updateItem(id: {}, sortedId: 10, name: "seed") {{ id }} }}
+    '''.format(moved_id))
+    # сдвиг пунктов уровня и изменение самого пункта
+    assert len(statements) == 2
+    assert get_order(session, SEED_PARENT_ID) == ids[:10] + [moved_id] + ids[10:150] + ids[151:]
+
+    await _execute(loop, session, '''
+        mutation {{ updateItem(id: {}, sortedId: 150, name: "seed") {{ id }} }}
+    '''.format(moved_id))
+    assert get_order(session, SEED_PARENT_ID) == ids
+
+
+async def test_delete_item_shifts_siblings_with_one_statement(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+
+    statements = await _execute(loop, session, 'mutation {{ deleteItem(id: {}) {{ message }} }}'.format(ids[5]))
+    assert len(statements) == 1
+    assert get_order(session, SEED_PARENT_ID) == ids[:5] + ids[6:]
+
+
+async def test_create_item_shifts_siblings_with_one_statement(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+
+    statements = await _execute(loop, session, '''
+        mutation {{ createItem(parentId: {}, sortedId: 0, name: "seed", fullName: "seed") {{ id }} }}
+    '''.format(SEED_PARENT_ID))
+    assert len(statements) == 1
+    order = get_order(session, SEED_PARENT_ID)
+    assert len(order) == SEED_SIZE + 1 and order[1:] == ids
+
+
+async def test_locked_item_position_is_validated(loop, session):
+    ids = get_order(session, SEED_PARENT_ID)
+    missing_id = SEED_PARENT_ID + SEED_SIZE + 1
+    positions = await get_locked_positions(AsyncSession(session, ThreadPoolExecutor(1)), [ids[3], missing_id])
+    assert set(positions) == {ids[3]}
+
+    assert await validate_locked_item(positions[ids[3]], SEED_PARENT_ID) == 3
+    # пункт удален либо перемещен на другой уровень до получения блокировки
+    with pytest.raises(GraphQLError, match='несуществующей'):
+        await validate_locked_item(positions.get(missing_id), SEED_PARENT_ID)
+    with pytest.raises(GraphQLError, match='перемещен другим запросом'):
+        await validate_locked_item(positions[ids[3]], SEED_ROOT_ID)
@@ -0,0 +1,41 @@
+"""
+Тесты объединения одновременных вызовов
+"""
+import asyncio
+
+import pytest
+
+from item_menu.cache import SingleFlight
+
+
+async def test_single_flight_deduplicates_calls(loop):
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return {'value': value}
+
+    results = await asyncio.gather(*[single_flight.run('key', fetch, 1) for _ in range(5)])
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert single_flight.stats['deduplicated'] == 4
+    assert single_flight.stats['in_flight'] == 0
+
+    # завершенный вызов не переиспользуется
+    await single_flight.run('key', fetch, 2)
+    assert calls == [1, 2]
+
+
+async def test_single_flight_propagates_errors(loop):
+    single_flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError('error')
+
+    results = await asyncio.gather(*[single_flight.run('key', fail) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    with pytest.raises(ValueError):
+        await single_flight.run('key', fail)
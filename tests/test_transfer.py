@@ -0,0 +1,123 @@
+"""
+Тесты выгрузки и загрузки меню. Данные загружаются в транзакции, которая откатывается по завершении
+"""
+import io
+import json
+
+import pytest
+from dynaconf import settings
+from sqlalchemy.orm import Session
+
+from item_menu.app import Application
+from item_menu.database.models import ItemModel
+from item_menu.database.transfer import TransferError, export_csv, import_csv, import_json, iter_json
+
+
+MENU = {
+    'exec_type': [{'id': 1, 'name': 'form'}],
+    'item': [
+        {'id': 1, 'parent_id': None, 'sorted_id': 0, 'name': 'root'},
+        # вложенный пункт перед родительским: порядок строк не важен
+        {'id': 4, 'parent_id': 2, 'sorted_id': None, 'name': '1.1.1 Клиенты', 'exec_type_id': 1, 'visible': True},
+        {'id': 2, 'parent_id': 1, 'sorted_id': 0, 'name': '1.1 Справочники', 'full_name': 'Справочники'},
+        {'id': 3, 'parent_id': 1, 'sorted_id': None, 'name': '1.2 Отчеты\tи "сводки"', 'key': 'reports'},
+        {'id': 5, 'parent_id': 2, 'sorted_id': None, 'name': '1.1.2 Товары'}
+    ],
+    'root': [{'item_id': 1}]
+}
+
+
+def _get_items(session: Session) -> dict:
+    """
+    Пункты меню по ID
+    """
+    return {item.id: item for item in session.query(ItemModel).all()}
+
+
+def test_import_json(session):
+    counts = import_json(session, io.StringIO(json.dumps(MENU)), replace=True)
+    assert counts == {'exec_type': 1, 'item': 5, 'root': 1}
+
+    items = _get_items(session)
+    assert set(items) == {1, 2, 3, 4, 5}
+    # незаданный порядок сортировки продолжает порядок уровня в порядке ID
+    assert [items[i].sorted_id for i in (2, 3, 4, 5)] == [0, 1, 0, 1]
+    assert [items[i].path for i in (1, 3, 4)] == [[1], [1, 3], [1, 2, 4]]
+    assert (items[2].full_name, items[3].full_name) == ('Справочники', '1.2 Отчеты\tи "сводки"')
+    assert (items[4].exec_type_id, items[4].visible, items[5].visible) == (1, True, False)
+
+
+def test_export_import_roundtrip(session):
+    import_json(session, io.StringIO(json.dumps(MENU)), replace=True)
+    document = json.loads(''.join(iter_json(session, batch_size=2)))
+    assert [row['id'] for row in document['item']] == [1, 2, 3, 4, 5]
+    assert document['root'] == [{'item_id': 1}]
+
+    tables = {}
+    for table in ('exec_type', 'item', 'root'):
+        tables[table] = io.StringIO()
+        export_csv(session, table, tables[table])
+        tables[table].seek(0)
+    # перемещение пункта в файле CSV меняет путь его поддерева
+    tables['item'] = io.StringIO(tables['item'].getvalue().replace('\n2,1,0,', '\n2,3,0,'))
+    assert import_csv(session, tables, replace=True) == {'exec_type': 1, 'item': 5, 'root': 1}
+
+    items = _get_items(session)
+    assert [items[i].path for i in (2, 4, 5)] == [[1, 3, 2], [1, 3, 2, 4], [1, 3, 2, 5]]
+    assert items[3].name == MENU['item'][3]['name']
+
+
+def test_import_merge_keeps_other_items(session):
+    import_json(session, io.StringIO(json.dumps(MENU)), replace=True)
+    import_json(session, io.StringIO(json.dumps({
+        'item': [{'id': 6, 'parent_id': 1, 'name': 'new'}, {'id': 5, 'parent_id': 3, 'name': 'moved'}]
+    })))
+
+    items = _get_items(session)
+    assert set(items) == {1, 2, 3, 4, 5, 6}
+    assert (items[6].sorted_id, items[6].path) == (2, [1, 6])
+    assert (items[5].sorted_id, items[5].path) == (0, [1, 3, 5])
+
+
+def test_import_rejects_cycle(session):
+    menu = dict(MENU, item=MENU['item'] + [
+        {'id': 6, 'parent_id': 7, 'sorted_id': 0, 'name': 'a'},
+        {'id': 7, 'parent_id': 6, 'sorted_id': 0, 'name': 'b'}
+    ])
+    with pytest.raises(TransferError):
+        import_json(session, io.StringIO(json.dumps(menu)), replace=True)
+
+
+def test_import_partial_csv_keeps_other_columns(session):
+    import_json(session, io.StringIO(json.dumps(MENU)), replace=True)
+    assert import_csv(session, {'item': io.StringIO('id,name\n4,1.1.1 Покупатели\n')}) == {'item': 1}
+
+    item = _get_items(session)[4]
+    assert item.name == '1.1.1 Покупатели'
+    # столбцы, отсутствующие в заголовке, сохраняют прежние значения
+    assert (item.parent_id, item.sorted_id, item.full_name) == (2, 0, '1.1.1 Клиенты')
+    assert (item.exec_type_id, item.visible, item.path) == (1, True, [1, 2, 4])
+
+    # отсутствующие поля строки JSON также не изменяются
+    import_json(session, io.StringIO(json.dumps({'item': [{'id': 3, 'visible': True}]})))
+    item = _get_items(session)[3]
+    assert (item.name, item.key, item.visible, item.sorted_id) == (MENU['item'][3]['name'], 'reports', True, 1)
+
+
+async def test_admin_endpoints_require_token(aiohttp_client):
+    admin = settings.ADMIN
+    enabled, token = admin.enabled, admin.token
+    admin.enabled = True
+    try:
+        # без токена эндпоинты не добавляются
+        admin.token = ''
+        cli = await aiohttp_client(Application(settings).init_app())
+        resp = await cli.get('/admin/menu/export')
+        assert resp.status == 404
+
+        admin.token = 'secret'
+        cli = await aiohttp_client(Application(settings).init_app())
+        resp = await cli.get('/admin/menu/export', headers={'X-Admin-Token': 'wrong'})
+        assert resp.status == 403
+    finally:
+        admin.enabled, admin.token = enabled, token
@@ -0,0 +1,41 @@
+"""
+Тест использования триграммных индексов при поиске по частичному совпадению в наименованиях.
+Данные создаются в транзакции, которая откатывается по завершении
+"""
+import pytest
+
+from item_menu.api.filters import ItemFilter
+from item_menu.database.models import ItemModel
+from tests.conftest import SEED_ROOT_ID
+
+
+SEED_SIZE = 100000
+
+
+@pytest.fixture
+def session(session):
+    if not session.execute("select 1 from pg_extension where extname = 'pg_trgm'").scalar():
+        pytest.skip('Extension pg_trgm is not installed')
+    return session
+
+
+async def test_name_like_uses_trgm_indexes(loop, session):
+    session.execute(ItemModel.__table__.insert(), [
+        {'id': SEED_ROOT_ID, 'parent_id': None, 'sorted_id': 0, 'name': 'seed', 'full_name': 'seed'}
+    ])
+    session.execute('''
+        insert into public.item (id, parent_id, sorted_id, name, full_name)
+        select :root_id + n, :root_id, n, '1.' || n || ' Пункт ' || md5(n::text), 'Полное наименование ' || md5(n::text)
+        from generate_series(1, :size) n
+    ''', {'root_id': SEED_ROOT_ID, 'size': SEED_SIZE})
+    session.execute('analyze public.item')
+
+    query = await ItemFilter.filter_query(session.query(ItemModel), {'name_like': 'abcdef'})
+    statement = query.statement.compile(dialect=session.get_bind().dialect)
+    cursor = session.connection().connection.cursor()
+    cursor.execute('explain {}'.format(statement), statement.params)
+    plan = '\n'.join(row[0] for row in cursor.fetchall())
+
+    assert 'ix_item_name_trgm' in plan
+    assert 'ix_item_full_name_trgm' in plan
+    assert 'Seq Scan' not in plan
@@ -0,0 +1,30 @@
+"""
+Тесты многопроцессного режима сервиса
+"""
+import pytest
+from dynaconf.utils.boxing import DynaBox
+
+from item_menu.workers import get_worker_count, get_worker_pool_size
+
+
+def _config(max_connections: int, workers: int = 4, notifications: bool = True) -> DynaBox:
+    return DynaBox({
+        'WORKERS': {'count': workers},
+        'POSTGRES': {'pool_size': 5, 'max_overflow': 10, 'max_connections': max_connections},
+        'NOTIFICATIONS': {'enabled': notifications}
+    })
+
+
+def test_worker_count():
+    assert get_worker_count(_config(0, workers=3)) == 3
+    assert get_worker_count(_config(0, workers=0)) >= 1
+
+
+def test_worker_pool_size():
+    # без общего ограничения у каждого процесса пул из конфигурации
+    assert get_worker_pool_size(_config(0), 4) == (5, 10)
+    # 40 соединений на 4 процесса: 1 соединение слушателя уведомлений и 9 соединений пула
+    assert get_worker_pool_size(_config(40), 4) == (5, 4)
+    assert get_worker_pool_size(_config(12, notifications=False), 4) == (3, 0)
+    with pytest.raises(ValueError):
+        get_worker_pool_size(_config(4), 4)